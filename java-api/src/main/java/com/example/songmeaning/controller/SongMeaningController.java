@@ -10,8 +10,10 @@ import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.*;
 import java.io.IOException;
 import java.io.InputStream;
+import java.io.OutputStream;
 import java.net.HttpURLConnection;
 import java.net.URL;
+import java.nio.charset.StandardCharsets;
 
 @RestController
 @RequestMapping("/api")
@@ -20,8 +22,15 @@ public class SongMeaningController {
   public SongMeaningController(PythonClient client){ this.client = client; }
 
   @PostMapping("/analyze")
-  public ResponseEntity<SongResponse> analyze(@Valid @RequestBody SongRequest req){
-    return ResponseEntity.ok(client.analyze(req));
+  public ResponseEntity<SongResponse> analyze(@Valid @RequestBody SongRequest req,
+                                              @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.analyze(req, ifNoneMatch);
+  }
+
+  @GetMapping("/analyze")
+  public ResponseEntity<SongResponse> analyzeQuery(@Valid SongRequest req,
+                                                   @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.analyzeQuery(req, ifNoneMatch);
   }
 
   @PostMapping("/analyze/start")
@@ -29,23 +38,140 @@ public class SongMeaningController {
     return ResponseEntity.ok(client.analyzeStart(req));
   }
 
+  @PostMapping(value = "/analyze/batch", produces = "application/x-ndjson")
+  public void analyzeBatch(@RequestBody String body, HttpServletResponse response) throws IOException {
+    // Proxy the NDJSON result stream so each song is forwarded as soon as it finishes
+    HttpURLConnection connection = (HttpURLConnection) new URL(client.getBatchUrl()).openConnection();
+    connection.setRequestMethod("POST");
+    connection.setDoOutput(true);
+    connection.setRequestProperty("Content-Type", "application/json");
+    connection.setRequestProperty("Accept", "application/x-ndjson");
+    try (OutputStream out = connection.getOutputStream()) {
+      out.write(body.getBytes(StandardCharsets.UTF_8));
+    }
+
+    int status = connection.getResponseCode();
+    response.setStatus(status);
+    response.setContentType(status < 400 ? "application/x-ndjson" : "application/json");
+    response.setCharacterEncoding("UTF-8");
+    response.setHeader("X-Accel-Buffering", "no");
+    try (InputStream inputStream = status < 400 ? connection.getInputStream() : connection.getErrorStream()) {
+      if (inputStream == null) {
+        return;
+      }
+      byte[] buffer = new byte[8192];
+      int bytesRead;
+      while ((bytesRead = inputStream.read(buffer)) != -1) {
+        response.getOutputStream().write(buffer, 0, bytesRead);
+        response.getOutputStream().flush();
+      }
+    }
+  }
+
   @PostMapping("/summarize")
-  public ResponseEntity<?> summarize(@Valid @RequestBody SongRequest req){
-    return ResponseEntity.ok(client.summarize(req));
+  public ResponseEntity<?> summarize(@Valid @RequestBody SongRequest req,
+                                     @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.summarize(req, ifNoneMatch);
+  }
+
+  @GetMapping("/summarize")
+  public ResponseEntity<?> summarizeQuery(@Valid SongRequest req,
+                                          @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.summarizeQuery(req, ifNoneMatch);
+  }
+
+  @PostMapping(value = "/summarize/stream", produces = "text/event-stream")
+  public void summarizeStream(@RequestBody String body, HttpServletResponse response) throws IOException {
+    // Proxy the SSE stream so summary text reaches the client as it is generated
+    HttpURLConnection connection = (HttpURLConnection) new URL(client.getSummarizeStreamUrl()).openConnection();
+    connection.setRequestMethod("POST");
+    connection.setDoOutput(true);
+    connection.setRequestProperty("Content-Type", "application/json");
+    connection.setRequestProperty("Accept", "text/event-stream");
+    try (OutputStream out = connection.getOutputStream()) {
+      out.write(body.getBytes(StandardCharsets.UTF_8));
+    }
+
+    int status = connection.getResponseCode();
+    response.setStatus(status);
+    response.setContentType(status < 400 ? "text/event-stream" : "application/json");
+    response.setCharacterEncoding("UTF-8");
+    response.setHeader("Cache-Control", "no-cache");
+    response.setHeader("X-Accel-Buffering", "no");
+    try (InputStream inputStream = status < 400 ? connection.getInputStream() : connection.getErrorStream()) {
+      if (inputStream == null) {
+        return;
+      }
+      byte[] buffer = new byte[256];
+      int bytesRead;
+      while ((bytesRead = inputStream.read(buffer)) != -1) {
+        response.getOutputStream().write(buffer, 0, bytesRead);
+        response.getOutputStream().flush();
+      }
+    }
   }
 
   @PostMapping("/generate")
-  public ResponseEntity<?> generate(@Valid @RequestBody SongRequest req){
-    return ResponseEntity.ok(client.generate(req));
+  public ResponseEntity<?> generate(@Valid @RequestBody SongRequest req,
+                                    @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.generate(req, ifNoneMatch);
+  }
+
+  @GetMapping("/generate")
+  public ResponseEntity<?> generateQuery(@Valid SongRequest req,
+                                         @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.generateQuery(req, ifNoneMatch);
   }
 
   @PostMapping("/spotify/search")
-  public ResponseEntity<?> spotifySearch(@Valid @RequestBody SongRequest req){
-    return ResponseEntity.ok(client.spotifySearch(req));
+  public ResponseEntity<?> spotifySearch(@Valid @RequestBody SongRequest req,
+                                         @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.spotifySearch(req, ifNoneMatch);
+  }
+
+  @GetMapping("/spotify/search")
+  public ResponseEntity<?> spotifySearchQuery(@Valid SongRequest req,
+                                              @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch){
+    return client.spotifySearchQuery(req, ifNoneMatch);
+  }
+
+  @GetMapping("/images/{blobId:[0-9a-f]{64}}")
+  public void image(@PathVariable String blobId,
+                    @RequestHeader(value = "Range", required = false) String range,
+                    @RequestHeader(value = "If-Range", required = false) String ifRange,
+                    @RequestHeader(value = "If-None-Match", required = false) String ifNoneMatch,
+                    HttpServletResponse response) throws IOException {
+    // Proxy stored artwork; conditional and range requests are answered by the Python service
+    HttpURLConnection connection = (HttpURLConnection) new URL(client.getImageUrl(blobId)).openConnection();
+    if (range != null) {
+      connection.setRequestProperty("Range", range);
+    }
+    if (ifRange != null) {
+      connection.setRequestProperty("If-Range", ifRange);
+    }
+    if (ifNoneMatch != null) {
+      connection.setRequestProperty("If-None-Match", ifNoneMatch);
+    }
+
+    int status = connection.getResponseCode();
+    response.setStatus(status);
+    for (String header : new String[] {"Content-Type", "Content-Length", "Content-Range", "Accept-Ranges", "ETag", "Cache-Control"}) {
+      String value = connection.getHeaderField(header);
+      if (value != null) {
+        response.setHeader(header, value);
+      }
+    }
+    try (InputStream inputStream = status < 400 ? connection.getInputStream() : connection.getErrorStream()) {
+      if (inputStream != null) {
+        inputStream.transferTo(response.getOutputStream());
+      }
+    }
   }
 
   @GetMapping(value = "/progress/{requestId}", produces = "text/event-stream")
-  public void progressStream(@PathVariable String requestId, HttpServletResponse response) throws IOException {
+  public void progressStream(@PathVariable String requestId,
+                             @RequestHeader(value = "Last-Event-ID", required = false) String lastEventId,
+                             HttpServletResponse response) throws IOException {
     // Proxy the SSE stream from Python service
     String progressUrl = client.getProgressStreamUrl(requestId);
     
@@ -62,6 +188,9 @@ public class SongMeaningController {
       connection.setRequestMethod("GET");
       connection.setRequestProperty("Accept", "text/event-stream");
       connection.setRequestProperty("Cache-Control", "no-cache");
+      if (lastEventId != null && !lastEventId.isBlank()) {
+        connection.setRequestProperty("Last-Event-ID", lastEventId); // let the stream resume
+      }
       
       try (InputStream inputStream = connection.getInputStream()) {
         byte[] buffer = new byte[256]; // Smaller buffer for better streaming
@@ -69,14 +198,6 @@ public class SongMeaningController {
         while ((bytesRead = inputStream.read(buffer)) != -1) {
           response.getOutputStream().write(buffer, 0, bytesRead);
           response.getOutputStream().flush(); // Force flush after each write
-          
-          // Small delay to prevent overwhelming the client
-          try {
-            Thread.sleep(10);
-          } catch (InterruptedException e) {
-            Thread.currentThread().interrupt();
-            break;
-          }
         }
       }
     } catch (Exception e) {
@@ -4,6 +4,7 @@ import com.example.songmeaning.dto.SongRequest;
 import com.example.songmeaning.dto.SongResponse;
 import com.example.songmeaning.dto.AnalyzeStartResponse;
 import org.springframework.beans.factory.annotation.Value;
+import org.springframework.http.HttpHeaders;
 import org.springframework.http.HttpStatusCode;
 import org.springframework.http.MediaType;
 import org.springframework.http.ResponseEntity;
@@ -11,9 +12,12 @@ import org.springframework.stereotype.Service;
 import org.springframework.web.client.RestClient;
 import org.springframework.web.client.RestClientResponseException;
 import org.springframework.web.server.ResponseStatusException;
+import org.springframework.web.util.UriComponentsBuilder;
 import org.springframework.web.servlet.mvc.method.annotation.SseEmitter;
 import com.fasterxml.jackson.databind.JsonNode;
 import com.fasterxml.jackson.databind.ObjectMapper;
+import java.net.URI;
+import java.util.Objects;
 
 @Service
 public class PythonClient {
@@ -27,14 +31,15 @@ public class PythonClient {
     this.objectMapper = objectMapper;
   }
 
-  public SongResponse analyze(SongRequest req){
+  public ResponseEntity<SongResponse> analyze(SongRequest req, String ifNoneMatch){
     try {
-      return http.post().uri(baseUrl + "/analyze")
+      return relay(http.post().uri(baseUrl + "/analyze")
           .contentType(MediaType.APPLICATION_JSON)
           .accept(MediaType.APPLICATION_JSON)
+          .headers(headers -> conditional(headers, ifNoneMatch))
           .body(req)
           .retrieve()
-          .body(SongResponse.class);
+          .toEntity(SongResponse.class));
     } catch (RestClientResponseException ex) {
       // Extract friendly message from JSON error response
       HttpStatusCode status = ex.getStatusCode();
@@ -60,14 +65,15 @@ public class PythonClient {
     }
   }
 
-  public Object summarize(SongRequest req){
+  public ResponseEntity<Object> summarize(SongRequest req, String ifNoneMatch){
     try {
-      return http.post().uri(baseUrl + "/summarize")
+      return relay(http.post().uri(baseUrl + "/summarize")
           .contentType(MediaType.APPLICATION_JSON)
           .accept(MediaType.APPLICATION_JSON)
+          .headers(headers -> conditional(headers, ifNoneMatch))
           .body(req)
           .retrieve()
-          .body(Object.class);
+          .toEntity(Object.class));
     } catch (RestClientResponseException ex) {
       HttpStatusCode status = ex.getStatusCode();
       String body = ex.getResponseBodyAsString();
@@ -76,14 +82,15 @@ public class PythonClient {
     }
   }
 
-  public Object generate(SongRequest req){
+  public ResponseEntity<Object> generate(SongRequest req, String ifNoneMatch){
     try {
-      return http.post().uri(baseUrl + "/generate")
+      return relay(http.post().uri(baseUrl + "/generate")
           .contentType(MediaType.APPLICATION_JSON)
           .accept(MediaType.APPLICATION_JSON)
+          .headers(headers -> conditional(headers, ifNoneMatch))
           .body(req)
           .retrieve()
-          .body(Object.class);
+          .toEntity(Object.class));
     } catch (RestClientResponseException ex) {
       HttpStatusCode status = ex.getStatusCode();
       String body = ex.getResponseBodyAsString();
@@ -92,14 +99,15 @@ public class PythonClient {
     }
   }
 
-  public Object spotifySearch(SongRequest req){
+  public ResponseEntity<Object> spotifySearch(SongRequest req, String ifNoneMatch){
     try {
-      return http.post().uri(baseUrl + "/spotify/search")
+      return relay(http.post().uri(baseUrl + "/spotify/search")
           .contentType(MediaType.APPLICATION_JSON)
           .accept(MediaType.APPLICATION_JSON)
+          .headers(headers -> conditional(headers, ifNoneMatch))
           .body(req)
           .retrieve()
-          .body(Object.class);
+          .toEntity(Object.class));
     } catch (RestClientResponseException ex) {
       HttpStatusCode status = ex.getStatusCode();
       String body = ex.getResponseBodyAsString();
@@ -108,10 +116,85 @@ public class PythonClient {
     }
   }
 
+  // GET forms of analyze/summarize/generate/spotifySearch: a matching If-None-Match is answered with 304
+  public ResponseEntity<SongResponse> analyzeQuery(SongRequest req, String ifNoneMatch){
+    return query("/analyze", req, ifNoneMatch, SongResponse.class);
+  }
+
+  public ResponseEntity<Object> summarizeQuery(SongRequest req, String ifNoneMatch){
+    return query("/summarize", req, ifNoneMatch, Object.class);
+  }
+
+  public ResponseEntity<Object> generateQuery(SongRequest req, String ifNoneMatch){
+    return query("/generate", req, ifNoneMatch, Object.class);
+  }
+
+  public ResponseEntity<Object> spotifySearchQuery(SongRequest req, String ifNoneMatch){
+    return query("/spotify/search", req, ifNoneMatch, Object.class);
+  }
+
+  private <T> ResponseEntity<T> query(String path, SongRequest req, String ifNoneMatch, Class<T> type){
+    try {
+      return relay(http.get().uri(songQuery(path, req))
+          .accept(MediaType.APPLICATION_JSON)
+          .headers(headers -> conditional(headers, ifNoneMatch))
+          .retrieve()
+          .toEntity(type));
+    } catch (RestClientResponseException ex) {
+      HttpStatusCode status = ex.getStatusCode();
+      String body = ex.getResponseBodyAsString();
+      String friendlyMessage = extractFriendlyMessage(body, ex.getMessage());
+      throw new ResponseStatusException(status, friendlyMessage);
+    }
+  }
+
+  private URI songQuery(String path, SongRequest req) {
+    // Values are encoded as whole query values, so '&' or '+' in a title stays part of it
+    return UriComponentsBuilder.fromHttpUrl(baseUrl + path)
+        .queryParam("artist", "{artist}")
+        .queryParam("title", "{title}")
+        .queryParam("style", "{style}")
+        .queryParam("language", "{language}")
+        .encode()
+        .buildAndExpand(req.getArtist(), req.getTitle(), Objects.toString(req.getStyle(), ""), Objects.toString(req.getLanguage(), ""))
+        .toUri();
+  }
+
   public String getProgressStreamUrl(String requestId) {
     return baseUrl + "/progress/" + requestId;
   }
 
+  public String getSummarizeStreamUrl() {
+    return baseUrl + "/summarize/stream";
+  }
+
+  public String getBatchUrl() {
+    return baseUrl + "/analyze/batch";
+  }
+
+  public String getImageUrl(String blobId) {
+    return baseUrl + "/images/" + blobId;
+  }
+
+  private static void conditional(HttpHeaders headers, String ifNoneMatch) {
+    // Let the Python service answer 304 (GET) or 412 (POST) when the client already has this result
+    if (ifNoneMatch != null && !ifNoneMatch.isBlank()) {
+      headers.set(HttpHeaders.IF_NONE_MATCH, ifNoneMatch);
+    }
+  }
+
+  private static <T> ResponseEntity<T> relay(ResponseEntity<T> upstream) {
+    // Pass through the status (200 or 304), caching validators and the per-stage timing breakdown
+    ResponseEntity.BodyBuilder builder = ResponseEntity.status(upstream.getStatusCode());
+    for (String header : new String[] {HttpHeaders.ETAG, HttpHeaders.CACHE_CONTROL, "Server-Timing"}) {
+      String value = upstream.getHeaders().getFirst(header);
+      if (value != null) {
+        builder.header(header, value);
+      }
+    }
+    return builder.body(upstream.getBody());
+  }
+
   private String extractFriendlyMessage(String jsonBody, String fallback) {
     if (jsonBody == null || jsonBody.isBlank()) {
       return fallback;
@@ -7,6 +7,7 @@ import org.springframework.boot.test.context.SpringBootTest;
 import org.springframework.http.MediaType;
 import org.springframework.test.web.servlet.MockMvc;
 
+import static org.springframework.test.web.servlet.request.MockMvcRequestBuilders.get;
 import static org.springframework.test.web.servlet.request.MockMvcRequestBuilders.post;
 import static org.springframework.test.web.servlet.result.MockMvcResultMatchers.status;
 
@@ -21,4 +22,9 @@ class SongMeaningControllerTest {
         .content("{\"artist\":\"\",\"title\":\"\"}"))
        .andExpect(status().isBadRequest());
   }
+
+  @Test void badRequestWhenMissingQueryParameters() throws Exception {
+    mvc.perform(get("/api/summarize").param("artist", "Metallica"))
+       .andExpect(status().isBadRequest());
+  }
 }
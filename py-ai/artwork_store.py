@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+BLOB_ID = re.compile(r"^[0-9a-f]{64}$")
+MEDIA_TYPES = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp", "bin": "application/octet-stream"}
+# Re-stamp a file's mtime (its LRU position on disk) at most this often
+TOUCH_INTERVAL = 3600
+
+
+def sniff_extension(data: bytes) -> str:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+class Blob:
+    def __init__(self, blob_id: str, path: str, size: int, media_type: str):
+        self.blob_id = blob_id
+        self.path = path
+        self.size = size
+        self.media_type = media_type
+
+    @property
+    def etag(self) -> str:
+        # Content-addressed, so the id is a strong validator
+        return f'"{self.blob_id}"'
+
+
+class ArtworkStore:
+    """Content-addressed image files on local disk, evicted least-recently-used past a byte budget.
+
+    Images are stored once per SHA-256 of their bytes under
+    root/<first two hex chars>/<sha256>.<ext>. Reads refresh a file's mtime,
+    which is the LRU order on disk, so several workers can share one
+    directory: each keeps an index of what it has seen and rescans the
+    directory whenever its estimate goes over budget.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()  # id -> (ext, size, touched)
+        self._bytes = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"writes": 0, "dedup_writes": 0, "reads": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+
+    async def start(self) -> None:
+        self._load(await asyncio.to_thread(self._scan))
+        logger.info(f"Artwork store ready at {self.root}: {len(self._index)} images, {self._bytes} bytes")
+
+    async def put(self, data: bytes) -> str:
+        """Store image bytes and return their blob id."""
+        blob_id = hashlib.sha256(data).hexdigest()
+        ext = sniff_extension(data)
+        # contains() also checks the file is still there; another worker may have evicted it
+        if blob_id in self._index and self.contains(blob_id):
+            self.stats["dedup_writes"] += 1
+            self._touch(blob_id)
+            return blob_id
+        await asyncio.to_thread(self._write, blob_id, ext, data)
+        self._index[blob_id] = (ext, len(data), time.time())
+        self._bytes += len(data)
+        self.stats["writes"] += 1
+        if self._bytes > self.max_bytes:
+            async with self._lock:
+                if self._bytes > self.max_bytes:
+                    kept, evicted = await asyncio.to_thread(self._evict)
+                    self._load(kept)
+                    self.stats["evictions"] += len(evicted)
+                    self.stats["evicted_bytes"] += sum(size for _, _, _, size in evicted)
+        return blob_id
+
+    def get(self, blob_id: str) -> Optional[Blob]:
+        blob = self._lookup(blob_id)
+        if blob is None:
+            self.stats["misses"] += 1
+            return None
+        self._touch(blob_id)
+        self.stats["reads"] += 1
+        return blob
+
+    def contains(self, blob_id: str) -> bool:
+        return self._lookup(blob_id) is not None
+
+    def _lookup(self, blob_id: str) -> Optional[Blob]:
+        if not BLOB_ID.match(blob_id):
+            return None
+        entry = self._index.get(blob_id) or self._find_on_disk(blob_id)  # maybe written by another worker
+        if entry is None:
+            return None
+        ext, size, _ = entry
+        path = self._path(blob_id, ext)
+        if not os.path.exists(path):
+            # Evicted by another worker
+            self._forget(blob_id)
+            return None
+        return Blob(blob_id, path, size, MEDIA_TYPES[ext])
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "images": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "usage": round(self._bytes / self.max_bytes * 100, 2) if self.max_bytes else None,
+        }
+
+    def _path(self, blob_id: str, ext: str) -> str:
+        return os.path.join(self.root, blob_id[:2], f"{blob_id}.{ext}")
+
+    def _write(self, blob_id: str, ext: str, data: bytes) -> None:
+        path = self._path(blob_id, ext)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _touch(self, blob_id: str) -> None:
+        entry = self._index.get(blob_id)
+        if entry is None:
+            return
+        ext, size, touched = entry
+        self._index.move_to_end(blob_id)
+        now = time.time()
+        if now - touched > TOUCH_INTERVAL:
+            try:
+                os.utime(self._path(blob_id, ext))
+            except OSError:
+                pass
+            self._index[blob_id] = (ext, size, now)
+
+    def _forget(self, blob_id: str) -> None:
+        entry = self._index.pop(blob_id, None)
+        if entry:
+            self._bytes -= entry[1]
+
+    def _find_on_disk(self, blob_id: str) -> Optional[Tuple[str, int, float]]:
+        for ext in MEDIA_TYPES:
+            try:
+                stat = os.stat(self._path(blob_id, ext))
+            except OSError:
+                continue
+            self._index[blob_id] = (ext, stat.st_size, stat.st_mtime)
+            self._bytes += stat.st_size
+            return self._index[blob_id]
+        return None
+
+    def _load(self, entries: list) -> None:
+        self._index = OrderedDict((blob_id, (ext, size, mtime)) for mtime, blob_id, ext, size in entries)
+        self._bytes = sum(size for _, _, _, size in entries)
+
+    # Disk scans and eviction run on a worker thread and only return entries;
+    # the index itself is only touched on the event loop.
+    def _scan(self) -> list:
+        """Image files on disk as (mtime, id, ext, size), oldest first."""
+        entries = []
+        if os.path.isdir(self.root):
+            for directory in os.scandir(self.root):
+                if not directory.is_dir():
+                    continue
+                for entry in os.scandir(directory.path):
+                    blob_id, _, ext = entry.name.partition(".")
+                    if not BLOB_ID.match(blob_id) or ext not in MEDIA_TYPES:
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, blob_id, ext, stat.st_size))
+        entries.sort()
+        return entries
+
+    def _evict(self) -> tuple:
+        """Delete the least recently used files until under budget; returns (kept, evicted) entries."""
+        entries = self._scan()
+        total = sum(size for _, _, _, size in entries)
+        # Go a little under budget so every write doesn't trigger a rescan
+        target = self.max_bytes * 0.9
+        evicted = []
+        for entry in entries:
+            if total <= target:
+                break
+            _, blob_id, ext, size = entry
+            try:
+                os.unlink(self._path(blob_id, ext))
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted.append(entry)
+        return entries[len(evicted):], evicted
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=start-end" range into inclusive offsets.
+
+    Returns None when the header should be ignored (malformed, or several
+    ranges: the whole file is sent instead), and (size, size) when the range
+    cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:
+            length = int(end)
+            if length <= 0:
+                return size, size
+            return max(0, size - length), size - 1
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if first >= size or last < first:
+        return size, size
+    return first, last
+
+
+class BlobResponse(Response):
+    """Serve a stored image with ETag/Range support and immutable caching.
+
+    Whole files go out through the ASGI pathsend extension (the server sends
+    the file itself, zero-copy) when the server offers it, and otherwise in
+    chunks read off the event loop.
+    """
+
+    chunk_size = 64 * 1024
+    cache_control = "public, max-age=31536000, immutable"
+
+    def __init__(self, blob: Blob, request_headers, method: str = "GET"):
+        self.blob = blob
+        self.method = method
+        self.range: Optional[Tuple[int, int]] = None
+        headers = {"etag": blob.etag, "cache-control": self.cache_control, "accept-ranges": "bytes"}
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or blob.etag in [t.strip() for t in if_none_match.split(",")]):
+            super().__init__(status_code=304, headers=headers)
+            return
+        status = 200
+        length = blob.size
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == blob.etag):
+            byte_range = parse_range(range_header, blob.size)
+            if byte_range == (blob.size, blob.size):
+                headers["content-range"] = f"bytes */{blob.size}"
+                super().__init__(status_code=416, headers=headers)
+                return
+            if byte_range:
+                self.range = byte_range
+                status = 206
+                length = byte_range[1] - byte_range[0] + 1
+                headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{blob.size}"
+        super().__init__(status_code=status, headers=headers, media_type=blob.media_type)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.status_code not in (200, 206) or self.method == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if self.range is None and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": self.blob.path})
+            return
+        start, end = self.range or (0, self.blob.size - 1)
+        remaining = end - start + 1
+        async with await anyio.open_file(self.blob.path, "rb") as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank underneath us; end the response rather than hang
+            await send({"type": "http.response.body", "body": b""})
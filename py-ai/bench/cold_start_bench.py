@@ -0,0 +1,145 @@
+"""Measure how quickly the service starts answering and becomes ready.
+
+Usage:
+    python bench/cold_start_bench.py [--runs 5] [--scenarios fake,down,blackhole] [--redis-url URL]
+
+Each run starts the service (uvicorn, one worker) in a fresh process and
+times, from process start:
+
+    import    importing main (measured in a separate process)
+    healthz   first 200 from /healthz: the server is accepting requests
+    readyz    first 200 from /readyz: Redis connected, background startup done
+
+Scenarios differ only in Redis:
+
+    fake       in-memory fake Redis (connects immediately)
+    down       nothing listening on the Redis port (connection refused)
+    blackhole  a port that accepts connections and never answers
+    real       --redis-url, if given
+
+With Redis down or blackholed the service should still answer /healthz
+straight away and report not ready, rather than hang in startup.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PY_AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOAD_TEST = os.path.join(PY_AI_DIR, "bench", "load_test.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=PY_AI_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def blackhole_server():
+    """A "Redis" that accepts connections and never replies."""
+    held = []
+
+    async def hold(reader, writer):
+        held.append(writer)
+        await reader.read()
+
+    server = await asyncio.start_server(hold, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def start_once(scenario: str, redis_url: str, timeout: float, artwork_dir: str) -> dict:
+    port = free_port()
+    # readyz is timed to a connected Redis, so make readiness wait for it
+    env = {**os.environ, "OPENAI_API_KEY": "bench", "ARTWORK_STORE_DIR": artwork_dir, "READY_REQUIRES_REDIS": "true"}
+    command = [sys.executable, LOAD_TEST, "--serve-app", "--app-port", str(port)]
+    if scenario == "fake":
+        command.append("--fake-redis")
+    else:
+        env["REDIS_URL"] = redis_url
+    base_url = f"http://127.0.0.1:{port}"
+    result = {"healthz": None, "readyz": None, "redis": None}
+    started = time.perf_counter()
+    app = subprocess.Popen(command, cwd=PY_AI_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if result["healthz"] is None and (await client.get("/healthz")).status_code == 200:
+                        result["healthz"] = time.perf_counter() - started
+                    if result["healthz"] is not None:
+                        response = await client.get("/readyz")
+                        result["redis"] = response.json()["checks"]["redis"]["state"]
+                        if response.status_code == 200:
+                            result["readyz"] = time.perf_counter() - started
+                            break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.01)
+    finally:
+        app.terminate()
+        app.wait()
+    return result
+
+
+def summarize(values) -> str:
+    values = [v for v in values if v is not None]
+    if not values:
+        return "-"
+    return f"{statistics.median(values) * 1000:.0f} / {max(values) * 1000:.0f}"
+
+
+async def run(args) -> None:
+    server, blackhole_port = await blackhole_server()
+    redis_urls = {
+        "fake": None,
+        "down": f"redis://127.0.0.1:{free_port()}/0",
+        "blackhole": f"redis://127.0.0.1:{blackhole_port}/0",
+        "real": args.redis_url,
+    }
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import main: median {statistics.median(imports) * 1000:.0f} ms, max {max(imports) * 1000:.0f} ms "
+          f"({args.runs} runs)\n")
+    print(f"{'scenario':<11}{'healthz ms (p50/max)':>22}{'readyz ms (p50/max)':>22}{'ready':>8}  redis")
+    with tempfile.TemporaryDirectory(prefix="cold-start-") as artwork_dir:
+        for scenario in args.scenarios:
+            if scenario == "real" and not args.redis_url:
+                continue
+            results = [
+                await start_once(scenario, redis_urls[scenario], args.timeout, artwork_dir)
+                for _ in range(args.runs)
+            ]
+            ready = sum(r["readyz"] is not None for r in results)
+            states = sorted({r["redis"] for r in results if r["redis"]})
+            print(
+                f"{scenario:<11}{summarize(r['healthz'] for r in results):>22}"
+                f"{summarize(r['readyz'] for r in results):>22}{f'{ready}/{len(results)}':>8}  {', '.join(states)}"
+            )
+    server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenarios", default="fake,down,blackhole,real",
+                        type=lambda v: [s.strip() for s in v.split(",") if s.strip()])
+    parser.add_argument("--redis-url", help="also measure against this Redis (scenario real)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for /readyz per run")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Offline load test: run the service against local upstream stand-ins and measure it.
+
+Usage:
+    python bench/load_test.py [--scenarios analyze,start,summarize,stream,spotify]
+                              [--concurrency 16] [--duration 15] [--songs 200]
+                              [--latency openai_chat=0.8,...] [--errors genius_page=0.01,...]
+                              [--redis-url redis://localhost:6379/15] [--json results.json]
+
+Starts bench/upstream_stubs.py and the service (uvicorn, one worker) as
+subprocesses, with an in-memory fake Redis unless --redis-url is given, then
+drives each scenario at the target concurrency for --duration seconds:
+
+    analyze    POST /analyze
+    start      POST /analyze/start, then follow /progress/{id} until it completes
+    summarize  POST /summarize
+    stream     POST /summarize/stream, reading events until the complete summary
+    spotify    POST /spotify/search
+
+Songs are drawn at random from --songs distinct titles, so later requests
+increasingly hit the cache. For each scenario it reports RPS, p50/p95/p99
+latency, errors, and event-loop blocking measured by the service itself
+(the event_loop_lag_seconds histogram from /metrics). Streaming scenarios
+(start, stream) also report how long the first summary text took to arrive.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+PY_AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("analyze", "start", "summarize", "stream", "spotify")
+METRIC_LINE = re.compile(r'^event_loop_lag_seconds_(bucket|sum|count)(?:\{le="([^"]+)"\})? (\S+)$')
+
+
+def serve_app(port: int, fake_redis: bool) -> None:
+    """Run the service in this process (the subprocess side of the harness)."""
+    sys.path.insert(0, PY_AI_DIR)
+    import uvicorn
+    import main
+
+    if fake_redis:
+        import fakeredis.aioredis
+
+        async def init_fake_redis():
+            main.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+        main.init_redis = init_fake_redis
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_processes(args, log_dir: str):
+    stub_log = open(os.path.join(log_dir, "stubs.log"), "w")
+    app_log = open(os.path.join(log_dir, "app.log"), "w")
+    stubs = subprocess.Popen(
+        [sys.executable, os.path.join(PY_AI_DIR, "bench", "upstream_stubs.py"), "--port", str(args.stub_port),
+         "--latency", args.latency, "--errors", args.errors, "--page-kb", str(args.page_kb)],
+        stdout=stub_log, stderr=subprocess.STDOUT,
+    )
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    env = {
+        **os.environ,
+        "GENIUS_API_TOKEN": "bench",
+        "SPOTIFY_API_TOKEN": "bench",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "GENIUS_API_BASE": stub_url,
+        "GENIUS_WEB_BASE": stub_url,
+        "SPOTIFY_API_BASE": stub_url,
+        # Keep on-disk state with the logs, so every run starts cold
+        "ARTWORK_STORE_DIR": os.path.join(log_dir, "artwork"),
+        "DISK_CACHE_PATH": os.path.join(log_dir, "cache.sqlite3"),
+    }
+    command = [sys.executable, os.path.abspath(__file__), "--serve-app", "--app-port", str(args.app_port)]
+    if args.redis_url:
+        env["REDIS_URL"] = args.redis_url
+    else:
+        command.append("--fake-redis")
+    app = subprocess.Popen(command, stdout=app_log, stderr=subprocess.STDOUT, env=env, cwd=PY_AI_DIR)
+    return stubs, app
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def read_loop_lag(client: httpx.AsyncClient) -> dict:
+    text = (await client.get("/metrics")).text
+    lag = {"buckets": {}, "sum": 0.0, "count": 0.0}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        kind, le, value = match.groups()
+        if kind == "bucket":
+            lag["buckets"][le] = float(value)
+        else:
+            lag[kind] = float(value)
+    return lag
+
+
+def loop_lag_report(before: dict, after: dict, elapsed: float) -> dict:
+    samples = after["count"] - before["count"]
+    blocked = after["sum"] - before["sum"]
+    # Smallest bucket holding 99% of the samples taken during the run
+    p99 = None
+    for le, cumulative in sorted(after["buckets"].items(), key=lambda item: float(item[0])):
+        if samples and cumulative - before["buckets"].get(le, 0.0) >= 0.99 * samples:
+            p99 = le
+            break
+    return {
+        "samples": int(samples),
+        "blocked_seconds": round(blocked, 3),
+        "blocked_share": round(blocked / elapsed, 4) if elapsed else 0.0,
+        "p99_at_most": p99,
+    }
+
+
+async def run_request(client: httpx.AsyncClient, scenario: str, song: dict, marks: dict) -> str:
+    """Run one scenario request; return "ok" or a short error label.
+
+    Streaming scenarios record in marks when the first summary text arrived.
+    """
+    if scenario == "stream":
+        async with client.stream("POST", "/summarize/stream", json=song) as stream:
+            if stream.status_code != 200:
+                return str(stream.status_code)
+            async for line in stream.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                if "error" in event:
+                    return "stream error"
+                if ("delta" in event or "summary" in event) and "summary_text" not in marks:
+                    marks["summary_text"] = time.perf_counter()
+                if "summary" in event:
+                    return "ok"
+        return "incomplete"
+    if scenario == "start":
+        response = await client.post("/analyze/start", json=song)
+        if response.status_code != 200:
+            return str(response.status_code)
+        request_id = response.json()["request_id"]
+        state = {}
+        async with client.stream("GET", f"/progress/{request_id}") as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("data:"):
+                    event = json.loads(line[5:])
+                    if ("summary_delta" in event or "partial_summary" in event) and "summary_text" not in marks:
+                        marks["summary_text"] = time.perf_counter()
+                    state.update(event)
+                    if state.get("progress", 0) >= 100:
+                        break
+        if state.get("error") or "result" not in state:
+            return "incomplete"
+        return "ok"
+    path = {"analyze": "/analyze", "summarize": "/summarize", "spotify": "/spotify/search"}[scenario]
+    response = await client.post(path, json=song)
+    return "ok" if response.status_code == 200 else str(response.status_code)
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(base_url: str, scenario: str, concurrency: int, duration: float, songs: list) -> dict:
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        lag_before = await read_loop_lag(client)
+        latencies, first_text, outcomes = [], [], Counter()
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            while time.monotonic() < deadline:
+                started, marks = time.perf_counter(), {}
+                try:
+                    outcome = await run_request(client, scenario, random.choice(songs), marks)
+                except httpx.HTTPError as e:
+                    outcome = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                if "summary_text" in marks:
+                    first_text.append(marks["summary_text"] - started)
+                outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        lag_after = await read_loop_lag(client)
+
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "errors": {k: v for k, v in outcomes.items() if k != "ok"},
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+        "event_loop": loop_lag_report(lag_before, lag_after, elapsed),
+        "first_summary_text": {
+            "samples": len(first_text),
+            "p50_ms": round(percentile(first_text, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(first_text, 0.95) * 1000, 1),
+        } if first_text else None,
+    }
+
+
+def print_report(results: list, upstream: dict) -> None:
+    print(f"\n{'scenario':<11}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'errors':>8}{'loop blocked':>14}{'lag p99':>9}")
+    for r in results:
+        loop = r["event_loop"]
+        print(
+            f"{r['scenario']:<11}{r['requests']:>9}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            f"{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}{sum(r['errors'].values()):>8}"
+            f"{loop['blocked_seconds']:>10.3f}s {loop['blocked_share'] * 100:>2.0f}%{'≤' + str(loop['p99_at_most']) + 's':>9}"
+        )
+        if r["errors"]:
+            print(f"{'':<11}errors: {dict(r['errors'])}")
+        if r["first_summary_text"]:
+            text = r["first_summary_text"]
+            print(f"{'':<11}first summary text: p50 {text['p50_ms']:.1f} ms, p95 {text['p95_ms']:.1f} ms "
+                  f"({text['samples']} requests)")
+    print(f"\nupstream calls: {upstream.get('calls')}")
+    print(f"injected failures: {upstream.get('failures')}")
+
+
+async def run(args) -> list:
+    songs = [
+        {"artist": f"Artist {i % 37}", "title": f"Song {i}", "language": random.choice(["en", "uk"]),
+         "style": "album cover"}
+        for i in range(args.songs)
+    ]
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    await wait_until_up(f"http://127.0.0.1:{args.stub_port}/stats")
+    await wait_until_up(f"{base_url}/readyz")
+    results = []
+    for scenario in args.scenarios:
+        print(f"Running {scenario} at concurrency {args.concurrency} for {args.duration}s...")
+        results.append(await run_scenario(base_url, scenario, args.concurrency, args.duration, songs))
+    async with httpx.AsyncClient() as client:
+        upstream = (await client.get(f"http://127.0.0.1:{args.stub_port}/stats")).json()
+    print_report(results, upstream)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--songs", type=int, default=200, help="distinct songs to draw requests from")
+    parser.add_argument("--latency", default="", help="stub latency per provider, e.g. openai_chat=0.8")
+    parser.add_argument("--errors", default="", help="stub error rate per provider, e.g. genius_page=0.01")
+    parser.add_argument("--page-kb", type=int, default=300, help="size of stub Genius pages")
+    parser.add_argument("--redis-url", help="use this Redis instead of an in-memory fake (it will be written to)")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--serve-app", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--fake-redis", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_app:
+        serve_app(args.app_port, args.fake_redis)
+        return 0
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    log_dir = tempfile.mkdtemp(prefix="load-test-")
+    stubs, app = start_processes(args, log_dir)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        for process in (app, stubs):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        print(f"\nservice and stub logs: {log_dir}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Benchmark the streaming lyrics extractor against the legacy regex scraper.
+
+Usage:
+    python bench/lyrics_extractor_bench.py PAGES_DIR [--repeat 5] [--chunk-size 16384]
+    python bench/lyrics_extractor_bench.py --synthesize 50 [--out DIR]
+
+PAGES_DIR holds saved Genius song pages as *.html. If NAME.txt sits next to
+NAME.html it is treated as the expected lyrics and used to score correctness.
+--synthesize writes Genius-like pages (several containers, nested markup,
+excluded blocks, a large footer) with matching .txt files, for a quick run
+without scraping real pages.
+"""
+import argparse
+import difflib
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lyrics_extractor import LyricsExtractor, extract_json_lyrics  # noqa: E402
+
+
+def legacy_extract(html: str):
+    """The regex extraction fetch_lyrics used before the streaming extractor."""
+    match = re.search(r'<div[^>]*data-lyrics-container[^>]*>(.*?)</div>', html, re.DOTALL)
+    if match:
+        lyrics = re.sub(r'<[^>]+>', '\n', match.group(1))
+        lyrics = re.sub(r'\[.*?\]', '', lyrics)
+        lyrics = re.sub(r'\n+', '\n', lyrics).strip()
+        if lyrics:
+            return lyrics
+    return extract_json_lyrics(html)
+
+
+def streaming_extract(html: str, chunk_size: int):
+    """Feed the page in download-sized chunks; returns (lyrics, chars consumed)."""
+    extractor = LyricsExtractor()
+    consumed = 0
+    for start in range(0, len(html), chunk_size):
+        chunk = html[start:start + chunk_size]
+        extractor.feed(chunk)
+        consumed += len(chunk)
+        if extractor.done:
+            break
+    return extractor.lyrics() or extract_json_lyrics(html), consumed
+
+
+def load_corpus(directory: str):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            html = f.read()
+        expected = None
+        expected_path = os.path.join(directory, name[:-5] + ".txt")
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                expected = f.read().strip()
+        pages.append((name, html, expected))
+    return pages
+
+
+def score(results, pages):
+    checked = exact = 0
+    similarity = 0.0
+    for lyrics, (_, _, expected) in zip(results, pages):
+        if expected is None:
+            continue
+        checked += 1
+        lyrics = lyrics or ""
+        exact += lyrics == expected
+        similarity += difflib.SequenceMatcher(None, lyrics, expected).ratio()
+    found = sum(1 for lyrics in results if lyrics)
+    return {
+        "found": found,
+        "checked": checked,
+        "exact": exact,
+        "similarity": similarity / checked if checked else None,
+    }
+
+
+def run(pages, repeat: int, chunk_size: int):
+    total_chars = sum(len(html) for _, html, _ in pages)
+    rows = []
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        legacy = [legacy_extract(html) for _, html, _ in pages]
+    elapsed = time.perf_counter() - start
+    rows.append(("legacy regex", elapsed, total_chars * repeat, score(legacy, pages)))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        streamed = [streaming_extract(html, chunk_size) for _, html, _ in pages]
+    elapsed = time.perf_counter() - start
+    consumed = sum(c for _, c in streamed)
+    rows.append(("streaming parser", elapsed, consumed * repeat, score([l for l, _ in streamed], pages)))
+
+    print(f"{len(pages)} pages, {total_chars / 1e6:.2f} MB, repeat={repeat}, chunk={chunk_size}")
+    print(f"streaming parser read {consumed / total_chars * 100:.1f}% of the page bytes before stopping")
+    print()
+    print(f"{'extractor':<18}{'pages/s':>10}{'MB/s':>10}{'ms/page':>10}{'found':>8}{'exact':>8}{'similarity':>12}")
+    for label, elapsed, chars, s in rows:
+        page_count = len(pages) * repeat
+        sim = f"{s['similarity']:.3f}" if s["similarity"] is not None else "n/a"
+        exact = f"{s['exact']}/{s['checked']}" if s["checked"] else "n/a"
+        print(
+            f"{label:<18}{page_count / elapsed:>10.1f}{chars / 1e6 / elapsed:>10.2f}"
+            f"{elapsed / page_count * 1000:>10.2f}{s['found']:>8}{exact:>8}{sim:>12}"
+        )
+
+
+WORDS = "love night road fire heart rain light dream home time world soul sky river stone gold".split()
+
+
+def synthesize(directory: str, count: int, seed: int = 7):
+    """Write Genius-like pages with known lyrics so the benchmark can run offline."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for n in range(count):
+        sections = []
+        expected = []
+        for s in range(rng.randint(2, 5)):
+            lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))) for _ in range(rng.randint(3, 8))]
+            expected.extend(lines)
+            body = "<br/>".join(
+                f'<a href="/annotation/{n}-{s}-{i}"><span class="ReferentFragment">{line}</span></a>'
+                if i % 3 == 0 else line
+                for i, line in enumerate(lines)
+            )
+            sections.append(
+                f'<div data-lyrics-container="true" class="Lyrics__Container">[Verse {s + 1}]<br/>{body}'
+                f'<div data-exclude-from-selection="true"><div class="InreadAd">You might also like</div></div></div>'
+            )
+        head = "<html><head><title>Song</title>" + "<script>var x = 1;</script>" * 200 + "</head><body>"
+        lyrics_root = '<div id="lyrics-root"><div class="LyricsHeader">Lyrics</div>' + "".join(sections) + "</div>"
+        footer = "<div class='Footer'>" + "<div class='Related'><a href='#'>more</a></div>" * 3000 + "</div>"
+        with open(os.path.join(directory, f"song{n:04d}.html"), "w", encoding="utf-8") as f:
+            f.write(head + lyrics_root + footer + "</body></html>")
+        with open(os.path.join(directory, f"song{n:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(expected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages_dir", nargs="?", help="directory of saved *.html pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024, help="characters per streamed chunk")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="generate N synthetic pages and benchmark them")
+    parser.add_argument("--out", help="where to write synthetic pages (default: a temp dir)")
+    args = parser.parse_args()
+
+    directory = args.pages_dir
+    if args.synthesize:
+        directory = args.out or tempfile.mkdtemp(prefix="lyrics-pages-")
+        synthesize(directory, args.synthesize)
+        print(f"wrote {args.synthesize} synthetic pages to {directory}")
+    if not directory:
+        parser.error("PAGES_DIR or --synthesize is required")
+
+    pages = load_corpus(directory)
+    if not pages:
+        parser.error(f"no *.html pages in {directory}")
+    run(pages, args.repeat, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
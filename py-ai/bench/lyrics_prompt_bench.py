@@ -0,0 +1,148 @@
+"""Benchmark lyrics preparation for the summary prompt: token reduction and throughput.
+
+Usage:
+    python bench/lyrics_prompt_bench.py LYRICS_DIR [--budget 1200] [--repeat 5] [--show NAME]
+    python bench/lyrics_prompt_bench.py --synthesize 200 [--out DIR]
+
+LYRICS_DIR holds lyrics as *.txt, as the scraper returns them (or as
+copied from a lyrics page, section labels included). --synthesize writes
+songs with verses, a repeated chorus, back-to-back repeated lines and some
+page leftovers (entities, stray tags, "You might also like", "Embed"),
+about half of them in Ukrainian, for a quick run without real lyrics.
+Token counts are exact when tiktoken is installed and estimated otherwise.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lyrics_prompt  # noqa: E402
+from lyrics_prompt import LyricsPreparer  # noqa: E402
+
+
+def load_corpus(directory: str):
+    songs = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".txt"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                songs.append((name, f.read()))
+    return songs
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(songs, budget: int, repeat: int):
+    preparer = LyricsPreparer(budget)
+    results = [preparer.prepare(lyrics) for _, lyrics in songs]
+
+    timings = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, lyrics in songs:
+            t0 = time.perf_counter()
+            preparer.prepare(lyrics)
+            timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    tokens_in = [before for _, before, _ in results]
+    tokens_out = [after for _, _, after in results]
+    reductions = [(1 - after / before) * 100 for before, after in zip(tokens_in, tokens_out) if before]
+    total_chars = sum(len(lyrics) for _, lyrics in songs)
+    over_budget = sum(1 for before in tokens_in if budget and before > budget)
+    tokenizer = "tiktoken o200k_base" if lyrics_prompt._encoding else "estimate"
+
+    print(f"{len(songs)} songs, {total_chars / 1e3:.0f}k chars, budget={budget or 'none'}, tokenizer={tokenizer}")
+    print()
+    print(f"{'':<20}{'raw':>10}{'prepared':>10}")
+    print(f"{'tokens total':<20}{sum(tokens_in):>10}{sum(tokens_out):>10}")
+    print(f"{'tokens p50':<20}{percentile(tokens_in, 0.5):>10}{percentile(tokens_out, 0.5):>10}")
+    print(f"{'tokens p95':<20}{percentile(tokens_in, 0.95):>10}{percentile(tokens_out, 0.95):>10}")
+    print(f"{'tokens max':<20}{max(tokens_in):>10}{max(tokens_out):>10}")
+    print()
+    print(f"token reduction: {(1 - sum(tokens_out) / sum(tokens_in)) * 100:.1f}% overall, "
+          f"{statistics.mean(reductions):.1f}% mean per song")
+    print(f"over budget before: {over_budget}, trimmed to fit: {preparer.stats['trimmed'] // (repeat + 1)}")
+    print(f"throughput: {len(timings) / elapsed:.0f} songs/s, {total_chars * repeat / 1e6 / elapsed:.2f} MB/s, "
+          f"p50 {percentile(timings, 0.5) * 1000:.3f} ms, p99 {percentile(timings, 0.99) * 1000:.3f} ms per song")
+
+
+EN_WORDS = "love night road fire heart rain light dream home time world soul sky river stone gold".split()
+UK_WORDS = "кохання ніч дорога вогонь серце дощ світло мрія дім час світ душа небо ріка камінь золото".split()
+
+
+def synthesize(directory: str, count: int, seed: int = 7):
+    """Write lyrics shaped like real scrapes so the benchmark can run offline."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for n in range(count):
+        words = UK_WORDS if n % 2 else EN_WORDS
+
+        def line():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(4, 9)))
+
+        chorus = [line() for _ in range(rng.randint(4, 6))]
+        chorus[0] = f"{chorus[0]} (x2)" if rng.random() < 0.3 else chorus[0]
+        hook = line()
+        labelled = rng.random() < 0.4
+        out = [f"{rng.randint(1, 300)} Contributors{' Translations' if n % 3 == 0 else ''} Song {n} Lyrics"]
+        # Some songs run long (extended mixes, medleys) and go over the budget
+        verses = rng.randint(8, 14) if rng.random() < 0.1 else rng.randint(2, 4)
+        for verse in range(verses):
+            if labelled:
+                out.append(f"[Verse {verse + 1}]")
+            out.extend(line() for _ in range(rng.randint(4, 8 if verses < 8 else 16)))
+            if rng.random() < 0.3:
+                out.append("You might also like")
+            if labelled:
+                out.append("[Chorus]")
+            out.extend(chorus)
+            out.extend([hook] * rng.randint(1, 4))
+        out = [
+            text.replace(" ", "&nbsp;", 1) if rng.random() < 0.05 else
+            f"<i>{text}</i>" if rng.random() < 0.03 else
+            f"{text}\u200b  " if rng.random() < 0.05 else text
+            for text in out
+        ]
+        out[-1] += f"{rng.randint(1, 99)}Embed"
+        with open(os.path.join(directory, f"song{n:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(out))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("lyrics_dir", nargs="?", help="directory of *.txt lyrics")
+    parser.add_argument("--budget", type=int, default=1200, help="token budget (0: no limit)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--show", metavar="NAME", help="print one song before and after preparation")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="generate N synthetic songs and benchmark them")
+    parser.add_argument("--out", help="where to write synthetic songs (default: a temp dir)")
+    args = parser.parse_args()
+
+    directory = args.lyrics_dir
+    if args.synthesize:
+        directory = args.out or tempfile.mkdtemp(prefix="lyrics-text-")
+        synthesize(directory, args.synthesize)
+        print(f"wrote {args.synthesize} synthetic songs to {directory}")
+    if not directory:
+        parser.error("LYRICS_DIR or --synthesize is required")
+
+    songs = load_corpus(directory)
+    if not songs:
+        parser.error(f"no *.txt lyrics in {directory}")
+    if args.show:
+        lyrics = dict(songs)[args.show]
+        text, before, after = LyricsPreparer(args.budget).prepare(lyrics)
+        print(f"--- raw ({before} tokens)\n{lyrics}\n--- prepared ({after} tokens)\n{text}\n")
+    run(songs, args.budget, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Local stand-ins for the Genius, Spotify and OpenAI APIs, for offline benchmarks.
+
+Usage:
+    python bench/upstream_stubs.py --port 9100 \\
+        --latency genius_search=0.08,genius_page=0.15,spotify=0.05,openai_chat=0.8,openai_images=2.0 \\
+        --errors openai_chat=0.02 --page-kb 300
+
+Every endpoint sleeps for its configured latency (±25% jitter) and fails with
+a 503 at its configured error rate. Chat completions with "stream": true send
+the first token after a quarter of that latency and the rest over the remainder. Point the service at it with
+GENIUS_API_BASE/GENIUS_WEB_BASE/SPOTIFY_API_BASE=http://127.0.0.1:9100 and
+OPENAI_BASE_URL=http://127.0.0.1:9100/v1 (load_test.py does this for you).
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+
+PROVIDERS = ("genius_search", "genius_page", "spotify", "openai_chat", "openai_images")
+DEFAULT_LATENCY = {
+    "genius_search": 0.08,
+    "genius_page": 0.15,
+    "spotify": 0.05,
+    "openai_chat": 0.8,
+    "openai_images": 2.0,
+}
+STUB_SUMMARY = (
+    "A stub summary about longing, distance and trust. The narrator writes to someone far away, "
+    "weighing old promises against new doubts, and settles on keeping faith."
+)
+# Streamed completions send their first token after this share of the latency, the rest spread over the tokens
+FIRST_TOKEN_SHARE = 0.25
+
+
+def parse_rates(spec: str, defaults: dict) -> dict:
+    """Parse "name=value,name=value" into a dict of floats over defaults."""
+    rates = dict(defaults)
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, value = part.partition("=")
+        if name not in PROVIDERS:
+            raise ValueError(f"unknown provider {name!r}; expected one of {', '.join(PROVIDERS)}")
+        rates[name] = float(value)
+    return rates
+
+
+def song_id(query: str) -> int:
+    return int(hashlib.sha1(query.lower().encode("utf-8")).hexdigest()[:8], 16)
+
+
+def lyrics_page(song: int, page_kb: int) -> str:
+    rng = random.Random(song)
+    words = "love night road fire heart rain light dream home time world soul sky river stone gold".split()
+    verses = []
+    for verse in range(4):
+        lines = "<br/>".join(" ".join(rng.choice(words) for _ in range(6)) for _ in range(6))
+        verses.append(f'<div data-lyrics-container="true">[Verse {verse + 1}]<br/>{lines}</div>')
+    lyrics = '<div id="lyrics-root">' + "".join(verses) + "</div>"
+    # Pad with head scripts and footer markup so pages weigh what real ones do
+    filler = "<div class='Related'><a href='#'>more songs</a></div>"
+    padding = max(0, page_kb * 1024 - len(lyrics)) // len(filler)
+    head = "<script>window.__PRELOADED__ = {};</script>" * (padding // 3)
+    return f"<html><head>{head}</head><body>{lyrics}{filler * (padding - padding // 3)}</body></html>"
+
+
+def png_image(seed: int, side: int = 256) -> bytes:
+    """A small solid-colour PNG, standing in for a generated image."""
+    rng = random.Random(seed)
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    rows = b"".join(b"\x00" + pixel * side for _ in range(side))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def create_app(latency: dict, errors: dict, page_kb: int) -> FastAPI:
+    app = FastAPI(title="Upstream stubs")
+    app.state.calls = {name: 0 for name in PROVIDERS}
+    app.state.failures = {name: 0 for name in PROVIDERS}
+
+    async def simulate(name: str, delay: Optional[float] = None):
+        """Wait out the provider's latency (or delay); return an error response if this call should fail."""
+        app.state.calls[name] += 1
+        await asyncio.sleep(latency[name] * random.uniform(0.75, 1.25) if delay is None else delay)
+        if random.random() < errors.get(name, 0.0):
+            app.state.failures[name] += 1
+            return JSONResponse({"error": f"injected {name} failure"}, status_code=503)
+        return None
+
+    @app.get("/search")
+    async def genius_search(q: str):
+        if failure := await simulate("genius_search"):
+            return failure
+        song = song_id(q)
+        title, _, artist = q.rpartition(" ")
+        return {"response": {"hits": [{"result": {
+            "id": song,
+            "title": title or q,
+            "path": f"/songs/{song}-lyrics",
+            "primary_artist": {"name": artist},
+        }}]}}
+
+    @app.get("/songs/{slug}")
+    async def genius_page(slug: str):
+        if failure := await simulate("genius_page"):
+            return failure
+        return HTMLResponse(lyrics_page(int(slug.split("-")[0]), page_kb))
+
+    @app.get("/v1/search")
+    async def spotify_search(q: str):
+        if failure := await simulate("spotify"):
+            return failure
+        track = str(song_id(q))
+        return {"tracks": {"items": [{
+            "id": track,
+            "name": q,
+            "artists": [{"name": "Stub Artist"}],
+            "preview_url": None,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track}"},
+            "album": {"images": []},
+        }]}}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return await stream_chat_completion(body)
+        if failure := await simulate("openai_chat"):
+            return failure
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": STUB_SUMMARY},
+            }],
+            "usage": {"prompt_tokens": 400, "completion_tokens": 120, "total_tokens": 520},
+        }
+
+    async def stream_chat_completion(body: dict):
+        """Stream STUB_SUMMARY as chat.completion.chunk events, over the same total latency."""
+        total = latency["openai_chat"] * random.uniform(0.75, 1.25)
+        if failure := await simulate("openai_chat", total * FIRST_TOKEN_SHARE):
+            return failure
+        tokens = re.findall(r"\S+\s*", STUB_SUMMARY)
+        step = total * (1 - FIRST_TOKEN_SHARE) / len(tokens)
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            return "data: " + json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o-mini"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }) + "\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                yield chunk({"content": token})
+                await asyncio.sleep(step)
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/images/generations")
+    async def image_generations(request: Request):
+        body = await request.json()
+        if failure := await simulate("openai_images"):
+            return failure
+        seed = random.getrandbits(48)
+        if body.get("response_format") == "b64_json":
+            image = {"b64_json": base64.b64encode(png_image(seed)).decode("ascii")}
+        else:
+            image = {"url": f"https://images.example/{seed:x}.png"}
+        return {"created": int(time.time()), "data": [image]}
+
+    @app.get("/stats")
+    def stats():
+        return {"calls": app.state.calls, "failures": app.state.failures}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="", help="per-provider mean latency in seconds")
+    parser.add_argument("--errors", default="", help="per-provider error rate between 0 and 1")
+    parser.add_argument("--page-kb", type=int, default=300, help="size of the stub Genius song pages")
+    args = parser.parse_args()
+    app = create_app(
+        parse_rates(args.latency, DEFAULT_LATENCY),
+        parse_rates(args.errors, {name: 0.0 for name in PROVIDERS}),
+        args.page_kb,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
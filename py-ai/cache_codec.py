@@ -0,0 +1,109 @@
+import base64
+import logging
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Encoded values look like "\x1f<codec><version>:<payload>". Values without the
+# marker are plain text: small ones, and everything written before the envelope.
+ENVELOPE_MARK = "\x1f"
+ENVELOPE_VERSION = "1"
+RAW, ZLIB, ZSTD = "r", "z", "s"
+
+
+class CacheCodec:
+    """Versioned cache value envelope with transparent compression above a size threshold.
+
+    Compressed payloads are base85 text, because the shared Redis client
+    decodes every response as UTF-8. A value is only stored compressed when
+    that actually makes it smaller.
+    """
+
+    def __init__(self, threshold: int = 512, algorithm: str = "zlib", level: Optional[int] = None):
+        if algorithm == "zstd" and zstandard is None:
+            logger.warning("zstandard package not installed. Falling back to zlib cache compression.")
+            algorithm = "zlib"
+        self.threshold = threshold
+        self.algorithm = algorithm
+        if algorithm == "zstd":
+            self._codec = ZSTD
+            self._compressor = zstandard.ZstdCompressor(level=level or 3)
+        else:
+            self._codec = ZLIB
+            self._level = level or 6
+        self.stats = {
+            "encoded": 0,
+            "compressed": 0,
+            "decoded": 0,
+            "decode_errors": 0,
+            "raw_bytes": 0,  # UTF-8 size of the values written
+            "stored_bytes": 0,  # size actually sent to Redis
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def encode(self, value: str) -> str:
+        raw = value.encode("utf-8")
+        self.stats["encoded"] += 1
+        self.stats["raw_bytes"] += len(raw)
+        encoded = value
+        if self.enabled and len(raw) >= self.threshold:
+            packed = self._envelope(self._codec, base64.b85encode(self._compress(raw)).decode("ascii"))
+            if len(packed) < len(raw):
+                encoded = packed
+                self.stats["compressed"] += 1
+        if encoded is value and value.startswith(ENVELOPE_MARK):
+            # A plain value must never be mistaken for an envelope
+            encoded = self._envelope(RAW, value)
+        self.stats["stored_bytes"] += len(encoded.encode("utf-8"))
+        return encoded
+
+    def decode(self, value: Optional[str]) -> Optional[str]:
+        if not value or not value.startswith(ENVELOPE_MARK):
+            return value
+        try:
+            header, payload = value[1:].split(":", 1)
+            codec, version = header[0], header[1:]
+            if version != ENVELOPE_VERSION:
+                raise ValueError(f"unsupported envelope version {version!r}")
+            self.stats["decoded"] += 1
+            if codec == RAW:
+                return payload
+            data = base64.b85decode(payload)
+            if codec == ZLIB:
+                return zlib.decompress(data).decode("utf-8")
+            if codec == ZSTD:
+                if zstandard is None:
+                    raise ValueError("zstd value but zstandard is not installed")
+                return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+            raise ValueError(f"unknown codec {codec!r}")
+        except Exception as e:
+            self.stats["decode_errors"] += 1
+            logger.error(f"Cache value decode error: {e}")
+            return None
+
+    def snapshot(self) -> dict:
+        raw, stored = self.stats["raw_bytes"], self.stats["stored_bytes"]
+        return {
+            **self.stats,
+            "algorithm": self.algorithm,
+            "threshold": self.threshold,
+            "saved_bytes": raw - stored,
+            "ratio": round(stored / raw, 3) if raw else None,
+        }
+
+    def _envelope(self, codec: str, payload: str) -> str:
+        return f"{ENVELOPE_MARK}{codec}{ENVELOPE_VERSION}:{payload}"
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._codec == ZSTD:
+            return self._compressor.compress(data)
+        return zlib.compress(data, self._level)
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at);
+CREATE INDEX IF NOT EXISTS cache_lru ON cache (dirty, accessed);
+CREATE INDEX IF NOT EXISTS cache_dirty ON cache (dirty) WHERE dirty = 1;
+"""
+# Re-stamp an entry's access time (its LRU position) at most this often
+TOUCH_INTERVAL = 60
+EVICT_BATCH = 500
+
+
+class DiskCache:
+    """Cache entries in a local SQLite file (WAL mode), bounded by TTL and a byte budget.
+
+    Sits behind Redis so an outage degrades to local disk instead of to the
+    upstream APIs. Entries written while Redis could not take them are
+    flagged dirty and handed back by dirty() for write-back once it returns.
+    Past max_bytes, expired entries go first, then the least recently read
+    clean ones, then dirty ones. Several workers can share one file; each
+    estimates the size from its own writes and recounts before evicting.
+
+    All SQLite work runs on one dedicated thread, off the event loop.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+        self._bytes = 0
+        self._entries = 0
+        self._dirty = 0
+        self.stats = {
+            "hits": 0, "misses": 0, "sets": 0, "dirty_sets": 0, "written_back": 0,
+            "evictions": 0, "expired_purged": 0, "errors": 0,
+        }
+
+    @property
+    def ready(self) -> bool:
+        return self._db is not None
+
+    async def start(self) -> None:
+        self._entries, self._bytes, self._dirty = await self._run(self._open)
+        logger.info(f"Disk cache ready at {self.path}: {self._entries} entries, {self._bytes} bytes")
+
+    async def close(self) -> None:
+        if self._db is not None:
+            db, self._db = self._db, None
+            await self._run(db.close)
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """The stored (encoded) value and its remaining TTL in seconds, or (None, None)."""
+        rows = await self.get_many([key])
+        return rows[0] if rows else (None, None)
+
+    async def get_many(self, keys: List[str]) -> List[Tuple[Optional[str], Optional[float]]]:
+        if not self.ready:
+            return [(None, None)] * len(keys)
+        try:
+            rows = await self._run(self._read, keys)
+        except Exception as e:
+            self._record_error("read", e)
+            return [(None, None)] * len(keys)
+        hits = sum(1 for value, _ in rows if value is not None)
+        self.stats["hits"] += hits
+        self.stats["misses"] += len(rows) - hits
+        return rows
+
+    async def set(self, key: str, value: str, ttl_seconds: float, dirty: bool = False) -> bool:
+        return await self.set_many([(key, value, ttl_seconds)], dirty)
+
+    async def set_many(self, items: List[Tuple[str, str, float]], dirty: bool = False) -> bool:
+        """Store (key, encoded value, ttl_seconds) entries; dirty ones are owed to Redis."""
+        if not self.ready or not items:
+            return False
+        try:
+            added_entries, added_bytes, added_dirty, evicted = await self._run(self._write, items, dirty)
+        except Exception as e:
+            self._record_error("write", e)
+            return False
+        self.stats["sets"] += len(items)
+        if dirty:
+            self.stats["dirty_sets"] += len(items)
+        if evicted is not None:
+            self._entries, self._bytes, self._dirty, count = evicted
+            self.stats["evictions"] += count
+        else:
+            self._entries += added_entries
+            self._bytes += added_bytes
+            self._dirty += added_dirty
+        return True
+
+    async def dirty(self, limit: int = 200) -> List[Tuple[str, str, float]]:
+        """Unexpired entries waiting for write-back, as (key, encoded value, remaining ttl), oldest first."""
+        if not self.ready:
+            return []
+        try:
+            return await self._run(self._read_dirty, limit)
+        except Exception as e:
+            self._record_error("read dirty", e)
+            return []
+
+    async def mark_clean(self, entries: List[Tuple[str, str]]) -> None:
+        """Clear the dirty flag of (key, encoded value) pairs, unless the key was rewritten since."""
+        if not self.ready or not entries:
+            return
+        try:
+            cleaned = await self._run(self._mark_clean, entries)
+        except Exception as e:
+            self._record_error("mark clean", e)
+            return
+        self._dirty = max(0, self._dirty - cleaned)
+        self.stats["written_back"] += cleaned
+
+    async def purge_expired(self) -> int:
+        if not self.ready:
+            return 0
+        try:
+            purged, self._entries, self._bytes, self._dirty = await self._run(self._purge_expired)
+        except Exception as e:
+            self._record_error("purge", e)
+            return 0
+        self.stats["expired_purged"] += purged
+        return purged
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "path": self.path,
+            "entries": self._entries,
+            "dirty": self._dirty,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "usage": round(self._bytes / self.max_bytes * 100, 2) if self.max_bytes else None,
+        }
+
+    def _record_error(self, action: str, e: Exception) -> None:
+        self.stats["errors"] += 1
+        logger.error(f"Disk cache {action} error: {e}")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # Everything below runs on the disk-cache thread.
+    def _open(self) -> tuple:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a crash can lose the last commits, never corrupt the file
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA mmap_size={min(self.max_bytes, 256 * 1024 * 1024)}")
+        db.executescript(SCHEMA)
+        self._db = db
+        return self._totals()
+
+    def _totals(self) -> tuple:
+        entries, size, dirty = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(dirty), 0) FROM cache"
+        ).fetchone()
+        return entries, size, dirty
+
+    def _read(self, keys: List[str]) -> list:
+        now = time.time()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found.update(
+                (key, (value, expires_at, accessed))
+                for key, value, expires_at, accessed in self._db.execute(
+                    f"SELECT key, value, expires_at, accessed FROM cache WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        rows, touched = [], []
+        for key in keys:
+            entry = found.get(key)
+            if entry is None or entry[1] <= now:
+                rows.append((None, None))
+                continue
+            value, expires_at, accessed = entry
+            rows.append((value, expires_at - now))
+            if now - accessed > TOUCH_INTERVAL:
+                touched.append((now, key))
+        if touched:
+            self._db.executemany("UPDATE cache SET accessed = ? WHERE key = ?", touched)
+        return rows
+
+    def _write(self, items: List[Tuple[str, str, float]], dirty: bool) -> tuple:
+        now = time.time()
+        keys = [key for key, _, _ in items]
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            old = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                old.update(
+                    (key, (size, was_dirty))
+                    for key, size, was_dirty in self._db.execute(
+                        f"SELECT key, size, dirty FROM cache WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+                    )
+                )
+            rows = [
+                (key, value, now + ttl, now, len(key) + len(value), int(dirty))
+                for key, value, ttl in items
+            ]
+            self._db.executemany(
+                "INSERT INTO cache (key, value, expires_at, accessed, size, dirty) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+                "accessed = excluded.accessed, size = excluded.size, dirty = excluded.dirty",
+                rows,
+            )
+        added_entries = sum(1 for key in keys if key not in old)
+        added_bytes = sum(row[4] for row in rows) - sum(size for size, _ in old.values())
+        added_dirty = int(dirty) * len(rows) - sum(was_dirty for _, was_dirty in old.values())
+        evicted = None
+        if self._bytes + added_bytes > self.max_bytes:
+            evicted = self._evict()
+        return added_entries, added_bytes, added_dirty, evicted
+
+    def _evict(self) -> tuple:
+        """Delete expired, then least recently read entries until under budget; returns new totals and count."""
+        now = time.time()
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        entries, total, dirty = self._totals()
+        # Go a little under budget so every write doesn't trigger an eviction
+        target = self.max_bytes * 0.9
+        evicted = 0
+        while total > target:
+            victims = self._db.execute(
+                "SELECT key, size, dirty FROM cache ORDER BY dirty, accessed LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not victims:
+                break
+            chosen = []
+            for key, size, was_dirty in victims:
+                if total <= target:
+                    break
+                chosen.append((key,))
+                total -= size
+                dirty -= was_dirty
+            self._db.executemany("DELETE FROM cache WHERE key = ?", chosen)
+            evicted += len(chosen)
+            entries -= len(chosen)
+        return entries, total, dirty, evicted
+
+    def _read_dirty(self, limit: int) -> list:
+        now = time.time()
+        return [
+            (key, value, expires_at - now)
+            for key, value, expires_at in self._db.execute(
+                "SELECT key, value, expires_at FROM cache WHERE dirty = 1 AND expires_at > ? ORDER BY accessed LIMIT ?",
+                (now, limit),
+            )
+        ]
+
+    def _mark_clean(self, entries: List[Tuple[str, str]]) -> int:
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            return self._db.executemany(
+                "UPDATE cache SET dirty = 0 WHERE key = ? AND value = ? AND dirty = 1", entries
+            ).rowcount
+
+    def _purge_expired(self) -> tuple:
+        purged = self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        return (purged, *self._totals())
@@ -0,0 +1,75 @@
+import time
+from typing import Dict, List, Tuple
+
+
+class HotKeyTracker:
+    """Approximate per-key read counts with a count-min sketch and keep the top keys.
+
+    The sketch has a fixed size no matter how many distinct keys are read, and
+    only the current top_k candidates are stored by name. Counts are halved
+    every decay_interval seconds so the ranking follows recent traffic.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, top_k: int = 100, decay_interval: float = 300.0):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.decay_interval = decay_interval
+        self._rows = [[0] * width for _ in range(depth)]
+        self._top: Dict[str, int] = {}
+        self._floor = 0  # smallest count in _top once it is full
+        self._next_decay = time.monotonic() + decay_interval
+        self.total = 0
+
+    def add(self, key: str) -> int:
+        """Count one read of key and return its estimated count."""
+        now = time.monotonic()
+        if now >= self._next_decay:
+            self._decay()
+            self._next_decay = now + self.decay_interval
+        self.total += 1
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += 1
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        if key in self._top:
+            self._top[key] = estimate
+        elif len(self._top) < self.top_k:
+            self._top[key] = estimate
+            if len(self._top) == self.top_k:
+                self._floor = min(self._top.values())
+        elif estimate > self._floor:
+            del self._top[min(self._top, key=self._top.get)]
+            self._top[key] = estimate
+            self._floor = min(self._top.values())
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def top(self, limit: int = 20) -> List[Tuple[str, int]]:
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def snapshot(self) -> dict:
+        return {
+            "tracked": len(self._top),
+            "reads": self.total,
+            "top_k": self.top_k,
+            "sketch": f"{self.depth}x{self.width}",
+            "decay_interval": self.decay_interval,
+        }
+
+    def _indexes(self, key: str):
+        # Double hashing derives every row's column from a single hash
+        h = hash(key)
+        step = (h >> 16) | 1
+        return [(h + i * step) % self.width for i in range(self.depth)]
+
+    def _decay(self) -> None:
+        for row in self._rows:
+            for i, count in enumerate(row):
+                if count:
+                    row[i] = count >> 1
+        self._top = {key: count >> 1 for key, count in self._top.items() if count > 1}
+        self._floor = min(self._top.values()) if len(self._top) >= self.top_k else 0
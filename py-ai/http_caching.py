@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except Exception:
+    orjson = None  # type: ignore
+
+try:
+    import brotli
+except Exception:
+    brotli = None  # type: ignore
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript", "image/svg+xml")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed, compact json otherwise."""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cacheable_json(request: Request, content, cache_control: str) -> Response:
+    """Serialize content once and tag it with a strong ETag of the bytes.
+
+    A GET or HEAD whose If-None-Match already has that ETag gets an empty
+    304, so a repeat view only costs the headers. Any other method gets 412
+    Precondition Failed instead (RFC 9110 13.1.2): 304 only answers reads.
+    """
+    response = FastJSONResponse(content, headers={"cache-control": cache_control})
+    etag = f'"{hashlib.sha256(response.body).hexdigest()[:32]}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if request.method not in ("GET", "HEAD"):
+            return Response(status_code=412, headers={"etag": etag})
+        return Response(status_code=304, headers={"etag": etag, "cache-control": cache_control})
+    response.headers["etag"] = etag
+    return response
+
+
+class CompressionMiddleware:
+    """Compress complete responses with brotli (when installed) or gzip, as the client accepts.
+
+    Only bodies sent in one piece are compressed; streamed responses (SSE,
+    NDJSON, files) go through untouched so nothing is held back. A strong
+    ETag becomes weak on the compressed variant.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # held until we see the body
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            if message["type"] != "http.response.body" or not self._compressible(start["status"], headers):
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send({**start, "headers": headers.raw})
+                await send(message)
+                return
+            body = self._compress(encoding, body)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = f"W/{etag}"
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _negotiate(self, accept_encoding: str) -> Optional[str]:
+        accepted = {}
+        for part in accept_encoding.lower().split(","):
+            name, _, params = part.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name] = quality
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def _compressible(self, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
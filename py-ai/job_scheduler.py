@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, job_id: str, fn: Callable[[], Awaitable], priority: str):
+        self.job_id = job_id
+        self.fn = fn
+        self.priority = priority
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+
+
+class JobScheduler:
+    """Run background jobs on a fixed pool of workers fed by a bounded priority queue.
+
+    Interactive jobs are always dequeued before bulk ones. Submitting past the
+    queue depth limit raises QueueFullError with a Retry-After estimate based
+    on recent job durations.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._counter = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._worker_tasks = []
+        self._avg_duration = 10.0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+        }
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.task and not job.task.done())
+
+    def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for job in list(self._jobs.values()):
+            self.cancel(job.job_id)
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._jobs.clear()
+
+    def has_job(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def submit(self, job_id: str, fn: Callable[[], Awaitable], priority: str = "interactive") -> None:
+        if self._queue is None:
+            raise RuntimeError("JobScheduler.start() has not been called")
+        if self.queued >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        job = Job(job_id, fn, priority)
+        self._jobs[job_id] = job
+        self._queue.put_nowait((PRIORITIES.get(priority, 0), next(self._counter), job))
+        self.stats["submitted"] += 1
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        if job.task:
+            job.task.cancel()
+        return True
+
+    def retry_after(self) -> int:
+        """Estimate how long until a queue slot frees up."""
+        return max(1, math.ceil(self.queued / max(self.workers, 1) * self._avg_duration))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.cancelled:
+                    self.stats["cancelled"] += 1
+                    continue
+                started = time.monotonic()
+                job.task = asyncio.create_task(job.fn())
+                # asyncio.wait does not raise if the job is cancelled under us
+                await asyncio.wait([job.task])
+                if job.task.cancelled():
+                    self.stats["cancelled"] += 1
+                elif job.task.exception():
+                    self.stats["failed"] += 1
+                    logger.error(f"Job {job.job_id} failed: {job.task.exception()}")
+                else:
+                    self.stats["completed"] += 1
+                    # Exponential moving average feeds the Retry-After estimate
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+            finally:
+                self._jobs.pop(job.job_id, None)
+                self._queue.task_done()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queue": self.max_queue,
+            "avg_job_seconds": round(self._avg_duration, 2),
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import re
+from html.parser import HTMLParser
+from typing import AsyncIterator, List, Optional
+
+# Elements that never have an end tag, so they must not affect nesting depth
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+
+# Attribute markers that open the lyrics section; everything before the first
+# one is skipped with a plain string search instead of being tokenized
+START_MARKERS = ('id="lyrics-root"', "data-lyrics-container")
+# How much of an unmatched buffer to keep, so a tag split across chunks survives
+MAX_TAG_CARRY = 8192
+# Once inside the lyrics, text is tokenized in slices this big so parsing
+# stops shortly after the section closes instead of at the end of the chunk
+FEED_SLICE = 2048
+
+SECTION_HEADER = re.compile(r"\[.*?\]")
+JSON_LYRICS = re.compile(r'"lyrics":"([^"]*)"')
+
+
+class LyricsExtractor(HTMLParser):
+    """Incrementally pull lyrics out of a Genius song page.
+
+    Feed the page in chunks as it downloads. Text from every
+    data-lyrics-container element is collected, nested markup included, and
+    `done` becomes true once the lyrics section (#lyrics-root) closes so the
+    caller can stop reading the response. Blocks Genius marks with
+    data-exclude-from-selection (ads, "You might also like") are skipped.
+    Markup before the lyrics section is skipped without being tokenized.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.containers = 0
+        self.done = False
+        self._parts: List[str] = []
+        self._depth = 0  # nesting depth inside the current lyrics container
+        self._exclude_depth = 0
+        self._root_depth = 0
+        self._started = False
+        self._carry = ""
+
+    def feed(self, data: str) -> None:
+        if self.done:
+            return
+        if self._started:
+            self._feed_slices(data)
+            return
+        buffer = self._carry + data
+        found = [i for i in (buffer.find(marker) for marker in START_MARKERS) if i != -1]
+        if not found:
+            # Keep the trailing partial tag in case a marker straddles chunks
+            tag_start = buffer.rfind("<")
+            if tag_start == -1 or len(buffer) - tag_start > MAX_TAG_CARRY:
+                tag_start = max(0, len(buffer) - 64)
+            self._carry = buffer[tag_start:]
+            return
+        self._started = True
+        self._carry = ""
+        self._feed_slices(buffer[max(0, buffer.rfind("<", 0, min(found))):])
+
+    def _feed_slices(self, data: str) -> None:
+        for start in range(0, len(data), FEED_SLICE):
+            super().feed(data[start:start + FEED_SLICE])
+            if self.done:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br" and self._depth and not self._exclude_depth:
+                self._parts.append("\n")
+            return
+        if self._root_depth:
+            self._root_depth += 1
+        elif ("id", "lyrics-root") in attrs:
+            self._root_depth = 1
+        if self._depth:
+            self._depth += 1
+            if self._exclude_depth:
+                self._exclude_depth += 1
+            elif any(name == "data-exclude-from-selection" for name, _ in attrs):
+                self._exclude_depth = 1
+        elif any(name == "data-lyrics-container" for name, _ in attrs):
+            self._depth = 1
+            self.containers += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if self._exclude_depth:
+            self._exclude_depth -= 1
+        if self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self._parts.append("\n")
+        if self._root_depth:
+            self._root_depth -= 1
+            if not self._root_depth and self.containers:
+                self.done = True
+
+    def handle_data(self, data):
+        if self._depth and not self._exclude_depth:
+            self._parts.append(data)
+
+    def lyrics(self) -> Optional[str]:
+        """Return the cleaned lyrics text, or None if no container was found."""
+        if not self.containers:
+            return None
+        return clean_lyrics("".join(self._parts))
+
+
+def clean_lyrics(text: str) -> str:
+    """Drop [Section] headers and blank lines, as the page scraper always has."""
+    text = SECTION_HEADER.sub("", text)
+    lines = (line.strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def extract_json_lyrics(html: str) -> Optional[str]:
+    """Fallback for pages that embed lyrics in a JSON blob instead of containers."""
+    match = JSON_LYRICS.search(html)
+    if not match:
+        return None
+    lyrics = match.group(1).replace('\\n', '\n').replace('\\"', '"').strip()
+    return lyrics or None
+
+
+def extract_lyrics(html: str) -> Optional[str]:
+    """Extract lyrics from a complete page (used by the benchmark and tests)."""
+    extractor = LyricsExtractor()
+    extractor.feed(html)
+    return extractor.lyrics() or extract_json_lyrics(html)
+
+
+async def extract_lyrics_from_stream(
+    chunks: AsyncIterator[str], executor=None, batch_chars: int = 64 * 1024
+) -> Optional[str]:
+    """Parse a page as it streams in, off the event loop, stopping once the lyrics end.
+
+    Chunks are batched so each executor hop parses a meaningful amount of
+    HTML. The raw page is only retained while no lyrics container has been
+    seen, for the JSON fallback.
+    """
+    loop = asyncio.get_running_loop()
+    extractor = LyricsExtractor()
+    raw: List[str] = []
+    pending: List[str] = []
+    pending_chars = 0
+
+    async def flush():
+        nonlocal pending, pending_chars
+        batch = "".join(pending)
+        pending, pending_chars = [], 0
+        if not extractor.containers:
+            raw.append(batch)
+        await loop.run_in_executor(executor, extractor.feed, batch)
+        if extractor.containers:
+            raw.clear()
+
+    async for chunk in chunks:
+        pending.append(chunk)
+        pending_chars += len(chunk)
+        if pending_chars >= batch_chars:
+            await flush()
+            if extractor.done:
+                break
+    if pending and not extractor.done:
+        await flush()
+
+    lyrics = extractor.lyrics()
+    if lyrics or extractor.containers:
+        return lyrics
+    return await loop.run_in_executor(executor, extract_json_lyrics, "".join(raw))
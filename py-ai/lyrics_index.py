@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from song_identity import fold
+
+logger = logging.getLogger(__name__)
+
+# Section labels and stage directions that differ between scrapes of one song
+SECTION_LABEL = re.compile(r"^\s*[\[\(][^\]\)]*[\]\)]\s*$")
+REPEAT_MARK = re.compile(r"\(\s*x\s*\d+\s*\)|\bx\d+\b", re.IGNORECASE)
+MERSENNE_PRIME = (1 << 61) - 1
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+
+def normalize_lines(lyrics: str) -> List[str]:
+    """Folded lyric lines without section labels, repeat marks or blank lines."""
+    lines = []
+    for line in lyrics.splitlines():
+        if SECTION_LABEL.match(line):
+            continue
+        line = fold(REPEAT_MARK.sub(" ", line))
+        if line:
+            lines.append(line)
+    return lines
+
+
+def shingles(lyrics: str, size: int = 3) -> Set[str]:
+    """Word n-grams over the normalized lyrics (a set, so repeated choruses count once)."""
+    words = " ".join(normalize_lines(lyrics)).split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of lyrics with LSH banding, to find other versions of a song.
+
+    The Jaccard similarity of two lyrics' word-shingle sets is estimated
+    from num_perm min-hashes; signatures are split into bands, and lyrics
+    sharing any band are candidates. Bands are kept per namespace, so a
+    lookup only finds lyrics added under the same one. Signatures and bands
+    live in Redis when it is connected (so every worker sees every
+    summarized song) and in a bounded in-process index otherwise.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        min_shingles: int = 8,
+        ttl_seconds: int = 8 * 24 * 3600,
+        max_local: int = 10000,
+        max_candidates: int = 50,
+        redis: Optional[Callable] = None,
+        op_timeout: float = 0.5,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_shingles = min_shingles
+        self.ttl_seconds = ttl_seconds
+        self.max_local = max_local
+        self.max_candidates = max_candidates
+        self._redis = redis or (lambda: None)
+        self._op_timeout = op_timeout
+        # Fixed seed: every worker and restart must draw the same permutations
+        rng = random.Random(0x5EED)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._signatures: "OrderedDict[Tuple[str, str], Tuple[int, ...]]" = OrderedDict()  # (namespace, id) -> signature
+        self._buckets: Dict[str, Set[str]] = {}
+        self.stats = {"lookups": 0, "reused": 0, "skipped_short": 0, "indexed": 0, "errors": 0}
+        self.best_similarity = {f"<{SIMILARITY_BUCKETS[0]}": 0, **{f">={b}": 0 for b in SIMILARITY_BUCKETS}}
+
+    def signature(self, lyrics: str) -> Optional[Tuple[int, ...]]:
+        """MinHash of the lyrics, or None if they are too short to compare reliably."""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+            for s in shingles(lyrics)
+        ]
+        if len(hashes) < self.min_shingles:
+            self.stats["skipped_short"] += 1
+            return None
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF for a, b in self._perms)
+
+    @staticmethod
+    def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    async def query(self, signature: Tuple[int, ...], exclude: str, namespace: str = "") -> List[Tuple[float, str]]:
+        """Lyrics in namespace sharing a band with signature, as (estimated similarity, id), best first."""
+        self.stats["lookups"] += 1
+        client = self._redis()
+        if client is not None:
+            try:
+                signatures = await asyncio.wait_for(
+                    self._query_redis(client, signature, exclude, namespace), self._op_timeout
+                )
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Near-duplicate lookup failed: {e}")
+                signatures = {}
+        else:
+            candidates = set()
+            for band in self._band_keys(signature, namespace):
+                candidates |= self._buckets.get(band, set())
+            candidates.discard(exclude)
+            signatures = {doc: self._signatures[namespace, doc] for doc in list(candidates)[:self.max_candidates]}
+        matches = sorted(((self.similarity(signature, other), doc) for doc, other in signatures.items()), reverse=True)
+        return matches
+
+    async def add(self, doc_id: str, signature: Tuple[int, ...], namespace: str = "") -> None:
+        client = self._redis()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.set(f"lyricsig:{doc_id}", self._pack(signature), ex=self.ttl_seconds)
+                    for band in self._band_keys(signature, namespace):
+                        pipe.sadd(band, doc_id)
+                        pipe.expire(band, self.ttl_seconds)
+                    await asyncio.wait_for(pipe.execute(), self._op_timeout)
+                self.stats["indexed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Failed to index lyrics for near-duplicate lookup: {e}")
+            return
+        entry = (namespace, doc_id)
+        if entry not in self._signatures:
+            for band in self._band_keys(signature, namespace):
+                self._buckets.setdefault(band, set()).add(doc_id)
+            self.stats["indexed"] += 1
+        self._signatures[entry] = signature
+        self._signatures.move_to_end(entry)
+        while len(self._signatures) > self.max_local:
+            (old_namespace, old_id), old_signature = self._signatures.popitem(last=False)
+            for band in self._band_keys(old_signature, old_namespace):
+                bucket = self._buckets.get(band)
+                if bucket:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def record(self, best: float, reused: bool) -> None:
+        """Count the outcome of one lookup and where its best match fell, for tuning the threshold."""
+        if reused:
+            self.stats["reused"] += 1
+        label = f"<{SIMILARITY_BUCKETS[0]}"
+        for bound in SIMILARITY_BUCKETS:
+            if best >= bound:
+                label = f">={bound}"
+        self.best_similarity[label] += 1
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "reuse_rate": round(self.stats["reused"] / lookups * 100, 2) if lookups else 0.0,
+            "best_similarity": self.best_similarity,
+            "local_entries": len(self._signatures),
+        }
+
+    async def _query_redis(
+        self, client, signature: Tuple[int, ...], exclude: str, namespace: str
+    ) -> Dict[str, Tuple[int, ...]]:
+        async with client.pipeline(transaction=False) as pipe:
+            for band in self._band_keys(signature, namespace):
+                pipe.smembers(band)
+            members = await pipe.execute()
+        candidates = set().union(*members) - {exclude}
+        candidates = list(candidates)[:self.max_candidates]
+        if not candidates:
+            return {}
+        packed = await client.mget([f"lyricsig:{doc}" for doc in candidates])
+        return {doc: self._unpack(value) for doc, value in zip(candidates, packed) if value}
+
+    def _band_keys(self, signature: Tuple[int, ...], namespace: str = "") -> List[str]:
+        prefix = f"lyricsband:{namespace}:" if namespace else "lyricsband:"
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).hexdigest()
+            keys.append(f"{prefix}{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def _pack(signature: Tuple[int, ...]) -> str:
+        return "".join(f"{value:08x}" for value in signature)
+
+    @staticmethod
+    def _unpack(value: str) -> Tuple[int, ...]:
+        return tuple(int(value[i:i + 8], 16) for i in range(0, len(value), 8))
@@ -0,0 +1,231 @@
+import html
+import math
+import re
+from typing import Dict, List, Tuple
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None  # type: ignore
+
+# Leftovers the page extraction can let through: tags, entities, invisible characters
+LINE_BREAK_TAG = re.compile(r"<br\s*/?>|</?(?:div|p)\b[^>\n]{0,200}>", re.IGNORECASE)
+RESIDUAL_TAG = re.compile(r"</?[a-zA-Z][^>\n]{0,200}>")
+INVISIBLE = re.compile("[\u00ad\u200b-\u200f\u2060\ufeff]")
+SPACES = re.compile("[ \t\u00a0\u2000-\u200a\u3000]+")
+# Genius page furniture that sometimes ends up inside the lyrics text
+BOILERPLATE = re.compile(
+    r"^(\d+\s+contributors?\b.*|translations|you might also like|see .{1,80} live|"
+    r"get tickets as low as .*|\d*\s*embed)$",
+    re.IGNORECASE,
+)
+TRAILING_EMBED = re.compile(r"\d*\s*Embed$")
+SECTION_LABEL = re.compile(r"^\s*\[[^\]]*\]\s*$")
+NON_WORD = re.compile(r"[\W_]+")
+REPEAT_MARK = re.compile(r"\s*\(\s*x\s*(\d+)\s*\)\s*$", re.IGNORECASE)
+
+# A repeated run must span at least this many lines to be collapsed
+MIN_REPEAT_LINES = 2
+# Long unlabelled blocks are split into stanzas of this many lines when trimming
+STANZA_LINES = 8
+# Characters per token when tiktoken is not installed (gpt-4o tokenizer, roughly)
+CHARS_PER_TOKEN_LATIN = 4.0
+CHARS_PER_TOKEN_OTHER = 2.8
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Prompt tokens for text: exact with tiktoken installed, a per-script estimate otherwise."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                _encoding = False
+        if _encoding:
+            return len(_encoding.encode(text, disallowed_special=()))
+    # Extra UTF-8 bytes stand in for the non-ASCII characters (one per Cyrillic letter)
+    other = min(len(text.encode("utf-8")) - len(text), len(text))
+    return math.ceil((len(text) - other) / CHARS_PER_TOKEN_LATIN + other / CHARS_PER_TOKEN_OTHER)
+
+
+def strip_noise(lyrics: str) -> List[str]:
+    """Lyric lines without residual markup, page boilerplate or whitespace noise.
+
+    Single blank lines are kept, as they separate stanzas.
+    """
+    text = RESIDUAL_TAG.sub("", LINE_BREAK_TAG.sub("\n", lyrics))
+    text = html.unescape(text)
+    text = INVISIBLE.sub("", text)
+    lines: List[str] = []
+    for line in text.splitlines():
+        line = SPACES.sub(" ", line).strip()
+        if line and BOILERPLATE.match(line):
+            continue
+        if not line and (not lines or not lines[-1]):
+            continue
+        lines.append(line)
+    if lines and not lines[-1]:
+        lines.pop()
+    if lines:
+        lines[-1] = TRAILING_EMBED.sub("", lines[-1]).rstrip()
+        if not lines[-1]:
+            lines.pop()
+    return lines
+
+
+def collapse_repeats(lines: List[str]) -> List[str]:
+    """Replace repeated lines and passages with short markers.
+
+    A line repeated back to back becomes "line (xN)". A run of lines that
+    already appeared earlier (a chorus, usually) becomes one
+    "[repeat: first line …]" marker. Section labels and stanza breaks are
+    kept, so the shape of the song survives.
+    """
+    # Back-to-back duplicates first, so "(x2)" variants of a chorus still line up
+    merged: List[Tuple[str, str, int]] = []  # (line, folded key, count)
+    for line in lines:
+        match = REPEAT_MARK.search(line)
+        count = int(match.group(1)) if match else 1
+        text = line[:match.start()] if match else line
+        key = NON_WORD.sub(" ", text.casefold()).strip() if text and not SECTION_LABEL.match(text) else ""
+        if key and merged and merged[-1][1] == key:
+            previous, _, seen = merged[-1]
+            merged[-1] = (previous, key, seen + count)
+        else:
+            merged.append((text, key, count))
+
+    keys = [key for _, key, _ in merged]
+    seen_at: Dict[str, List[int]] = {}
+    out: List[List] = []  # [text, count, first index of the repeated run or None]
+    i = 0
+    while i < len(merged):
+        best_start, best_length = -1, 0
+        for start in seen_at.get(keys[i], ()):
+            length = 0
+            while (
+                i + length < len(keys)
+                and start + length < i
+                and keys[start + length]
+                and keys[start + length] == keys[i + length]
+            ):
+                length += 1
+            if length > best_length:
+                best_start, best_length = start, length
+        if best_length >= MIN_REPEAT_LINES:
+            if out and out[-1][2] == best_start:
+                out[-1][1] += 1
+            else:
+                out.append([f"[repeat: {merged[best_start][0]} …]", 1, best_start])
+            i += best_length
+            continue
+        text, key, count = merged[i]
+        if key:
+            seen_at.setdefault(key, []).append(i)
+        out.append([text, count, None])
+        i += 1
+    return [f"{text} (x{count})" if count > 1 else text for text, count, _ in out]
+
+
+def stanzas(lines: List[str]) -> List[List[str]]:
+    """Split lines into stanzas at blank lines and section labels; long blocks are cut into STANZA_LINES."""
+    blocks: List[List[str]] = [[]]
+    for line in lines:
+        if not line or SECTION_LABEL.match(line):
+            if blocks[-1]:
+                blocks.append([])
+            if not line:
+                continue
+        blocks[-1].append(line)
+    result = []
+    for block in blocks:
+        label = block[:1] if block and SECTION_LABEL.match(block[0]) else []
+        body = block[len(label):]
+        if len(body) <= STANZA_LINES * 2:
+            result.append(block)
+            continue
+        for start in range(0, len(body), STANZA_LINES):
+            result.append((label if start == 0 else []) + body[start:start + STANZA_LINES])
+    return [block for block in result if block]
+
+
+def fit_budget(lines: List[str], budget: int) -> Tuple[str, bool]:
+    """Trim lyrics to about budget tokens, shortening every stanza before dropping any.
+
+    Each stanza keeps its label and first lines, so the model still sees the
+    whole arc of the song; only if one line per stanza is still too long is
+    the tail cut off. Returns (text, whether anything was dropped).
+    """
+    text = "\n".join(lines)
+    if budget <= 0 or estimate_tokens(text) <= budget:
+        return text, False
+    blocks = stanzas(lines)
+
+    def shorten(keep: int) -> str:
+        trimmed = []
+        for block in blocks:
+            label = 1 if SECTION_LABEL.match(block[0]) else 0
+            trimmed.extend(block[:label + keep])
+            if len(block) > label + keep:
+                trimmed.append("…")
+            trimmed.append("")
+        return "\n".join(trimmed).rstrip()
+
+    # Longest lines-per-stanza that fits, by bisection
+    low, high = 1, max(len(block) for block in blocks) - 1
+    fitting = None
+    while low <= high:
+        keep = (low + high) // 2
+        text = shorten(keep)
+        if estimate_tokens(text) <= budget:
+            fitting, low = text, keep + 1
+        else:
+            high = keep - 1
+    if fitting is not None:
+        return fitting, True
+    text = shorten(1)
+    kept: List[str] = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.append("[…]")
+    return "\n".join(kept), True
+
+
+class LyricsPreparer:
+    """Shrink scraped lyrics into what the summary prompt needs.
+
+    Cleaning drops markup and page noise, repeated choruses and lines are
+    replaced with markers, and what is left is trimmed to a token budget
+    stanza by stanza. Summaries stay keyed on the raw lyrics; only the prompt
+    changes.
+    """
+
+    def __init__(self, token_budget: int = 1200):
+        self.token_budget = token_budget
+        self.stats = {"prepared": 0, "trimmed": 0, "tokens_in": 0, "tokens_out": 0}
+
+    def prepare(self, lyrics: str) -> Tuple[str, int, int]:
+        """Prompt-ready lyrics, with the estimated tokens before and after."""
+        text, trimmed = fit_budget(collapse_repeats(strip_noise(lyrics)), self.token_budget)
+        tokens_in, tokens_out = estimate_tokens(lyrics), estimate_tokens(text)
+        self.stats["prepared"] += 1
+        self.stats["trimmed"] += trimmed
+        self.stats["tokens_in"] += tokens_in
+        self.stats["tokens_out"] += tokens_out
+        return text, tokens_in, tokens_out
+
+    def snapshot(self) -> dict:
+        tokens_in = self.stats["tokens_in"]
+        return {
+            **self.stats,
+            "token_budget": self.token_budget,
+            "reduction": round((1 - self.stats["tokens_out"] / tokens_in) * 100, 2) if tokens_in else 0.0,
+            "tokenizer": "tiktoken" if _encoding else "estimate",
+        }
@@ -1,45 +1,353 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-import base64, os
-from datetime import datetime, timezone
+from typing import List, Literal, Optional
+import base64, os, random
+from datetime import datetime
 import logging
 import hashlib
+import importlib
 import json
 import asyncio
 import uuid
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from singleflight import SingleFlight
+from memory_cache import MemoryCache
+from hot_keys import HotKeyTracker
+from cache_codec import CacheCodec
+from metrics import (
+    ServerTimingMiddleware, jobs_in_flight, monitor_event_loop, near_duplicate_lookups, near_duplicate_similarity,
+    progress_trackers, prompt_tokens, record_cache_lookup, record_stage, summary_first_token_seconds, track_upstream,
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from progress_hub import ProgressHub
+from job_scheduler import JobScheduler, QueueFullError
+from lyrics_extractor import extract_lyrics_from_stream
+from pipeline import Pipeline
+from song_identity import SongIdentity, clean_artist, clean_title, fold, song_alias
+from upstream_guard import UpstreamGuard, UpstreamUnavailableError
+from artwork_store import ArtworkStore, BlobResponse
+from http_caching import CompressionMiddleware, FastJSONResponse, cacheable_json
+from lyrics_index import NearDuplicateIndex
+from lyrics_prompt import LyricsPreparer
+from disk_cache import DiskCache
+from summary_stream import TextStreams, follow_until
 
 try:
-    from openai import OpenAI
+    import redis.asyncio as aioredis
 except Exception:
-    OpenAI = None  # type: ignore
-
-try:
-    import redis
-except Exception:
-    redis = None  # type: ignore
+    aioredis = None  # type: ignore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default home of the files this service keeps on local disk: the user's cache
+# directory, never the source tree. Deployments point the paths at volumes.
+LOCAL_DATA_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "lyrics-ai")
+
 # ---------- REDIS SETUP ----------
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Upper bound on concurrent Redis connections held by this worker
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+# How long a request may wait for a free pooled connection before giving up
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2.0"))
+# Per-call budget for a single cache command (or pipeline)
+REDIS_OP_TIMEOUT = float(os.getenv("REDIS_OP_TIMEOUT", "0.5"))
+
+# Background reconnect: first retry after the min delay, doubling up to the max
+REDIS_RECONNECT_MIN_DELAY = float(os.getenv("REDIS_RECONNECT_MIN_DELAY", "0.5"))
+REDIS_RECONNECT_MAX_DELAY = float(os.getenv("REDIS_RECONNECT_MAX_DELAY", "30"))
+# A connected client is pinged this often; this many failures in a row drop it
+REDIS_HEALTH_INTERVAL = float(os.getenv("REDIS_HEALTH_INTERVAL", "5"))
+REDIS_HEALTH_FAILURES = int(os.getenv("REDIS_HEALTH_FAILURES", "3"))
+
+redis_pool = None
 redis_client = None
-if redis:
+# Connection state for /readyz: connecting, connected, disconnected or disabled
+redis_status = {"state": "connecting", "since": time.time(), "last_error": None, "connects": 0}
+
+def set_redis_state(state: str) -> None:
+    if redis_status["state"] != state:
+        redis_status.update(state=state, since=time.time())
+
+async def init_redis() -> None:
+    """Create the asyncio Redis client with a bounded connection pool."""
+    global redis_pool, redis_client
+    if not aioredis:
+        logger.warning("redis package not installed. Caching disabled.")
+        return
+    pool = None
     try:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-        redis_client = redis.from_url(redis_url, decode_responses=True)
+        pool = aioredis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            socket_timeout=REDIS_OP_TIMEOUT,
+            decode_responses=True,
+        )
+        client = aioredis.Redis(connection_pool=pool)
         # Test connection
-        redis_client.ping()
-        logger.info(f"Redis connected successfully: {redis_url}")
+        await asyncio.wait_for(client.ping(), REDIS_CONNECT_TIMEOUT)
+        redis_pool, redis_client = pool, client
+        logger.info(f"Redis connected successfully: {REDIS_URL} (pool size {REDIS_MAX_CONNECTIONS})")
     except Exception as e:
-        logger.warning(f"Redis connection failed: {e}. Caching disabled.")
+        logger.warning(f"Redis connection failed: {e}. Caching disabled until it reconnects.")
+        redis_status["last_error"] = str(e) or type(e).__name__
+        if pool is not None:
+            await pool.disconnect()
+        redis_pool = None
         redis_client = None
 
+async def close_redis() -> None:
+    """Close the Redis client and release pooled connections."""
+    global redis_pool, redis_client
+    client, pool = redis_client, redis_pool
+    # Drop the globals first so requests fall back to the uncached path right away
+    redis_pool = None
+    redis_client = None
+    await progress_hub.stop()
+    if client:
+        try:
+            await client.aclose()
+            if pool:
+                await pool.disconnect()
+        except Exception as e:
+            logger.warning(f"Error closing Redis: {e}")
+
+async def maintain_redis() -> None:
+    """Connect to Redis in the background, watch the connection, and reconnect when it drops.
+
+    Startup never waits on Redis: the service answers (uncached) while
+    this keeps retrying with jittered exponential backoff, and /readyz
+    reports the state.
+    """
+    if not aioredis:
+        set_redis_state("disabled")
+        return
+    delay = REDIS_RECONNECT_MIN_DELAY
+    while True:
+        if redis_client is None:
+            await init_redis()
+            if redis_client is None:
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+                delay = min(delay * 2, REDIS_RECONNECT_MAX_DELAY)
+                continue
+            delay = REDIS_RECONNECT_MIN_DELAY
+            try:
+                await progress_hub.start(redis_client)
+            except Exception as e:
+                logger.warning(f"Progress subscription failed: {e}. Progress updates stay in-process.")
+            redis_status["connects"] += 1
+            set_redis_state("connected")
+            spawn_background(write_back_disk_cache())
+        failures = 0
+        while redis_client is not None and failures < REDIS_HEALTH_FAILURES:
+            await asyncio.sleep(REDIS_HEALTH_INTERVAL)
+            try:
+                await asyncio.wait_for(redis_client.ping(), REDIS_CONNECT_TIMEOUT)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                redis_status["last_error"] = str(e) or type(e).__name__
+        if redis_client is not None:
+            logger.warning(f"Redis unreachable ({redis_status['last_error']}). Caching disabled until it reconnects.")
+            set_redis_state("disconnected")
+            await close_redis()
+
+def get_pool_stats() -> Optional[dict]:
+    """Report how saturated the Redis connection pool is."""
+    if not redis_pool:
+        return None
+    in_use = len(redis_pool._in_use_connections)
+    idle = len(redis_pool._available_connections)
+    max_connections = redis_pool.max_connections
+    return {
+        "max_connections": max_connections,
+        "in_use": in_use,
+        "idle": idle,
+        "saturation": round(in_use / max_connections * 100, 2) if max_connections else 0.0,
+    }
+
+# ---------- HTTP CLIENTS ----------
+# Shared keep-alive clients for upstream APIs, owned by the app lifespan
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10.0"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+# Upstream base URLs; overridable to point at local stand-ins (see bench/load_test.py)
+GENIUS_API_BASE = os.getenv("GENIUS_API_BASE", "https://api.genius.com")
+GENIUS_WEB_BASE = os.getenv("GENIUS_WEB_BASE", "https://genius.com")
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com")
+
+http_clients = {}
+
+def build_http_client() -> httpx.AsyncClient:
+    """Create a pooled AsyncClient with explicit limits and timeouts."""
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED set but 'h2' is not installed. Falling back to HTTP/1.1.")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_READ_TIMEOUT,
+            pool=HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream ("genius", "spotify"), creating it if needed."""
+    client = http_clients.get(name)
+    if client is None or client.is_closed:
+        client = http_clients[name] = build_http_client()
+    return client
+
+async def init_http_clients() -> None:
+    for name in ("genius", "spotify"):
+        get_http_client(name)
+    logger.info(f"HTTP clients ready (http2={HTTP2_ENABLED}, max_connections={HTTP_MAX_CONNECTIONS})")
+
+async def close_http_clients() -> None:
+    for client in http_clients.values():
+        await client.aclose()
+    http_clients.clear()
+
+# ---------- OPENAI CLIENT ----------
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# Retries are done by the upstream guards below, not by the SDK
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# Concurrency caps per worker so a burst can't fan out unbounded paid calls
+OPENAI_MAX_CONCURRENT_CHAT = int(os.getenv("OPENAI_MAX_CONCURRENT_CHAT", "8"))
+OPENAI_MAX_CONCURRENT_IMAGES = int(os.getenv("OPENAI_MAX_CONCURRENT_IMAGES", "2"))
+
+openai_client = None
+openai_chat_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_CHAT)
+openai_image_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_IMAGES)
+
+def get_openai_client():
+    """Return the shared AsyncOpenAI client, or None if OpenAI is not configured.
+
+    The SDK is slow to import, so it is loaded by the lifespan in the
+    background; a request that gets here first imports it inline.
+    """
+    global openai_client
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    if openai_client is None:
+        try:
+            from openai import AsyncOpenAI
+        except Exception:
+            return None
+        openai_client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=0,
+        )
+    return openai_client
+
+async def init_openai_client() -> None:
+    if not os.getenv("OPENAI_API_KEY"):
+        return
+    try:
+        await asyncio.to_thread(importlib.import_module, "openai")
+    except Exception as e:
+        logger.warning(f"openai package not available ({e}). Summaries and artwork use fallbacks.")
+        return
+    get_openai_client()
+
+async def close_openai_client() -> None:
+    global openai_client
+    if openai_client is not None:
+        await openai_client.close()
+        openai_client = None
+
+# ---------- UPSTREAM GUARDS ----------
+# Rate limits are requests/second shared by all workers, as "provider=rate[:burst]"
+UPSTREAM_RATE_LIMITS = os.getenv("UPSTREAM_RATE_LIMITS", "genius=10,spotify=20,openai_chat=5,openai_images=0.5")
+# Longest a call queues for a rate-limit token before failing fast
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "5"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5"))
+# A Retry-After longer than this fails the call instead of waiting it out
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "10"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+UPSTREAM_PROVIDERS = ("genius", "spotify", "openai_chat", "openai_images")
+
+def parse_rate_limits(spec: str) -> dict:
+    """Parse "provider=rate[:burst],..." into {provider: (rate, burst)}; burst defaults to 2x rate."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        try:
+            provider, _, value = part.partition("=")
+            rate, _, burst = value.partition(":")
+            limits[provider.strip()] = (float(rate), float(burst) if burst else max(1.0, 2 * float(rate)))
+        except ValueError:
+            logger.warning(f"Ignoring malformed UPSTREAM_RATE_LIMITS entry '{part}'")
+    return limits
+
+def build_upstream_guards() -> dict:
+    limits = parse_rate_limits(UPSTREAM_RATE_LIMITS)
+    return {
+        provider: UpstreamGuard(
+            provider,
+            *limits.get(provider, (0.0, 1.0)),
+            max_wait=UPSTREAM_MAX_WAIT,
+            max_retries=OPENAI_MAX_RETRIES if provider.startswith("openai") else UPSTREAM_MAX_RETRIES,
+            base_delay=UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=UPSTREAM_RETRY_MAX_DELAY,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=CIRCUIT_RESET_TIMEOUT,
+            redis=lambda: redis_client,
+            op_timeout=REDIS_OP_TIMEOUT,
+        )
+        for provider in UPSTREAM_PROVIDERS
+    }
+
+upstream_guards = build_upstream_guards()
+
+def upstream_unavailable(e: UpstreamUnavailableError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"{e.provider} is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 # ---------- PROGRESS TRACKING ----------
-# Store progress data (in production, use Redis or database)
+# Progress state lives in Redis (key + pub/sub channel per request) so any
+# worker can serve /progress/{request_id}; the local dict only holds trackers
+# for jobs running in this worker, or everything when Redis is unavailable.
+PROGRESS_KEY_PREFIX = "progress:"
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", "3600"))
+# How often an idle SSE stream re-reads the stored state in case a message was missed
+PROGRESS_RESYNC_INTERVAL = float(os.getenv("PROGRESS_RESYNC_INTERVAL", "15"))
+
+# Finished trackers kept in this worker (local mode) are capped in number
+PROGRESS_MAX_TRACKERS = int(os.getenv("PROGRESS_MAX_TRACKERS", "1000"))
+JOB_CANCEL_PREFIX = "jobcancel:"
+
 progress_store = {}
+progress_hub = ProgressHub(PROGRESS_KEY_PREFIX, JOB_CANCEL_PREFIX)
 
 class ProgressTracker:
     def __init__(self, request_id: str):
@@ -49,12 +357,42 @@ class ProgressTracker:
         self.start_time = datetime.now()
         self.result = None
         self.error = None
+        # Event sequence number (SSE id) and the state last sent to subscribers
+        self.seq = 0
+        self._published = {}
+        self.finished_at = None
+        # Summary text generated so far, until the result is in
+        self.partial_summary = ""
         progress_store[request_id] = self
     
     async def update(self, progress: int, status: str):
         self.progress = min(progress, 100)
         self.status = status
+        if self.progress >= 100 and self.finished_at is None:
+            self.finished_at = time.monotonic()
         logger.info(f"Progress {self.request_id}: {progress}% - {status}")
+        state = self.to_dict()
+        delta = {k: v for k, v in state.items() if self._published.get(k) != v}
+        self._published = state
+        self.seq += 1
+        await publish_progress(self.request_id, self.seq, state, delta)
+    
+    async def stream_summary(self, text: Optional[str]):
+        """Publish the next piece of the summary as it is generated; None starts it over.
+
+        Events carry only the new text as "summary_delta" (append it); the
+        stored state, and so a re-sync, carries all of it as "partial_summary".
+        """
+        if text is None:
+            self.partial_summary = ""
+            delta = {"partial_summary": ""}
+        else:
+            self.partial_summary += text
+            delta = {"summary_delta": text}
+        state = self.to_dict()
+        self._published = state
+        self.seq += 1
+        await publish_progress(self.request_id, self.seq, state, delta)
     
     def to_dict(self):
         data = {
@@ -64,21 +402,192 @@ class ProgressTracker:
             "elapsed_time": (datetime.now() - self.start_time).total_seconds()
         }
         if self.result:
-            data["result"] = {
-                "summary": self.result.summary,
-                "imageUrl": self.result.imageUrl
-            }
+            data["result"] = self.result.model_dump(exclude_none=True)
+        elif self.partial_summary:
+            data["partial_summary"] = self.partial_summary
         if self.error:
             data["error"] = self.error
         return data
 
+async def publish_progress(request_id: str, seq: int, state: dict, delta: dict) -> None:
+    """Store the latest progress state and push the change to every stream following it."""
+    event = json.dumps({"seq": seq, "delta": delta})
+    # Wake streams on this worker right away; copies arriving via Redis are skipped by seq
+    progress_hub.publish_local(request_id, event)
+    if not redis_client:
+        return
+    key = f"{PROGRESS_KEY_PREFIX}{request_id}"
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps({"seq": seq, "state": state}), ex=PROGRESS_TTL)
+            pipe.publish(key, event)
+            await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error publishing progress for {request_id}: {e}")
+
+async def load_progress(request_id: str) -> Optional[tuple]:
+    """Get (seq, state) for the latest progress from this worker or from Redis."""
+    tracker = progress_store.get(request_id)
+    if tracker:
+        return tracker.seq, tracker.to_dict()
+    if not redis_client:
+        return None
+    try:
+        payload = await asyncio.wait_for(redis_client.get(f"{PROGRESS_KEY_PREFIX}{request_id}"), REDIS_OP_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error loading progress for {request_id}: {e}")
+        return None
+    if not payload:
+        return None
+    snapshot = json.loads(payload)
+    return snapshot["seq"], snapshot["state"]
+
+def evict_finished_trackers() -> None:
+    """Drop finished trackers past PROGRESS_TTL, oldest first beyond PROGRESS_MAX_TRACKERS."""
+    now = time.monotonic()
+    finished = sorted(
+        (tracker.finished_at, request_id)
+        for request_id, tracker in progress_store.items()
+        if tracker.finished_at is not None
+    )
+    excess = len(progress_store) - PROGRESS_MAX_TRACKERS
+    for finished_at, request_id in finished:
+        if now - finished_at <= PROGRESS_TTL and excess <= 0:
+            break
+        progress_store.pop(request_id, None)
+        excess -= 1
+
+def format_sse(data: dict, event_id: Optional[int] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+# ---------- BACKGROUND JOBS ----------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+# Seconds a job may go without any SSE viewer before it is cancelled
+JOB_CANCEL_GRACE = float(os.getenv("JOB_CANCEL_GRACE", "10"))
+
+job_scheduler = JobScheduler(JOB_WORKERS, JOB_MAX_QUEUE)
+jobs_in_flight.labels("running").set_function(lambda: job_scheduler.running)
+jobs_in_flight.labels("queued").set_function(lambda: job_scheduler.queued)
+progress_trackers.set_function(lambda: len(progress_store))
+background_tasks = set()
+
+def spawn_background(coro) -> None:
+    """Run a fire-and-forget coroutine while keeping a reference to it."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def change_watchers(request_id: str, delta: int) -> int:
+    """Adjust and return how many SSE streams follow a job, across all workers."""
+    if not redis_client:
+        return progress_hub.subscriber_count(request_id)
+    key = f"{PROGRESS_KEY_PREFIX}{request_id}:watchers"
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.incrby(key, delta)
+            pipe.expire(key, PROGRESS_TTL)
+            count, _ = await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
+        return count
+    except Exception as e:
+        logger.error(f"Error tracking watchers for {request_id}: {e}")
+        # Assume someone is still watching rather than cancelling by mistake
+        return 1
+
+async def stream_closed(request_id: str, completed: bool) -> None:
+    watchers = await change_watchers(request_id, -1)
+    if completed or watchers > 0:
+        return
+    if redis_client:
+        try:
+            await asyncio.wait_for(redis_client.publish(f"{JOB_CANCEL_PREFIX}{request_id}", "1"), REDIS_OP_TIMEOUT)
+            return
+        except Exception as e:
+            logger.error(f"Error publishing cancel request for {request_id}: {e}")
+    progress_hub.cancel_local(request_id)
+
+def on_cancel_request(request_id: str) -> None:
+    """Called on every worker when a job lost its last viewer; only the owner acts."""
+    if job_scheduler.has_job(request_id):
+        spawn_background(cancel_if_abandoned(request_id))
+
+async def cancel_if_abandoned(request_id: str) -> None:
+    await asyncio.sleep(JOB_CANCEL_GRACE)
+    if await change_watchers(request_id, 0) > 0:
+        return  # a client reconnected
+    if not job_scheduler.cancel(request_id):
+        return
+    logger.info(f"Cancelled job {request_id}: client disconnected")
+    tracker = progress_store.get(request_id)
+    if tracker and tracker.progress == 0:
+        # Cancelled while still queued, so the job will never publish its own end state
+        tracker.error = "Analysis cancelled"
+        await tracker.update(100, "Cancelled")
+        if redis_client:
+            progress_store.pop(request_id, None)
+
 # ---------- CACHE UTILITIES ----------
-# Cache statistics
+# In-process L1 tier in front of Redis; L1_CACHE_MAX_BYTES=0 disables it
+L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Upper bound on how long a worker may serve a value without re-reading Redis
+L1_CACHE_MAX_TTL = float(os.getenv("L1_CACHE_MAX_TTL", "3600"))
+
+l1_cache = MemoryCache(L1_CACHE_MAX_BYTES, L1_CACHE_MAX_TTL)
+
+# Local SQLite tier behind Redis, so an outage doesn't send every request upstream.
+# "tier": every write also goes to disk, and a Redis miss is looked up there;
+# "fallback": disk is only used while Redis is unreachable; "off" disables it.
+# Writes Redis could not take are copied back to it once it returns.
+DISK_CACHE_MODE = os.getenv("DISK_CACHE_MODE", "tier").lower()
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", os.path.join(LOCAL_DATA_DIR, "cache.sqlite3"))
+DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Seconds between expired-entry purges and write-back retries
+DISK_CACHE_SYNC_INTERVAL = float(os.getenv("DISK_CACHE_SYNC_INTERVAL", "60"))
+DISK_CACHE_WRITE_BACK_BATCH = 200
+
+disk_cache = DiskCache(DISK_CACHE_PATH, DISK_CACHE_MAX_BYTES)
+
+def use_disk_cache(redis_ok: bool) -> bool:
+    """Whether a read or write that Redis did (or did not) serve goes to the disk tier."""
+    if not disk_cache.ready:
+        return False
+    return DISK_CACHE_MODE == "tier" or (DISK_CACHE_MODE == "fallback" and not redis_ok)
+
+# Not-found results are cached briefly under this sentinel to avoid upstream storms
+NEGATIVE_CACHE_VALUE = "__not_found__"
+NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", "900"))
+# Entries stay readable this long past their TTL; stale reads trigger a background refresh
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", str(24 * 3600)))
+
+# Values at least this many bytes are stored compressed (0 disables); "zlib" or "zstd"
+CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", "512"))
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib").lower()
+cache_codec = CacheCodec(CACHE_COMPRESS_THRESHOLD, CACHE_COMPRESSION)
+
+# Fallback artwork is cached as this marker and the SVG rebuilt on read
+FALLBACK_IMAGE_VALUE = "__fallback_svg__"
+fallback_image_stats = {"markers_written": 0, "bytes_avoided": 0}
+
+# Approximate read counts per key, so hot entries can be warmed before they expire
+HOT_KEYS_TOP_K = int(os.getenv("HOT_KEYS_TOP_K", "100"))
+HOT_KEYS_DECAY_INTERVAL = float(os.getenv("HOT_KEYS_DECAY_INTERVAL", "300"))
+hot_keys = HotKeyTracker(top_k=HOT_KEYS_TOP_K, decay_interval=HOT_KEYS_DECAY_INTERVAL)
+
+# When set (by the cache warmer), set_cache queues writes here to be flushed with set_many_cache
+cache_write_buffer: ContextVar[Optional[list]] = ContextVar("cache_write_buffer", default=None)
+
+# Cache statistics (Redis tier)
 cache_stats = {
     "hits": 0,
     "misses": 0,
     "sets": 0,
-    "errors": 0
+    "errors": 0,
+    "timeouts": 0,
+    "stale_hits": 0,
+    "negative_hits": 0,
+    "refreshes": 0,
+    "refresh_skips": 0
 }
 
 def get_cache_key(prefix: str, *args) -> str:
@@ -90,50 +599,417 @@ def get_content_hash(content: str) -> str:
     """Generate SHA256 hash of content for cache keys."""
     return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
 
+def song_alias_cache_key(alias: str) -> str:
+    return get_cache_key("songid", alias)
+
+def lyrics_cache_key(song: SongIdentity) -> str:
+    return get_cache_key("lyrics", song.key)
+
+def summary_cache_key(lyrics: str, language: str) -> str:
+    # Keyed on lyrics hash + language
+    return get_cache_key("summary", get_content_hash(lyrics), language)
+
+def image_cache_key(song: SongIdentity, summary: str, style: str) -> str:
+    # Keyed on song identity + summary content hash + style
+    return get_cache_key("image", song.key, get_content_hash(summary), style.lower())
+
+def _record_cache_error(action: str, e: Exception) -> None:
+    if isinstance(e, asyncio.TimeoutError):
+        cache_stats["timeouts"] += 1
+        logger.warning(f"Cache {action} timed out after {REDIS_OP_TIMEOUT}s")
+    else:
+        cache_stats["errors"] += 1
+        logger.error(f"Cache {action} error: {e}")
+
+async def get_from_cache_with_ttl(key: str) -> tuple:
+    """Get value and its remaining TTL in seconds from the L1 memory cache, then Redis, then disk."""
+    hot_keys.add(key)
+    value, ttl = l1_cache.get_with_ttl(key)
+    record_cache_lookup(key, "l1", value is not None)
+    if value is not None:
+        logger.debug(f"Cache HIT (L1): {key[:50]}...")
+        return value, ttl
+    redis_ok = False
+    if redis_client:
+        try:
+            # Fetch the remaining TTL in the same round trip so L1 never outlives Redis
+            with track_upstream("redis"):
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                    value, ttl_ms = await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
+            redis_ok = True
+            value = cache_codec.decode(value)
+            record_cache_lookup(key, "redis", bool(value))
+            if value:
+                cache_stats["hits"] += 1
+                logger.info(f"Cache HIT: {key[:50]}...")
+                if ttl_ms > 0:
+                    l1_cache.set(key, value, ttl_ms / 1000)
+                    return value, ttl_ms / 1000
+                return value, None
+            cache_stats["misses"] += 1
+            logger.info(f"Cache MISS: {key[:50]}...")
+        except Exception as e:
+            _record_cache_error("get", e)
+    if use_disk_cache(redis_ok):
+        return await get_from_disk_cache(key)
+    return None, None
+
+async def get_from_disk_cache(key: str) -> tuple:
+    encoded, ttl = await disk_cache.get_with_ttl(key)
+    value = cache_codec.decode(encoded)
+    record_cache_lookup(key, "disk", bool(value))
+    if not value:
+        return None, None
+    logger.info(f"Cache HIT (disk): {key[:50]}...")
+    l1_cache.set(key, value, ttl)
+    return value, ttl
+
 async def get_from_cache(key: str) -> Optional[str]:
-    """Get value from Redis cache."""
-    if not redis_client:
+    """Get value from the L1 memory cache, falling back to Redis and then disk."""
+    value, _ = await get_from_cache_with_ttl(key)
+    return value
+
+async def get_many_from_cache_with_ttl(keys: list) -> list:
+    """Get (value, remaining TTL) for several keys: L1 hits locally, the rest in one Redis round trip, then disk."""
+    for key in keys:
+        hot_keys.add(key)
+    entries = [l1_cache.get_with_ttl(key) for key in keys]
+    for key, (value, _) in zip(keys, entries):
+        record_cache_lookup(key, "l1", value is not None)
+    missing = [i for i, (value, _) in enumerate(entries) if value is None]
+    if not missing:
+        return entries
+    redis_ok = False
+    if redis_client:
+        try:
+            with track_upstream("redis"):
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for i in missing:
+                        pipe.get(keys[i])
+                        pipe.pttl(keys[i])
+                    fetched = await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
+            redis_ok = True
+            hits = 0
+            for i, value, ttl_ms in zip(missing, fetched[::2], fetched[1::2]):
+                value = cache_codec.decode(value) or None
+                record_cache_lookup(keys[i], "redis", value is not None)
+                if value is None:
+                    continue
+                hits += 1
+                if ttl_ms > 0:
+                    l1_cache.set(keys[i], value, ttl_ms / 1000)
+                    entries[i] = (value, ttl_ms / 1000)
+                else:
+                    entries[i] = (value, None)
+            cache_stats["hits"] += hits
+            cache_stats["misses"] += len(missing) - hits
+            logger.info(f"Cache batch GET: {hits}/{len(missing)} hits ({len(keys) - len(missing)} from L1)")
+            missing = [i for i in missing if entries[i][0] is None]
+        except Exception as e:
+            _record_cache_error("batch get", e)
+    if missing and use_disk_cache(redis_ok):
+        rows = await disk_cache.get_many([keys[i] for i in missing])
+        for i, (encoded, ttl) in zip(missing, rows):
+            value = cache_codec.decode(encoded) or None
+            record_cache_lookup(keys[i], "disk", value is not None)
+            if value is not None:
+                l1_cache.set(keys[i], value, ttl)
+                entries[i] = (value, ttl)
+    return entries
+
+async def set_cache(key: str, value: str, ttl_seconds: int = 3600, stale_ttl: int = 0) -> bool:
+    """Set value in the L1 memory cache, Redis and disk with TTL, kept stale_ttl longer for stale reads."""
+    ttl_seconds += stale_ttl
+    l1_cache.set(key, value, ttl_seconds)
+    buffer = cache_write_buffer.get()
+    if buffer is not None:
+        buffer.append((key, value, ttl_seconds))
+        return True
+    encoded = cache_codec.encode(value)
+    redis_ok = False
+    if redis_client:
+        try:
+            with track_upstream("redis"):
+                await asyncio.wait_for(redis_client.setex(key, ttl_seconds, encoded), REDIS_OP_TIMEOUT)
+            redis_ok = True
+            cache_stats["sets"] += 1
+            logger.info(f"Cache SET: {key[:50]}... (TTL: {ttl_seconds}s)")
+        except Exception as e:
+            _record_cache_error("set", e)
+    if use_disk_cache(redis_ok):
+        # Not in Redis: flag it for write-back once Redis is reachable again
+        return await disk_cache.set(key, encoded, ttl_seconds, dirty=not redis_ok) or redis_ok
+    return redis_ok
+
+async def set_many_cache(items: list) -> bool:
+    """Set several (key, value, ttl_seconds) entries in one pipelined round trip."""
+    for key, value, ttl_seconds in items:
+        l1_cache.set(key, value, ttl_seconds)
+    if not items:
+        return False
+    encoded = [(key, cache_codec.encode(value), ttl_seconds) for key, value, ttl_seconds in items]
+    redis_ok = False
+    if redis_client:
+        try:
+            with track_upstream("redis"):
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for key, value, ttl_seconds in encoded:
+                        pipe.setex(key, ttl_seconds, value)
+                    await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
+            redis_ok = True
+            cache_stats["sets"] += len(items)
+            logger.info(f"Cache SET (pipelined): {len(items)} keys")
+        except Exception as e:
+            _record_cache_error("pipeline set", e)
+    if use_disk_cache(redis_ok):
+        return await disk_cache.set_many(encoded, dirty=not redis_ok) or redis_ok
+    return redis_ok
+
+disk_write_back_lock = asyncio.Lock()
+
+async def write_back_disk_cache() -> int:
+    """Copy entries that were only written to disk into Redis; returns how many were sent.
+
+    Keys Redis already holds are left alone (SET NX): whatever was written
+    there after it came back is newer.
+    """
+    sent = 0
+    async with disk_write_back_lock:
+        while redis_client:
+            batch = await disk_cache.dirty(DISK_CACHE_WRITE_BACK_BATCH)
+            if not batch:
+                break
+            try:
+                with track_upstream("redis"):
+                    async with redis_client.pipeline(transaction=False) as pipe:
+                        for key, value, ttl in batch:
+                            pipe.set(key, value, px=max(1, int(ttl * 1000)), nx=True)
+                        await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT * 4)
+            except Exception as e:
+                _record_cache_error("write-back", e)
+                break
+            await disk_cache.mark_clean([(key, value) for key, value, _ in batch])
+            sent += len(batch)
+    if sent:
+        logger.info(f"Wrote {sent} disk cache entries back to Redis")
+    return sent
+
+async def maintain_disk_cache() -> None:
+    """Purge expired disk entries and retry pending write-backs periodically."""
+    while True:
+        await asyncio.sleep(DISK_CACHE_SYNC_INTERVAL)
+        await disk_cache.purge_expired()
+        if redis_client and disk_cache.snapshot()["dirty"]:
+            await write_back_disk_cache()
+
+# ---------- STALE-WHILE-REVALIDATE ----------
+refresh_tasks = {}
+
+async def get_or_refresh(stage: str, cache_key: str, refresh) -> Optional[str]:
+    """Return the cached value; if it is past its TTL, serve it and refresh it once in the background.
+
+    Whatever is read here must be written with stale_ttl=CACHE_STALE_TTL:
+    the remaining TTL is all there is to tell a stale entry from a fresh one.
+    """
+    value, ttl = await get_from_cache_with_ttl(cache_key)
+    return revalidate(stage, cache_key, value, ttl, refresh)
+
+def revalidate(stage: str, cache_key: str, value: Optional[str], ttl: Optional[float], refresh) -> Optional[str]:
+    """Count a cached read, scheduling a background refresh if it is past its TTL; returns value."""
+    if value is None:
         return None
-    try:
-        value = redis_client.get(key)
-        if value:
-            cache_stats["hits"] += 1
-            logger.info(f"Cache HIT: {key[:50]}...")
-            return value
-        cache_stats["misses"] += 1
-        logger.info(f"Cache MISS: {key[:50]}...")
+    if value == NEGATIVE_CACHE_VALUE:
+        cache_stats["negative_hits"] += 1
+    elif value != FALLBACK_IMAGE_VALUE and ttl is not None and ttl <= CACHE_STALE_TTL:
+        # Fallback markers have no stale window; they just expire and get retried
+        cache_stats["stale_hits"] += 1
+        schedule_refresh(stage, cache_key, refresh)
+    return value
+
+def schedule_refresh(stage: str, cache_key: str, refresh) -> None:
+    if cache_key in refresh_tasks:
+        return
+    cache_stats["refreshes"] += 1
+    logger.info(f"Refreshing stale {stage} entry in background: {cache_key[:50]}...")
+    task = asyncio.create_task(refresh_stale_entry(stage, cache_key, refresh))
+    refresh_tasks[cache_key] = task
+    task.add_done_callback(lambda t: _refresh_done(cache_key, t))
+
+async def refresh_stale_entry(stage: str, cache_key: str, refresh):
+    """Recompute a stale entry, once across every worker.
+
+    Redis is re-read first: another worker may have refreshed the entry
+    already, and then its value replaces our stale L1 copy instead. The
+    refresh always takes the key's Redis lock, whatever SINGLEFLIGHT_REDIS_LOCK
+    says; a worker that finds it held leaves the refresh to the holder.
+    """
+    if await refreshed_elsewhere(cache_key):
         return None
+    if not redis_client:
+        return await flights[stage].do(cache_key, refresh)
+    lock = redis_client.lock(f"lock:{cache_key}", timeout=SINGLEFLIGHT_LOCK_TTL)
+    try:
+        acquired = await asyncio.wait_for(lock.acquire(blocking=False), REDIS_OP_TIMEOUT)
     except Exception as e:
-        cache_stats["errors"] += 1
-        logger.error(f"Cache get error: {e}")
+        _record_cache_error("lock", e)
+        return await flights[stage].do(cache_key, refresh)
+    if not acquired:
+        cache_stats["refresh_skips"] += 1
         return None
+    try:
+        # The holder before us may have finished between the read and the lock
+        if await refreshed_elsewhere(cache_key):
+            return None
+        return await flights[stage].do(cache_key, refresh)
+    finally:
+        try:
+            await asyncio.wait_for(lock.release(), REDIS_OP_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Refresh lock release failed for {cache_key[:50]}: {e}")
 
-async def set_cache(key: str, value: str, ttl_seconds: int = 3600) -> bool:
-    """Set value in Redis cache with TTL."""
+async def refreshed_elsewhere(cache_key: str) -> bool:
+    """Whether Redis holds a fresh copy of the key; if so it goes into L1 in place of the stale one."""
     if not redis_client:
         return False
     try:
-        redis_client.setex(key, ttl_seconds, value)
-        cache_stats["sets"] += 1
-        logger.info(f"Cache SET: {key[:50]}... (TTL: {ttl_seconds}s)")
-        return True
+        with track_upstream("redis"):
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(cache_key)
+                pipe.pttl(cache_key)
+                value, ttl_ms = await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)
     except Exception as e:
-        cache_stats["errors"] += 1
-        logger.error(f"Cache set error: {e}")
+        _record_cache_error("get", e)
+        return False
+    value = cache_codec.decode(value)
+    if not value or ttl_ms <= CACHE_STALE_TTL * 1000:
         return False
+    cache_stats["refresh_skips"] += 1
+    l1_cache.set(cache_key, value, ttl_ms / 1000)
+    return True
+
+def _refresh_done(cache_key: str, task: asyncio.Task) -> None:
+    refresh_tasks.pop(cache_key, None)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background refresh failed for {cache_key[:50]}: {task.exception()}")
+
+async def cache_not_found(cache_key: str) -> None:
+    await set_cache(cache_key, NEGATIVE_CACHE_VALUE, NEGATIVE_CACHE_TTL)
+
+# ---------- SINGLE-FLIGHT ----------
+# Optionally also coordinate identical computations across workers/nodes
+SINGLEFLIGHT_REDIS_LOCK = os.getenv("SINGLEFLIGHT_REDIS_LOCK", "false").lower() in ("1", "true", "yes")
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "120"))
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", "90"))
+SINGLEFLIGHT_POLL_INTERVAL = 0.25
+
+flights = {
+    "identity": SingleFlight("identity"),
+    "lyrics": SingleFlight("lyrics"),
+    "summary": SingleFlight("summary"),
+    "image": SingleFlight("image"),
+}
+
+async def run_single_flight(stage: str, cache_key: str, fn, flight_key: Optional[str] = None):
+    """Run fn once per cache key; concurrent identical calls share the result.
+
+    flight_key (default: cache_key) names the flight and its Redis lock, for
+    a second computation of the same entry that must not join the first.
+    """
+    flight_key = flight_key or cache_key
+    return await flights[stage].do(flight_key, lambda: _run_with_redis_lock(stage, cache_key, fn, flight_key))
+
+async def _run_with_redis_lock(stage: str, cache_key: str, fn, flight_key: str):
+    if not (SINGLEFLIGHT_REDIS_LOCK and redis_client):
+        return await fn()
+    lock = redis_client.lock(f"lock:{flight_key}", timeout=SINGLEFLIGHT_LOCK_TTL)
+    try:
+        acquired = await asyncio.wait_for(lock.acquire(blocking=False), REDIS_OP_TIMEOUT)
+    except Exception as e:
+        _record_cache_error("lock", e)
+        return await fn()
+    if not acquired:
+        # Another worker is computing this key; wait for it to land in the cache
+        flights[stage].stats["remote_waits"] += 1
+        await _wait_for_remote_flight(f"lock:{flight_key}", cache_key)
+        cached = await get_from_cache(cache_key)
+        if cached is not None:
+            return cached
+        return await fn()
+    try:
+        return await fn()
+    finally:
+        try:
+            await asyncio.wait_for(lock.release(), REDIS_OP_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Single-flight lock release failed for {cache_key[:50]}: {e}")
+
+async def _wait_for_remote_flight(lock_key: str, cache_key: str) -> None:
+    """Wait until the worker holding lock_key is done; its result is in the cache by then.
+
+    The cache key existing is not enough: the value there may be the one the
+    holder is replacing (a stale entry, or an image evicted from the store).
+    """
+    deadline = asyncio.get_running_loop().time() + SINGLEFLIGHT_WAIT_TIMEOUT
+    while asyncio.get_running_loop().time() < deadline:
+        try:
+            if not await redis_client.exists(lock_key):
+                return
+        except Exception as e:
+            _record_cache_error("lock wait", e)
+            return
+        await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+    logger.warning(f"Timed out waiting for remote computation of {cache_key[:50]}")
+
+async def get_hot_keys(limit: int) -> list:
+    """The most read cache keys with their estimated read counts and remaining TTLs."""
+    top = hot_keys.top(limit)
+    ttls = [None] * len(top)
+    if redis_client and top:
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key, _ in top:
+                    pipe.ttl(key)
+                ttls = [ttl if ttl >= 0 else None for ttl in await asyncio.wait_for(pipe.execute(), REDIS_OP_TIMEOUT)]
+        except Exception as e:
+            _record_cache_error("ttl", e)
+    return [{"key": key, "reads": reads, "ttl": ttl} for (key, reads), ttl in zip(top, ttls)]
 
 async def get_cache_info() -> dict:
     """Get Redis cache information and statistics."""
     cache_info = {
         "redis_connected": redis_client is not None,
-        "cache_stats": cache_stats.copy(),
+        "cache_stats": {
+            **cache_stats,
+            "tiers": {
+                "l1": l1_cache.snapshot(),
+                "redis": {"hits": cache_stats["hits"], "misses": cache_stats["misses"], "evictions": None},
+                "disk": {**disk_cache.snapshot(), "mode": DISK_CACHE_MODE},
+            },
+        },
+        "redis_pool": get_pool_stats(),
+        "single_flight": {stage: flight.snapshot() for stage, flight in flights.items()},
+        "progress": {
+            "local_trackers": len(progress_store),
+            "stream_subscribers": progress_hub.subscriber_count(),
+            "shared_store": progress_hub.connected,
+        },
+        "jobs": job_scheduler.snapshot(),
+        "hot_keys": hot_keys.snapshot(),
+        "compression": {**cache_codec.snapshot(), "fallback_images": fallback_image_stats},
+        "upstreams": {provider: guard.snapshot() for provider, guard in upstream_guards.items()},
+        "artwork_store": artwork_store.snapshot(),
+        "near_duplicates": {**lyrics_index.snapshot(), "threshold": LYRICS_SIMILARITY_THRESHOLD},
+        "summary_prompt": lyrics_preparer.snapshot(),
+        "summary_streams": {**summary_streams.snapshot(), "enabled": SUMMARY_STREAMING},
         "redis_info": None
     }
     
     if redis_client:
         try:
             # Get Redis server info
-            redis_info = redis_client.info()
+            redis_info = await asyncio.wait_for(redis_client.info(), REDIS_OP_TIMEOUT)
             cache_info["redis_info"] = {
                 "redis_version": redis_info.get("redis_version"),
                 "used_memory_human": redis_info.get("used_memory_human"),
@@ -143,6 +1019,7 @@ async def get_cache_info() -> dict:
                 "keyspace_misses": redis_info.get("keyspace_misses", 0),
                 "uptime_in_seconds": redis_info.get("uptime_in_seconds")
             }
+            cache_info["cache_stats"]["tiers"]["redis"]["evictions"] = redis_info.get("evicted_keys", 0)
             
             # Calculate hit rate
             total_requests = cache_stats["hits"] + cache_stats["misses"]
@@ -172,17 +1049,71 @@ def sanitize_input(text: str) -> str:
     text = re.sub(r'\s+', ' ', text.strip())
     return text
 
-app = FastAPI(title="Song Meaning AI")
+# Startup work that finishes in the background, after the server is already
+# accepting connections; /readyz waits for it
+startup_tasks = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_http_clients()
+    progress_hub.on_cancel = on_cancel_request
+    job_scheduler.start()
+    startup_tasks.update(
+        redis=asyncio.create_task(maintain_redis()),
+        openai=asyncio.create_task(init_openai_client()),
+        artwork_store=asyncio.create_task(artwork_store.start()),
+    )
+    if DISK_CACHE_MODE in ("tier", "fallback"):
+        startup_tasks["disk_cache"] = asyncio.create_task(disk_cache.start())
+    loop_monitor = asyncio.create_task(monitor_event_loop())
+    disk_cache_sync = asyncio.create_task(maintain_disk_cache())
+    yield
+    loop_monitor.cancel()
+    disk_cache_sync.cancel()
+    for task in startup_tasks.values():
+        task.cancel()
+    await asyncio.gather(*startup_tasks.values(), return_exceptions=True)
+    startup_tasks.clear()
+    await job_scheduler.stop()
+    await close_openai_client()
+    await close_http_clients()
+    await close_redis()
+    await disk_cache.close()
+
+# ---------- HTTP CACHING ----------
+# Seconds clients may reuse a song result before revalidating with its ETag
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "3600"))
+HTTP_COMPRESS_MIN_SIZE = int(os.getenv("HTTP_COMPRESS_MIN_SIZE", "1024"))
+
+def song_cache_control(max_age: int = HTTP_CACHE_MAX_AGE) -> str:
+    return f"public, max-age={max_age}, stale-while-revalidate={max_age * 24}"
+
+# Fallback results (placeholder artwork, generic summaries) should be re-checked on every view
+FALLBACK_CACHE_CONTROL = "no-cache"
+
+app = FastAPI(title="Song Meaning AI", lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=HTTP_COMPRESS_MIN_SIZE)
 
 class SongRequest(BaseModel):
     artist: str
     title: str
     style: Optional[str] = None
     language: Optional[str] = "en"  # "en" for English, "uk" for Ukrainian
+    priority: Literal["interactive", "bulk"] = "interactive"  # background jobs only
+
+class SpotifyTrack(BaseModel):
+    id: str
+    name: str
+    artist: str
+    preview_url: Optional[str]
+    external_url: str
+    image_url: Optional[str]
 
 class SongResponse(BaseModel):
     summary: str
     imageUrl: str
+    spotify: Optional[SpotifyTrack] = None  # looked up alongside the analysis
 
 class SummaryResponse(BaseModel):
     summary: str
@@ -190,14 +1121,6 @@ class SummaryResponse(BaseModel):
 class ImageResponse(BaseModel):
     imageUrl: str
 
-class SpotifyTrack(BaseModel):
-    id: str
-    name: str
-    artist: str
-    preview_url: Optional[str]
-    external_url: str
-    image_url: Optional[str]
-
 class SpotifyResponse(BaseModel):
     track: Optional[SpotifyTrack]
     found: bool
@@ -205,6 +1128,10 @@ class SpotifyResponse(BaseModel):
 class AnalyzeStartResponse(BaseModel):
     request_id: str
 
+class BatchAnalyzeRequest(BaseModel):
+    songs: List[SongRequest]
+    include_images: bool = False  # artwork is ~40x the cost of a summary
+
 # ---------- GLOBAL EXCEPTION HANDLER ----------
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -218,49 +1145,137 @@ async def global_exception_handler(request: Request, exc: Exception):
         },
     )
 
+# Whether /readyz waits for Redis. Off by default: without Redis the service
+# still answers (from L1 and the disk tier, or uncached), and a Redis outage
+# shouldn't take every worker out of rotation. Its state is reported either way.
+READY_REQUIRES_REDIS = os.getenv("READY_REQUIRES_REDIS", "false").lower() in ("1", "true", "yes")
+
+def startup_task_state(name: str) -> dict:
+    task = startup_tasks.get(name)
+    if task is None:
+        return {"state": "starting"}
+    if not task.done():
+        return {"state": "loading"}
+    if task.cancelled():
+        return {"state": "stopped"}
+    error = task.exception()
+    return {"state": "failed", "error": str(error)} if error else {"state": "ready"}
+
 @app.get("/healthz")
 def healthz():
+    """Liveness: the process is up and serving. Use /readyz to decide where traffic goes."""
     return {"status": "ok"}
 
+@app.get("/readyz")
+def readyz():
+    """Readiness: background startup has finished (and Redis is connected, if READY_REQUIRES_REDIS)."""
+    redis_check = {
+        **redis_status,
+        "since": datetime.fromtimestamp(redis_status["since"]).isoformat(),
+        "required": READY_REQUIRES_REDIS,
+    }
+    checks = {
+        "redis": redis_check,
+        "openai": startup_task_state("openai") if os.getenv("OPENAI_API_KEY") else {"state": "not_configured"},
+        "artwork_store": startup_task_state("artwork_store"),
+        "disk_cache": startup_task_state("disk_cache") if "disk_cache" in startup_tasks else {"state": "disabled"},
+    }
+    ready = all(check["state"] not in ("starting", "loading") for name, check in checks.items() if name != "redis")
+    if READY_REQUIRES_REDIS and redis_status["state"] not in ("connected", "disabled"):
+        ready = False
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+        headers={"cache-control": "no-store"},
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics for this worker."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/cache/health")
 async def cache_health():
     """Get cache health status and statistics."""
     return await get_cache_info()
 
+@app.api_route("/images/{blob_id}", methods=["GET", "HEAD"])
+async def artwork_image(blob_id: str, request: Request):
+    """Serve generated artwork from the local store (ETag, Range, cacheable forever)."""
+    blob = artwork_store.get(blob_id)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return BlobResponse(blob, request.headers, request.method)
+
+@app.get("/cache/hot")
+async def cache_hot(limit: int = 50):
+    """Most read cache keys recently (approximate), for choosing what to warm."""
+    limit = max(1, min(limit, HOT_KEYS_TOP_K))
+    return {"keys": await get_hot_keys(limit), **hot_keys.snapshot()}
+
 @app.get("/progress/{request_id}")
-async def progress_stream(request_id: str):
-    """Server-Sent Events endpoint for progress updates."""
+async def progress_stream(request_id: str, request: Request):
+    """Server-Sent Events endpoint for progress updates.
+
+    The first event carries the full state; later events carry only the
+    fields that changed. Reconnecting clients send Last-Event-ID and receive
+    the current state only if they missed something.
+    """
+    try:
+        last_seq = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_seq = 0
+
     async def event_generator():
-        # Send initial connection event
-        yield f"data: {json.dumps({'status': 'Connected to progress stream', 'progress': 0})}\n\n"
-        
-        sent_progress_steps = set()  # Track which progress steps we've sent
+        nonlocal last_seq
+        if not last_seq:
+            # Send initial connection event
+            yield format_sse({'status': 'Connected to progress stream', 'progress': 0})
         
-        while True:
-            if request_id in progress_store:
-                tracker = progress_store[request_id]
-                current_progress = tracker.progress
-                
-                # Always send current state
-                data = json.dumps(tracker.to_dict())
-                yield f"data: {data}\n\n"
-                
-                # Track progress milestones to ensure they're sent
-                progress_key = f"{current_progress}:{tracker.status}"
-                sent_progress_steps.add(progress_key)
-                
-                # If completed, send final event and cleanup
-                if tracker.progress >= 100:
-                    yield f"data: {json.dumps({'status': 'completed', 'progress': 100})}\n\n"
-                    # Clean up after 30 seconds
-                    await asyncio.sleep(30)
-                    progress_store.pop(request_id, None)
-                    break
-            else:
-                yield f"data: {json.dumps({'error': 'Request not found'})}\n\n"
-                break
+        # Subscribe before reading the snapshot so no update can slip in between
+        queue = progress_hub.subscribe(request_id)
+        state = None
+        try:
+            snapshot = await load_progress(request_id)
+            if snapshot is None:
+                yield format_sse({'error': 'Request not found'})
+                return
+            seq, state = snapshot
+            await change_watchers(request_id, 1)
+            if seq > last_seq:
+                yield format_sse(state, seq)
+                last_seq = seq
+            
+            while state.get("progress", 0) < 100:
+                try:
+                    event = json.loads(await asyncio.wait_for(queue.get(), PROGRESS_RESYNC_INTERVAL))
+                except asyncio.TimeoutError:
+                    event = None
+                if event and event["seq"] <= last_seq:
+                    continue  # duplicate delivery
+                if event and event["seq"] == last_seq + 1:
+                    state.update(event["delta"])
+                    yield format_sse(event["delta"], event["seq"])
+                    last_seq = event["seq"]
+                    continue
+                # Idle or a gap in the sequence: re-sync from the stored state
+                snapshot = await load_progress(request_id)
+                if snapshot is None:
+                    yield format_sse({'error': 'Request not found'})
+                    return
+                seq, state = snapshot
+                if seq > last_seq:
+                    yield format_sse(state, seq)
+                    last_seq = seq
+                else:
+                    yield ": keep-alive\n\n"
             
-            await asyncio.sleep(0.3)  # More frequent updates - every 300ms
+            yield format_sse({'status': 'completed', 'progress': 100})
+        finally:
+            progress_hub.unsubscribe(request_id, queue)
+            if state is not None:
+                # Runs detached: this generator may be closing because the client went away
+                spawn_background(stream_closed(request_id, state.get("progress", 0) >= 100))
     
     return StreamingResponse(
         event_generator(),
@@ -282,14 +1297,75 @@ async def analyze_start(req: SongRequest):
         raise HTTPException(status_code=400, detail="Artist and title are required.")
     
     request_id = str(uuid.uuid4())
+    evict_finished_trackers()
+    tracker = ProgressTracker(request_id)
     
-    # Start analysis in background
-    asyncio.create_task(analyze_song_background(request_id, req))
+    # Queue analysis for the background workers
+    try:
+        job_scheduler.submit(request_id, lambda: analyze_song_background(tracker, req), req.priority)
+    except QueueFullError as e:
+        progress_store.pop(request_id, None)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many analyses in progress. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    await tracker.update(0, "Queued...")
     
     return AnalyzeStartResponse(request_id=request_id)
 
+@app.post("/analyze/batch")
+async def analyze_batch(req: BatchAnalyzeRequest):
+    """Analyze many songs at once, streaming one NDJSON line per song as it finishes."""
+    if not req.songs:
+        raise HTTPException(status_code=400, detail="At least one song is required.")
+    if len(req.songs) > BATCH_MAX_SONGS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_SONGS} songs.")
+
+    # Dedupe repeated songs; every index of a duplicate gets the same result
+    unique = {}
+    invalid = []
+    for index, song in enumerate(req.songs):
+        artist = sanitize_input(song.artist)
+        title = sanitize_input(song.title)
+        if not artist or not title:
+            invalid.append(index)
+            continue
+        language = song.language or "en"
+        style = song.style or "album cover"
+        alias = song_alias(artist, title)
+        # Style only matters for the artwork
+        key = (alias, language, style.lower() if req.include_images else None)
+        if key not in unique:
+            unique[key] = {
+                "artist": artist, "title": title, "alias": alias, "language": language, "style": style, "indexes": [],
+            }
+        unique[key]["indexes"].append(index)
+
+    async def result_stream():
+        for index in invalid:
+            yield json.dumps({"index": index, "error": "Artist and title are required."}) + "\n"
+        if not unique:
+            return
+        songs = list(unique.values())
+        await prefetch_batch(songs, req.include_images)
+        # Limits are per batch, so one large batch can't hold up the others on this worker
+        limits = (asyncio.Semaphore(BATCH_CONCURRENCY), asyncio.Semaphore(BATCH_LYRICS_CONCURRENCY))
+        tasks = [asyncio.create_task(analyze_batch_item(song, req.include_images, limits)) for song in songs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                song, result = await next_done
+                for index in song["indexes"]:
+                    yield json.dumps({"index": index, "artist": song["artist"], "title": song["title"], **result}) + "\n"
+        finally:
+            # Client went away or the stream finished: stop any remaining work
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
 @app.post("/analyze", response_model=SongResponse)
-async def analyze(req: SongRequest):
+async def analyze(req: SongRequest, request: Request):
     """Legacy synchronous analyze endpoint (kept for compatibility)."""
     try:
         artist = sanitize_input(req.artist)
@@ -297,22 +1373,35 @@ async def analyze(req: SongRequest):
         if not artist or not title:
             raise HTTPException(status_code=400, detail="Artist and title are required.")
 
-        lyrics = await fetch_lyrics(artist, title)
-        if not lyrics:
-            raise HTTPException(status_code=404, detail=f"Lyrics not found for '{artist} - {title}'. Try another song.")
-
-        summary = await summarize_lyrics(lyrics, artist, title, req.language or "en")
-        image_url = await generate_song_artwork(artist, title, summary, req.style or "album cover")
-        return SongResponse(summary=summary, imageUrl=image_url)
+        async with build_song_pipeline(artist, title, req.language or "en", req.style or "album cover") as pipeline:
+            # The Spotify lookup overlaps with the lyrics → summary → artwork chain
+            pipeline.start("spotify")
+            image_url = await pipeline.get("artwork")
+            summary = await pipeline.get("summary")
+            result = SongResponse(
+                summary=summary,
+                imageUrl=image_url,
+                spotify=await spotify_if_ready(pipeline),
+            )
+        fallback = image_url.startswith("data:") or isinstance(summary, FallbackSummary)
+        cache_control = FALLBACK_CACHE_CONTROL if fallback else song_cache_control()
+        return cacheable_json(request, result.model_dump(mode="json"), cache_control)
 
     except HTTPException as http_exc:
         raise http_exc  # let FastAPI handle known errors
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"Error in /analyze endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@app.get("/analyze", response_model=SongResponse)
+async def analyze_get(request: Request, req: SongRequest = Depends()):
+    """GET form of POST /analyze, with the request as query parameters so results can be revalidated."""
+    return await analyze(req, request)
+
 @app.post("/summarize", response_model=SummaryResponse)
-async def summarize_only(req: SongRequest):
+async def summarize_only(req: SongRequest, request: Request):
     """Summarize song lyrics only (no image generation)."""
     try:
         artist = sanitize_input(req.artist)
@@ -320,21 +1409,83 @@ async def summarize_only(req: SongRequest):
         if not artist or not title:
             raise HTTPException(status_code=400, detail="Artist and title are required.")
 
-        lyrics = await fetch_lyrics(artist, title)
-        if not lyrics:
-            raise HTTPException(status_code=404, detail=f"Lyrics not found for '{artist} - {title}'. Try another song.")
-
-        summary = await summarize_lyrics(lyrics, artist, title, req.language or "en")
-        return SummaryResponse(summary=summary)
+        async with build_song_pipeline(artist, title, req.language or "en", req.style or "album cover") as pipeline:
+            summary = await pipeline.get("summary")
+        result = SummaryResponse(summary=summary).model_dump(mode="json")
+        if isinstance(summary, FallbackSummary):
+            return FastJSONResponse(result, headers={"cache-control": FALLBACK_CACHE_CONTROL})
+        return cacheable_json(request, result, song_cache_control())
 
     except HTTPException as http_exc:
         raise http_exc
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"Error in /summarize endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@app.get("/summarize", response_model=SummaryResponse)
+async def summarize_get(request: Request, req: SongRequest = Depends()):
+    """GET form of POST /summarize, with the request as query parameters so results can be revalidated."""
+    return await summarize_only(req, request)
+
+@app.post("/summarize/stream")
+async def summarize_stream(req: SongRequest):
+    """Summarize song lyrics, streaming the summary as Server-Sent Events while it is generated.
+
+    Events carry {"delta": text} to append, {"reset": true} if generation
+    started over, then {"summary": ...} with the complete (cached) summary,
+    or {"error": ...}. A cached summary comes as the only event. Songs
+    without lyrics are answered with a plain 404 before any event.
+    """
+    artist = sanitize_input(req.artist)
+    title = sanitize_input(req.title)
+    if not artist or not title:
+        raise HTTPException(status_code=400, detail="Artist and title are required.")
+    language = req.language or "en"
+
+    pipeline = build_song_pipeline(artist, title, language, req.style or "album cover")
+    try:
+        lyrics = await pipeline.get("lyrics")
+    except UpstreamUnavailableError as e:
+        pipeline.cancel()
+        raise upstream_unavailable(e)
+    except Exception as e:
+        pipeline.cancel()
+        logger.error(f"Error in /summarize/stream endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+    if not lyrics:
+        pipeline.cancel()
+        raise HTTPException(status_code=404, detail=f"Lyrics not found for '{artist} - {title}'. Try another song.")
+
+    async def event_generator():
+        async with pipeline:
+            summary = asyncio.ensure_future(pipeline.get("summary"))
+            try:
+                async for kind, text in follow_until(
+                    summary_streams, summary_cache_key(lyrics, language), summary, SUMMARY_STREAM_INTERVAL
+                ):
+                    yield format_sse({"delta": text} if kind == "delta" else {"reset": True})
+                yield format_sse({"summary": await summary})
+            except UpstreamUnavailableError as e:
+                yield format_sse({
+                    "error": f"{e.provider} is temporarily unavailable. Please try again shortly.",
+                    "retry_after": e.retry_after,
+                })
+            except Exception as e:
+                logger.error(f"Error in /summarize/stream endpoint: {e}", exc_info=True)
+                yield format_sse({"error": "An unexpected error occurred."})
+            finally:
+                summary.cancel()
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/generate", response_model=ImageResponse)
-async def generate_only(req: SongRequest):
+async def generate_only(req: SongRequest, request: Request):
     """Generate AI artwork only (requires summary in request body)."""
     try:
         artist = sanitize_input(req.artist)
@@ -343,22 +1494,26 @@ async def generate_only(req: SongRequest):
             raise HTTPException(status_code=400, detail="Artist and title are required.")
 
         # For image generation, we need lyrics to create a meaningful summary
-        lyrics = await fetch_lyrics(artist, title)
-        if not lyrics:
-            raise HTTPException(status_code=404, detail=f"Lyrics not found for '{artist} - {title}'. Try another song.")
-
-        summary = await summarize_lyrics(lyrics, artist, title, req.language or "en")
-        image_url = await generate_song_artwork(artist, title, summary, req.style or "album cover")
-        return ImageResponse(imageUrl=image_url)
+        async with build_song_pipeline(artist, title, req.language or "en", req.style or "album cover") as pipeline:
+            result = ImageResponse(imageUrl=await pipeline.get("artwork"))
+        cache_control = FALLBACK_CACHE_CONTROL if result.imageUrl.startswith("data:") else song_cache_control()
+        return cacheable_json(request, result.model_dump(mode="json"), cache_control)
 
     except HTTPException as http_exc:
         raise http_exc
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"Error in /generate endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@app.get("/generate", response_model=ImageResponse)
+async def generate_get(request: Request, req: SongRequest = Depends()):
+    """GET form of POST /generate, with the request as query parameters so results can be revalidated."""
+    return await generate_only(req, request)
+
 @app.post("/spotify/search", response_model=SpotifyResponse)
-async def spotify_search(req: SongRequest):
+async def spotify_search(req: SongRequest, request: Request):
     """Search for a track on Spotify."""
     try:
         artist = sanitize_input(req.artist)
@@ -366,53 +1521,211 @@ async def spotify_search(req: SongRequest):
         if not artist or not title:
             raise HTTPException(status_code=400, detail="Artist and title are required.")
 
-        track = await search_spotify_track(artist, title)
-        return SpotifyResponse(track=track, found=track is not None)
+        async with build_song_pipeline(artist, title, req.language or "en", req.style or "album cover") as pipeline:
+            track = await pipeline.get("spotify")
+        result = SpotifyResponse(track=track, found=track is not None)
+        # Track matches rarely change; misses are retried after the negative cache expires
+        max_age = 24 * 3600 if track else NEGATIVE_CACHE_TTL
+        return cacheable_json(request, result.model_dump(mode="json"), song_cache_control(max_age))
 
     except HTTPException as http_exc:
         raise http_exc
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         logger.error(f"Error in /spotify/search endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
-async def analyze_song_background(request_id: str, req: SongRequest):
+@app.get("/spotify/search", response_model=SpotifyResponse)
+async def spotify_search_get(request: Request, req: SongRequest = Depends()):
+    """GET form of POST /spotify/search, with the request as query parameters so results can be revalidated."""
+    return await spotify_search(req, request)
+
+async def analyze_song_background(tracker: ProgressTracker, req: SongRequest):
     """Background task for song analysis with progress tracking."""
-    tracker = ProgressTracker(request_id)
-    
+    request_id = tracker.request_id
+    artist = sanitize_input(req.artist)
+    title = sanitize_input(req.title)
+    pipeline = build_song_pipeline(artist, title, req.language or "en", req.style or "album cover", tracker)
     try:
-        artist = sanitize_input(req.artist)
-        title = sanitize_input(req.title)
-        
+        # Spotify runs next to the whole chain so the result can usually include the track
+        pipeline.start("spotify")
+
         # Step 1: Fetch lyrics (0-30%)
         await tracker.update(5, "Searching for lyrics...")
-        lyrics = await fetch_lyrics_with_progress(artist, title, tracker)
+        lyrics = await pipeline.get("lyrics")
         if not lyrics:
             await tracker.update(100, f"Error: Lyrics not found for '{artist} - {title}'")
             return
         
         # Step 2: Generate summary (30-70%)
         await tracker.update(35, "Analyzing song meaning...")
-        summary = await summarize_lyrics_with_progress(lyrics, artist, title, req.language or "en", tracker)
+        summary = await pipeline.get("summary")
         
         # Step 3: Generate artwork (70-100%)
         await tracker.update(75, "Generating AI artwork...")
-        image_url = await generate_song_artwork_with_progress(artist, title, summary, req.style or "album cover", tracker)
+        image_url = await pipeline.get("artwork")
         
-        await tracker.update(100, "Analysis complete!")
+        # Store final result in tracker before publishing completion
+        tracker.result = SongResponse(summary=summary, imageUrl=image_url, spotify=await spotify_if_ready(pipeline))
         
-        # Store final result in tracker
-        tracker.result = SongResponse(summary=summary, imageUrl=image_url)
+        await tracker.update(100, "Analysis complete!")
         
+    except asyncio.CancelledError:
+        tracker.error = "Analysis cancelled"
+        await tracker.update(100, "Cancelled")
+        raise
+    except UpstreamUnavailableError as e:
+        logger.warning(f"Background analysis stopped: {e}")
+        tracker.error = str(e)
+        await tracker.update(100, f"Error: {e.provider} is temporarily unavailable, please retry in {e.retry_after}s")
     except Exception as e:
         logger.error(f"Background analysis error: {e}", exc_info=True)
         await tracker.update(100, f"Error: {str(e)}")
+    finally:
+        pipeline.cancel()
+        # Final state is in Redis; without a shared store keep the tracker around for late streams
+        if redis_client:
+            progress_store.pop(request_id, None)
+        else:
+            evict_finished_trackers()
+
+# ---- Stage graph ----
+def build_song_pipeline(
+    artist: str, title: str, language: str, style: str, tracker: Optional[ProgressTracker] = None
+) -> Pipeline:
+    """Stages for one song: identity → lyrics → summary → artwork, with the Spotify lookup independent.
+
+    Each endpoint asks only for the artifacts it needs; shared ones (lyrics
+    for summary and artwork) are computed once per request. With a tracker
+    the stages report progress as they go.
+    """
+    async def lyrics_stage(song):
+        if song is None:
+            return None
+        if tracker:
+            return await fetch_lyrics_with_progress(song, tracker)
+        return await fetch_lyrics(song)
+
+    async def summary_stage(lyrics):
+        if not lyrics:
+            raise HTTPException(status_code=404, detail=f"Lyrics not found for '{artist} - {title}'. Try another song.")
+        if tracker:
+            return await summarize_lyrics_with_progress(lyrics, artist, title, language, tracker)
+        return await summarize_lyrics(lyrics, artist, title, language)
+
+    async def artwork_stage(song, summary):
+        if tracker:
+            return await generate_song_artwork_with_progress(song, artist, title, summary, style, tracker)
+        return await generate_song_artwork(song, artist, title, summary, style)
+
+    return (
+        Pipeline(observer=record_stage)
+        .add("song", lambda: resolve_song(artist, title))
+        .add("lyrics", lyrics_stage, ["song"])
+        .add("summary", summary_stage, ["lyrics"])
+        .add("artwork", artwork_stage, ["song", "summary"])
+        .add("spotify", lambda: search_spotify_track(artist, title))
+    )
+
+# Once the rest of a song result is ready, how long it may still wait for the Spotify lookup
+SPOTIFY_RESULT_WAIT = float(os.getenv("SPOTIFY_RESULT_WAIT", "0.2"))
+
+async def spotify_if_ready(pipeline: Pipeline) -> Optional[SpotifyTrack]:
+    """The pipeline's Spotify match if it arrives within SPOTIFY_RESULT_WAIT, else None.
+
+    The track is an extra on a song result, so a slow or failing Spotify
+    never holds the result up; clients can still ask /spotify/search.
+    """
+    try:
+        return await asyncio.wait_for(pipeline.get("spotify"), SPOTIFY_RESULT_WAIT)
+    except asyncio.TimeoutError:
+        return None
+    except Exception as e:
+        logger.warning(f"Leaving the Spotify track out of the result: {e}")
+        return None
+
+# ---- Batch analysis ----
+BATCH_MAX_SONGS = int(os.getenv("BATCH_MAX_SONGS", "500"))
+# Songs of one batch processed at the same time, and how many of them may hit Genius at once
+# (per batch; upstream calls are bounded overall by the OpenAI semaphores and upstream guards)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_LYRICS_CONCURRENCY = int(os.getenv("BATCH_LYRICS_CONCURRENCY", "4"))
+
+async def prefetch_batch(songs: list, include_images: bool) -> None:
+    """Look up every stage of a batch in the cache with one round trip per stage.
+
+    Stale entries are served and refreshed in the background, as single lookups are.
+    """
+    for song in songs:
+        song["song"] = None if os.getenv("GENIUS_API_TOKEN") else SongIdentity(song["alias"])
+    unresolved = [s for s in songs if s["song"] is None]
+    keys = [song_alias_cache_key(s["alias"]) for s in unresolved]
+    for song, key, (identity, ttl) in zip(unresolved, keys, await get_many_from_cache_with_ttl(keys)):
+        refresh = lambda s=song, key=key: _resolve_song(s["artist"], s["title"], s["alias"], key)
+        identity = revalidate("identity", key, identity, ttl, refresh)
+        if identity and identity != NEGATIVE_CACHE_VALUE:
+            song["song"] = SongIdentity.from_json(song["alias"], identity)
+    for song in songs:
+        song["lyrics"] = None
+    resolved = [s for s in songs if s["song"]]
+    keys = [lyrics_cache_key(s["song"]) for s in resolved]
+    for song, key, (lyrics, ttl) in zip(resolved, keys, await get_many_from_cache_with_ttl(keys)):
+        refresh = lambda s=song, key=key: _fetch_lyrics(s["song"], key)
+        song["lyrics"] = revalidate("lyrics", key, lyrics, ttl, refresh)
+    with_lyrics = [s for s in songs if s["lyrics"] and s["lyrics"] != NEGATIVE_CACHE_VALUE]
+    keys = [summary_cache_key(s["lyrics"], s["language"]) for s in with_lyrics]
+    for song, key, (summary, ttl) in zip(with_lyrics, keys, await get_many_from_cache_with_ttl(keys)):
+        refresh = lambda s=song, key=key: _summarize_lyrics(s["lyrics"], s["artist"], s["title"], s["language"], key)
+        song["summary"] = revalidate("summary", key, summary, ttl, refresh)
+    if include_images:
+        with_summary = [s for s in with_lyrics if s["summary"]]
+        keys = [image_cache_key(s["song"], s["summary"], s["style"]) for s in with_summary]
+        for song, key, (image, ttl) in zip(with_summary, keys, await get_many_from_cache_with_ttl(keys)):
+            refresh = lambda s=song, key=key: _generate_song_artwork(s["artist"], s["title"], s["summary"], s["style"], key)
+            image = revalidate("image", key, image, ttl, refresh)
+            song["imageUrl"] = artwork_url(image, song["artist"], song["title"], song["style"])
+
+async def analyze_batch_item(song: dict, include_images: bool, limits: tuple) -> tuple:
+    """Run the missing stages for one batch song; returns (song, result fields).
+
+    limits is the batch's own (songs, lyrics lookups) semaphore pair.
+    """
+    artist, title = song["artist"], song["title"]
+    songs_limit, lyrics_limit = limits
+    try:
+        async with songs_limit:
+            lyrics = song.get("lyrics")
+            if not lyrics:
+                async with lyrics_limit:
+                    identity = song.get("song") or await resolve_song(artist, title)
+                    lyrics = await fetch_lyrics(identity) if identity else None
+                    song["song"] = identity
+            if not lyrics or lyrics == NEGATIVE_CACHE_VALUE:
+                return song, {"error": f"Lyrics not found for '{artist} - {title}'."}
+            summary = song.get("summary") or await summarize_lyrics(lyrics, artist, title, song["language"])
+            result = {"summary": summary}
+            if include_images:
+                result["imageUrl"] = song.get("imageUrl") or await generate_song_artwork(
+                    song["song"], artist, title, summary, song["style"]
+                )
+            return song, result
+    except UpstreamUnavailableError as e:
+        return song, {"error": f"{e.provider} is temporarily unavailable.", "retry_after": e.retry_after}
+    except Exception as e:
+        logger.error(f"Error in batch item '{artist} - {title}': {e}", exc_info=True)
+        return song, {"error": "An unexpected error occurred."}
 
 # ---- Spotify search functionality ----
 async def search_spotify_track(artist: str, title: str) -> Optional[SpotifyTrack]:
     """Search for a track on Spotify and return track details."""
     # Check cache first
-    cache_key = get_cache_key("spotify", artist, title)
+    # Every spelling of the song shares one lookup
+    cache_key = get_cache_key("spotify", song_alias(artist, title))
     cached_track = await get_from_cache(cache_key)
+    if cached_track == NEGATIVE_CACHE_VALUE:
+        cache_stats["negative_hits"] += 1
+        return None
     if cached_track:
         try:
             track_data = json.loads(cached_track)
@@ -426,9 +1739,8 @@ async def search_spotify_track(artist: str, title: str) -> Optional[SpotifyTrack
         return None
     
     try:
-        import httpx
-        search_query = f"track:{title} artist:{artist}"
-        search_url = "https://api.spotify.com/v1/search"
+        search_query = f"track:{clean_title(title)} artist:{clean_artist(artist)}"
+        search_url = f"{SPOTIFY_API_BASE}/v1/search"
         headers = {"Authorization": f"Bearer {spotify_token}"}
         params = {
             "q": search_query,
@@ -437,172 +1749,316 @@ async def search_spotify_track(artist: str, title: str) -> Optional[SpotifyTrack
             "market": "US"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(search_url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            tracks = data.get("tracks", {}).get("items", [])
-            if not tracks:
-                logger.info(f"No Spotify track found for {artist} - {title}")
-                return None
-            
-            track_info = tracks[0]
-            
-            # Extract track information
-            spotify_track = SpotifyTrack(
-                id=track_info["id"],
-                name=track_info["name"],
-                artist=track_info["artists"][0]["name"] if track_info["artists"] else artist,
-                preview_url=track_info.get("preview_url"),
-                external_url=track_info["external_urls"]["spotify"],
-                image_url=track_info["album"]["images"][0]["url"] if track_info["album"]["images"] else None
-            )
-            
-            # Cache the track info for 7 days
-            await set_cache(cache_key, spotify_track.model_dump_json(), 7 * 24 * 3600)
-            
-            return spotify_track
-            
+        client = get_http_client("spotify")
+
+        async def search():
+            with track_upstream("spotify"):
+                response = await client.get(search_url, headers=headers, params=params)
+                response.raise_for_status()
+            return response
+
+        data = (await upstream_guards["spotify"].call(search)).json()
+        
+        tracks = data.get("tracks", {}).get("items", [])
+        if not tracks:
+            logger.info(f"No Spotify track found for {artist} - {title}")
+            await cache_not_found(cache_key)
+            return None
+        
+        track_info = tracks[0]
+        
+        # Extract track information
+        spotify_track = SpotifyTrack(
+            id=track_info["id"],
+            name=track_info["name"],
+            artist=track_info["artists"][0]["name"] if track_info["artists"] else artist,
+            preview_url=track_info.get("preview_url"),
+            external_url=track_info["external_urls"]["spotify"],
+            image_url=track_info["album"]["images"][0]["url"] if track_info["album"]["images"] else None
+        )
+        
+        # Cache the track info for 7 days
+        await set_cache(cache_key, spotify_track.model_dump_json(), 7 * 24 * 3600)
+        
+        return spotify_track
+        
+    except UpstreamUnavailableError as e:
+        # The track is optional; just don't cache the miss
+        logger.warning(f"Skipping Spotify lookup: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error searching Spotify: {e}", exc_info=True)
         return None
 
 # ---- Lyrics fetching with Genius ----
-async def fetch_lyrics_with_progress(artist: str, title: str, tracker: ProgressTracker) -> Optional[str]:
+# HTML parsing runs on a small dedicated pool so it never stalls the event loop
+LYRICS_PARSE_WORKERS = int(os.getenv("LYRICS_PARSE_WORKERS", "2"))
+lyrics_parse_executor = ThreadPoolExecutor(max_workers=LYRICS_PARSE_WORKERS, thread_name_prefix="lyrics-parse")
+
+async def fetch_lyrics_with_progress(song: SongIdentity, tracker: ProgressTracker) -> Optional[str]:
     """Fetch lyrics with progress updates."""
     await tracker.update(10, "Searching lyrics database...")
-    await asyncio.sleep(0.5)  # Small delay to show progress
     
-    result = await fetch_lyrics(artist, title)
+    result = await fetch_lyrics(song)
     
     if result:
         await tracker.update(30, "Lyrics found!")
-        await asyncio.sleep(0.3)  # Brief pause before next step
     return result
 
-async def fetch_lyrics(artist: str, title: str) -> Optional[str]:
+async def fetch_lyrics(song: SongIdentity) -> Optional[str]:
+    cache_key = lyrics_cache_key(song)
+    compute = lambda: _fetch_lyrics(song, cache_key)
     # Check cache first
-    cache_key = get_cache_key("lyrics", artist, title)
-    cached_lyrics = await get_from_cache(cache_key)
-    if cached_lyrics:
-        return cached_lyrics
-    
-    genius_token = os.getenv("GENIUS_API_TOKEN")
-    if not genius_token:
-        demo = {
-            ("Metallica", "Nothing Else Matters"): "[Demo lyrics - configure GENIUS_API_TOKEN for real lyrics]",
-            ("Океан Ельзи", "Без бою"): "[Demo lyrics - configure GENIUS_API_TOKEN for real lyrics]",
-        }
-        lyrics = demo.get((artist, title))
+    lyrics = await get_or_refresh("lyrics", cache_key, compute) or await run_single_flight("lyrics", cache_key, compute)
+    return None if lyrics == NEGATIVE_CACHE_VALUE else lyrics
+
+DEMO_LYRICS = {
+    song_alias("Metallica", "Nothing Else Matters"): "[Demo lyrics - configure GENIUS_API_TOKEN for real lyrics]",
+    song_alias("Океан Ельзи", "Без бою"): "[Demo lyrics - configure GENIUS_API_TOKEN for real lyrics]",
+}
+
+async def _fetch_lyrics(song: SongIdentity, cache_key: str) -> Optional[str]:
+    if not os.getenv("GENIUS_API_TOKEN"):
+        lyrics = DEMO_LYRICS.get(song.alias)
         if lyrics:
             # Cache demo lyrics for 24 hours
-            await set_cache(cache_key, lyrics, 24 * 3600)
+            await set_cache(cache_key, lyrics, 24 * 3600, CACHE_STALE_TTL)
         return lyrics
+    if not song.path:
+        return None
     try:
-        import httpx, re
-        search_query = f"{title} {artist}"
-        search_url = f"https://api.genius.com/search?q={search_query}"
-        headers = {"Authorization": f"Bearer {genius_token}"}
-        async with httpx.AsyncClient() as client:
-            search_response = await client.get(search_url, headers=headers)
-            search_response.raise_for_status()
-            search_data = search_response.json()
-            hits = search_data.get("response", {}).get("hits", [])
-            if not hits:
-                return None
-            song_data = None
-            for hit in hits:
-                result = hit.get("result", {})
-                if title.lower() in result.get("title", "").lower() and artist.lower() in result.get("primary_artist", {}).get("name", "").lower():
-                    song_data = result
-                    break
-            if not song_data:
-                song_data = hits[0].get("result", {})
-            song_path = song_data.get("path")
-            if not song_path:
-                return None
-            song_url = f"https://genius.com{song_path}"
-            page_response = await client.get(song_url)
-            page_response.raise_for_status()
-            html_content = page_response.text
-            lyrics_match = re.search(r'<div[^>]*data-lyrics-container[^>]*>(.*?)</div>', html_content, re.DOTALL)
-            if lyrics_match:
-                lyrics_html = lyrics_match.group(1)
-                lyrics = re.sub(r'<[^>]+>', '\n', lyrics_html)
-                lyrics = re.sub(r'\[.*?\]', '', lyrics)
-                lyrics = re.sub(r'\n+', '\n', lyrics).strip()
-                if lyrics:
-                    # Cache lyrics for 7 days (lyrics don't change)
-                    await set_cache(cache_key, lyrics, 7 * 24 * 3600)
-                    return lyrics
-            lyrics_pattern = r'"lyrics":"([^"]*)"'
-            lyrics_match = re.search(lyrics_pattern, html_content)
-            if lyrics_match:
-                lyrics = lyrics_match.group(1).replace('\\n', '\n').replace('\\"', '"')
-                if lyrics.strip():
-                    # Cache lyrics for 7 days 
-                    await set_cache(cache_key, lyrics.strip(), 7 * 24 * 3600)
-                    return lyrics.strip()
+        song_url = f"{GENIUS_WEB_BASE}{song.path}"
+        client = get_http_client("genius")
+
+        async def download():
+            # Parse the page as it downloads and stop once the lyrics section ends
+            with track_upstream("genius"):
+                async with client.stream("GET", song_url) as page_response:
+                    page_response.raise_for_status()
+                    return await extract_lyrics_from_stream(page_response.aiter_text(), lyrics_parse_executor)
+
+        lyrics = await upstream_guards["genius"].call(download)
+        if lyrics:
+            # Cache lyrics for 7 days (lyrics don't change)
+            await set_cache(cache_key, lyrics, 7 * 24 * 3600, CACHE_STALE_TTL)
+            return lyrics
+        await cache_not_found(cache_key)
         return None
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching lyrics: {e}", exc_info=True)
         return None
 
+# ---- Song identity ----
+# Every spelling of a song (remaster/live/feat. suffixes, diacritics, Cyrillic
+# or Latin script) resolves through a persistent alias index to one Genius
+# song id, and the lyrics and artwork caches are keyed on that id.
+SONG_ALIAS_TTL = int(os.getenv("SONG_ALIAS_TTL", str(365 * 24 * 3600)))
+
+async def resolve_song(artist: str, title: str) -> Optional[SongIdentity]:
+    """Map an artist/title to its song identity; None if Genius has no such song."""
+    alias = song_alias(artist, title)
+    if not os.getenv("GENIUS_API_TOKEN"):
+        return SongIdentity(alias)
+    cache_key = song_alias_cache_key(alias)
+    compute = lambda: _resolve_song(artist, title, alias, cache_key)
+    value = await get_or_refresh("identity", cache_key, compute) or await run_single_flight("identity", cache_key, compute)
+    if not value or value == NEGATIVE_CACHE_VALUE:
+        return None
+    return SongIdentity.from_json(alias, value)
+
+async def _resolve_song(artist: str, title: str, alias: str, cache_key: str) -> Optional[str]:
+    try:
+        artist, title = clean_artist(artist), clean_title(title)
+        search_url = f"{GENIUS_API_BASE}/search"
+        headers = {"Authorization": f"Bearer {os.getenv('GENIUS_API_TOKEN')}"}
+        client = get_http_client("genius")
+
+        async def search():
+            with track_upstream("genius"):
+                search_response = await client.get(search_url, headers=headers, params={"q": f"{title} {artist}"})
+                search_response.raise_for_status()
+            return search_response
+
+        search_data = (await upstream_guards["genius"].call(search)).json()
+        hits = search_data.get("response", {}).get("hits", [])
+        if not hits:
+            await cache_not_found(cache_key)
+            return None
+        song_data = None
+        folded_title, folded_artist = fold(title), fold(artist)
+        for hit in hits:
+            result = hit.get("result", {})
+            if folded_title in fold(clean_title(result.get("title", ""))) and folded_artist in fold(result.get("primary_artist", {}).get("name", "")):
+                song_data = result
+                break
+        if not song_data:
+            song_data = hits[0].get("result", {})
+        if song_data.get("id") is None or not song_data.get("path"):
+            await cache_not_found(cache_key)
+            return None
+        value = SongIdentity(
+            alias, song_data["id"], song_data["path"],
+            song_data.get("primary_artist", {}).get("name"), song_data.get("title"),
+        ).to_json()
+        await set_cache(cache_key, value, SONG_ALIAS_TTL, CACHE_STALE_TTL)
+        return value
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error resolving song identity: {e}", exc_info=True)
+        return None
+
 # ---- Summarization ----
+# Lyrics that differ only slightly from ones already summarized (live versions,
+# remasters, clean edits, scrape differences) reuse that summary. Only the same
+# artist's songs are compared: a cover's summary must not name the original
+# artist. Similarity is the estimated Jaccard index of word shingles; 0
+# disables the lookup.
+LYRICS_SIMILARITY_THRESHOLD = float(os.getenv("LYRICS_SIMILARITY_THRESHOLD", "0.8"))
+
+lyrics_index = NearDuplicateIndex(
+    ttl_seconds=7 * 24 * 3600 + CACHE_STALE_TTL,
+    redis=lambda: redis_client,
+    op_timeout=REDIS_OP_TIMEOUT,
+)
+
+# The prompt gets the lyrics with markup noise stripped and repeated choruses
+# collapsed, trimmed stanza by stanza to this many tokens (0: no limit)
+LYRICS_TOKEN_BUDGET = int(os.getenv("LYRICS_TOKEN_BUDGET", "1200"))
+
+lyrics_preparer = LyricsPreparer(LYRICS_TOKEN_BUDGET)
+
+# Summaries are requested with stream=True and their text handed to progress
+# streams and /summarize/stream as it arrives; the cache still gets the whole
+# summary once it is complete
+SUMMARY_STREAMING = os.getenv("SUMMARY_STREAMING", "true").lower() in ("1", "true", "yes")
+# Least time between two partial-summary events sent to one client
+SUMMARY_STREAM_INTERVAL = float(os.getenv("SUMMARY_STREAM_INTERVAL", "0.05"))
+
+summary_streams = TextStreams()
+
+class FallbackSummary(str):
+    """The generic summary given when OpenAI failed; not cached here, and not to be cached by clients."""
+
 async def summarize_lyrics_with_progress(lyrics: str, artist: str, title: str, language: str, tracker: ProgressTracker) -> str:
-    """Summarize lyrics with progress updates."""
-    await tracker.update(40, "Processing with AI...")
-    await asyncio.sleep(0.8)  # Show processing step
-    
-    await tracker.update(60, "Generating analysis...")
-    await asyncio.sleep(0.5)  # Show generation step
+    """Summarize lyrics with progress updates, publishing the summary text as it is generated."""
+    await tracker.update(40, "Generating analysis...")
     
-    result = await summarize_lyrics(lyrics, artist, title, language)
+    summary = asyncio.ensure_future(summarize_lyrics(lyrics, artist, title, language))
+    try:
+        async for kind, text in follow_until(
+            summary_streams, summary_cache_key(lyrics, language), summary, SUMMARY_STREAM_INTERVAL
+        ):
+            await tracker.stream_summary(text if kind == "delta" else None)
+        result = await summary
+    finally:
+        summary.cancel()
     
     await tracker.update(70, "Analysis complete!")
-    await asyncio.sleep(0.3)  # Brief pause
     return result
 
 async def summarize_lyrics(lyrics: str, artist: str, title: str, language: str = "en") -> str:
-    # Check cache first using lyrics hash + language
-    lyrics_hash = get_content_hash(lyrics)
-    cache_key = get_cache_key("summary", lyrics_hash, language)
-    cached_summary = await get_from_cache(cache_key)
-    if cached_summary:
-        return cached_summary
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if OpenAI and api_key:
+    cache_key = summary_cache_key(lyrics, language)
+    compute = lambda: _summarize_lyrics(lyrics, artist, title, language, cache_key)
+    # Check cache first
+    return await get_or_refresh("summary", cache_key, compute) or await run_single_flight("summary", cache_key, compute)
+
+def lyrics_index_namespace(artist: str) -> str:
+    # The artist part of the song alias, so spellings of one artist share their songs
+    return fold(clean_artist(artist))
+
+async def reuse_similar_summary(lyrics: str, artist: str, language: str, signature: tuple) -> Optional[str]:
+    """Summary of an already summarized near-duplicate of these lyrics by the same artist (live, remaster...)."""
+    matches = await lyrics_index.query(signature, exclude=get_content_hash(lyrics), namespace=lyrics_index_namespace(artist))
+    near_duplicate_similarity.observe(matches[0][0] if matches else 0.0)
+    for similarity, doc_id in matches:
+        if similarity < LYRICS_SIMILARITY_THRESHOLD:
+            break
+        summary = await get_from_cache(get_cache_key("summary", doc_id, language))
+        if summary:
+            logger.info(f"Reusing summary of near-duplicate lyrics {doc_id} (similarity {similarity:.2f})")
+            lyrics_index.record(similarity, reused=True)
+            near_duplicate_lookups.labels("reused").inc()
+            return summary
+    lyrics_index.record(matches[0][0] if matches else 0.0, reused=False)
+    near_duplicate_lookups.labels("new").inc()
+    return None
+
+async def _summarize_lyrics(lyrics: str, artist: str, title: str, language: str, cache_key: str) -> str:
+    signature = lyrics_index.signature(lyrics) if LYRICS_SIMILARITY_THRESHOLD > 0 else None
+    if signature:
+        summary = await reuse_similar_summary(lyrics, artist, language, signature)
+        if summary:
+            await set_cache(cache_key, summary, 7 * 24 * 3600, CACHE_STALE_TTL)
+            await lyrics_index.add(get_content_hash(lyrics), signature, lyrics_index_namespace(artist))
+            return summary
+    client = get_openai_client()
+    if client:
         try:
-            client = OpenAI(api_key=api_key)
+            prompt_lyrics, tokens_in, tokens_out = lyrics_preparer.prepare(lyrics)
+            prompt_tokens.labels("raw").inc(tokens_in)
+            prompt_tokens.labels("prepared").inc(tokens_out)
             if language == "uk":
                 prompt = (
                     "Проаналізуй основний зміст та тему цієї пісні у 3-5 реченнях. "
                     "Уникай цитування рядків; Також поясни культурний та історичний контекст, фактичне значення пісні українською мовою.\n\n"
-                    f"Виконавець: {artist}\nНазва: {title}\nТекст пісні:\n{lyrics}"
+                    f"Виконавець: {artist}\nНазва: {title}\nТекст пісні:\n{prompt_lyrics}"
                 )
             else:
                 prompt = (
                     "Summarize the core meaning/themes of these song lyrics in 3-5 sentences. "
                     "Also explain cultural and historical context, the actual meaning of the song.\n\n"
-                    f"Artist: {artist}\nTitle: {title}\nLyrics:\n{lyrics}"
+                    f"Artist: {artist}\nTitle: {title}\nLyrics:\n{prompt_lyrics}"
                 )
-            chat = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.4,
-                max_tokens=500,
-            )
-            summary = chat.choices[0].message.content.strip()
+
+            params = {
+                "model": "gpt-4o-mini",
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.4,
+                "max_tokens": 500,
+            }
+
+            async def complete(stream) -> str:
+                # A retry starts over, so followers drop what the failed attempt sent
+                stream.restart()
+                async with openai_chat_semaphore:
+                    with track_upstream("openai_chat"):
+                        if not SUMMARY_STREAMING:
+                            chat = await client.chat.completions.create(**params)
+                            return chat.choices[0].message.content
+                        started = time.perf_counter()
+                        chunks = await client.chat.completions.create(**params, stream=True)
+                        parts = []
+                        try:
+                            async for chunk in chunks:
+                                delta = chunk.choices[0].delta.content if chunk.choices else None
+                                if not delta:
+                                    continue
+                                if not parts:
+                                    summary_first_token_seconds.observe(time.perf_counter() - started)
+                                parts.append(delta)
+                                stream.append(delta)
+                        finally:
+                            await chunks.close()
+                        return "".join(parts)
+
+            with summary_streams.produce(cache_key) as stream:
+                summary = (await upstream_guards["openai_chat"].call(lambda: complete(stream))).strip()
             # Cache summary for 7 days
-            await set_cache(cache_key, summary, 7 * 24 * 3600)
+            await set_cache(cache_key, summary, 7 * 24 * 3600, CACHE_STALE_TTL)
+            if signature:
+                await lyrics_index.add(get_content_hash(lyrics), signature, lyrics_index_namespace(artist))
             return summary
+        except UpstreamUnavailableError:
+            # Don't hand out a generic summary (and artwork keyed on it) during an outage
+            raise
         except Exception as e:
             logger.error(f"Error summarizing lyrics: {e}", exc_info=True)
 
     # Fallback summaries
-    return (
+    return FallbackSummary(
         f"'{title}' виконавця {artist} розповідає про зв'язок та рішучість. Оповідач балансує між сумнівами та вірністю, "
         f"шукаючи чесність та прийняття. Загалом, тон інтроспективний та щирий."
         if language == "uk" else
@@ -611,36 +2067,74 @@ async def summarize_lyrics(lyrics: str, artist: str, title: str, language: str =
     )
 
 # ---- AI Image generation ----
-async def generate_song_artwork_with_progress(artist: str, title: str, summary: str, style: str, tracker: ProgressTracker) -> str:
+# Generated images are kept in a content-addressed store on local disk (shared
+# by the workers; mount a volume) and the cache holds "blob:<sha256>"
+ARTWORK_STORE_DIR = os.getenv("ARTWORK_STORE_DIR", os.path.join(LOCAL_DATA_DIR, "artwork"))
+ARTWORK_STORE_MAX_BYTES = int(os.getenv("ARTWORK_STORE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Where clients fetch stored images; the Java API proxies them under /api/images
+ARTWORK_URL_PREFIX = os.getenv("ARTWORK_URL_PREFIX", "/images").rstrip("/")
+ARTWORK_BLOB_PREFIX = "blob:"
+
+artwork_store = ArtworkStore(ARTWORK_STORE_DIR, ARTWORK_STORE_MAX_BYTES)
+
+async def generate_song_artwork_with_progress(song: SongIdentity, artist: str, title: str, summary: str, style: str, tracker: ProgressTracker) -> str:
     """Generate artwork with progress updates."""
     await tracker.update(80, "Creating AI artwork...")
-    await asyncio.sleep(0.8)  # Show creation step
     
-    await tracker.update(90, "Finalizing image...")
-    await asyncio.sleep(0.5)  # Show finalization step
-    
-    result = await generate_song_artwork(artist, title, summary, style)
+    result = await generate_song_artwork(song, artist, title, summary, style)
     
     await tracker.update(95, "Artwork ready!")
-    await asyncio.sleep(0.3)  # Brief pause
     return result
 
-async def generate_song_artwork(artist: str, title: str, summary: str, style: str) -> str:
-    # Check cache first using summary content hash + style for unique key
-    summary_hash = get_content_hash(summary)
-    cache_key = get_cache_key("image", artist, title, summary_hash, style.lower())
-    cached_image_url = await get_from_cache(cache_key)
-    if cached_image_url:
-        return cached_image_url
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not OpenAI or not api_key:
-        fallback_svg = make_svg_data_uri(artist, title, style)
-        # Cache fallback SVG for 1 hour to avoid regenerating
-        await set_cache(cache_key, fallback_svg, 3600)
-        return fallback_svg
+async def generate_song_artwork(song: SongIdentity, artist: str, title: str, summary: str, style: str) -> str:
+    cache_key = image_cache_key(song, summary, style)
+    compute = lambda: _generate_song_artwork(artist, title, summary, style, cache_key)
+    # Check cache first; an entry whose image was evicted from the store counts as a miss
+    cached = await get_or_refresh("image", cache_key, compute)
+    image_url = artwork_url(cached, artist, title, style) if cached else None
+    if cached and image_url is None:
+        # Evicted from the store; don't let the L1 copy hide the replacement
+        l1_cache.delete(cache_key)
+    if image_url is None:
+        image_url = artwork_url(await run_single_flight("image", cache_key, compute), artist, title, style)
+    if image_url is None:
+        # Handed back an evicted image (a remote flight that gave up), or it was evicted again right away.
+        # Still coalesced, under its own flight so it doesn't join the one that just returned.
+        logger.warning(f"Artwork for {cache_key[:50]} missing from the store; generating it again")
+        image_url = artwork_url(
+            await run_single_flight("image", cache_key, compute, flight_key=f"{cache_key}:regenerate"),
+            artist, title, style,
+        )
+    if image_url is None:
+        # Placeholder, uncached; endpoints serve data: URLs with FALLBACK_CACHE_CONTROL
+        return make_svg_data_uri(artist, title, style)
+    return image_url
+
+async def cache_fallback_image(cache_key: str, artist: str, title: str, style: str, ttl_seconds: int) -> str:
+    await set_cache(cache_key, FALLBACK_IMAGE_VALUE, ttl_seconds)
+    fallback_image_stats["markers_written"] += 1
+    fallback_image_stats["bytes_avoided"] += len(make_svg_data_uri(artist, title, style)) - len(FALLBACK_IMAGE_VALUE)
+    return FALLBACK_IMAGE_VALUE
+
+def artwork_url(value: Optional[str], artist: str, title: str, style: str) -> Optional[str]:
+    """Turn a cached artwork value into a URL, rebuilding fallback SVGs from their marker.
+
+    Stored images become ARTWORK_URL_PREFIX/<id>, or None if the image has
+    since been evicted from the store.
+    """
+    if value == FALLBACK_IMAGE_VALUE:
+        return make_svg_data_uri(artist, title, style)
+    if value and value.startswith(ARTWORK_BLOB_PREFIX):
+        blob_id = value[len(ARTWORK_BLOB_PREFIX):]
+        return f"{ARTWORK_URL_PREFIX}/{blob_id}" if artwork_store.contains(blob_id) else None
+    return value
+
+async def _generate_song_artwork(artist: str, title: str, summary: str, style: str, cache_key: str) -> str:
+    client = get_openai_client()
+    if not client:
+        # Remember the fallback for 1 hour; the SVG itself is cheap to rebuild on read
+        return await cache_fallback_image(cache_key, artist, title, style, 3600)
     try:
-        client = OpenAI(api_key=api_key)
         style_descriptions = {
             "album cover": "professional album cover art",
             "cinematic": "cinematic movie poster style",
@@ -662,25 +2156,37 @@ async def generate_song_artwork(artist: str, title: str, summary: str, style: st
             f"Style: {style_prompt}. No text or lyrics in the image. "
             f"High quality, artistic, suitable for music album artwork."
         )
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
-        image_url = response.data[0].url
-        # Cache DALL-E image URLs for 30 days (images are expensive to generate)
-        await set_cache(cache_key, image_url, 30 * 24 * 3600)
-        return image_url
+
+        async def generate():
+            async with openai_image_semaphore:
+                with track_upstream("openai_images"):
+                    return await client.images.generate(
+                        model="dall-e-3",
+                        prompt=prompt,
+                        size="1024x1024",
+                        quality="standard",
+                        n=1,
+                        # The image itself, not a URL that expires in an hour
+                        response_format="b64_json",
+                    )
+
+        response = await upstream_guards["openai_images"].call(generate)
+        blob_id = await artwork_store.put(base64.b64decode(response.data[0].b64_json))
+        value = ARTWORK_BLOB_PREFIX + blob_id
+        # Cache the image reference for 30 days (images are expensive to generate)
+        await set_cache(cache_key, value, 30 * 24 * 3600, CACHE_STALE_TTL)
+        return value
+    except UpstreamUnavailableError as e:
+        # Serve the fallback without caching it, so artwork is retried once the provider recovers
+        logger.warning(f"Using fallback artwork: {e}")
+        return FALLBACK_IMAGE_VALUE
     except Exception as e:
         logger.error(f"Error generating image: {e}", exc_info=True)
-        fallback_svg = make_svg_data_uri(artist, title, style)
-        # Cache fallback for shorter time when API fails
-        await set_cache(cache_key, fallback_svg, 1800)  # 30 minutes
-        return fallback_svg
+        # Remember the fallback for a shorter time when the API fails
+        return await cache_fallback_image(cache_key, artist, title, style, 1800)  # 30 minutes
 
 # ---- Fallback SVG generation ----
+# Deterministic for the same inputs, so it never needs to be cached
 def make_svg_data_uri(artist: str, title: str, style: str) -> str:
     def esc(s: str) -> str:
         return (s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
@@ -695,7 +2201,7 @@ def make_svg_data_uri(artist: str, title: str, style: str) -> str:
   </defs>
   <rect width='100%' height='100%' fill='url(#g)'/>
   <text x='50%' y='50%' fill='#e5e7eb' font-size='46' text-anchor='middle' font-family='Arial,Helvetica,sans-serif'>{esc(artist)} — {esc(title)}</text>
-  <text x='50%' y='585' fill='#cbd5e1' font-size='22' text-anchor='middle' font-family='Arial,Helvetica,sans-serif'>AI artwork ({esc(style)}) • {datetime.now(timezone.utc).strftime('%Y-%m-%d')}</text>
+  <text x='50%' y='585' fill='#cbd5e1' font-size='22' text-anchor='middle' font-family='Arial,Helvetica,sans-serif'>AI artwork ({esc(style)})</text>
 </svg>"""
     data = base64.b64encode(svg.encode("utf-8")).decode("ascii")
     return f"data:image/svg+xml;base64,{data}"
@@ -0,0 +1,91 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by a byte budget, with per-entry TTLs.
+
+    Sizes are measured with sys.getsizeof, so the budget tracks the real
+    footprint of the stored strings rather than their character count.
+    """
+
+    def __init__(self, max_bytes: int, max_ttl: float, max_entry_fraction: float = 0.125):
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        # A single value may not take more than this share of the budget
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """Return the value and the seconds left on its original (uncapped) TTL."""
+        if not self.enabled:
+            return None, None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, None
+        value, expires_at, _, ttl_expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None, None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value, ttl_expires_at - now
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> bool:
+        if not self.enabled or ttl_seconds <= 0:
+            return False
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_entry_bytes:
+            self.delete(key)
+            return False
+        self.delete(key)
+        now = time.monotonic()
+        self._entries[key] = (value, now + min(ttl_seconds, self.max_ttl), size, now + ttl_seconds)
+        self._bytes += size
+        self.stats["sets"] += 1
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        size = self._entries.pop(key)[2]
+        self._bytes -= size
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
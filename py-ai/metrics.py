@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Time to serve a request", ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+stage_seconds = Histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each song pipeline stage", ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+upstream_seconds = Histogram(
+    "upstream_request_duration_seconds", "Time spent calling an upstream provider", ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+upstream_errors = Counter(
+    "upstream_errors_total", "Failed upstream calls", ["provider", "error"],
+)
+cache_lookups = Counter(
+    "cache_lookups_total", "Cache reads by key prefix, tier and result", ["prefix", "tier", "result"],
+)
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled to fire immediately",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+near_duplicate_lookups = Counter(
+    "summary_near_duplicate_lookups_total", "Near-duplicate lookups before summarizing, by outcome", ["result"],
+)
+near_duplicate_similarity = Histogram(
+    "summary_near_duplicate_similarity", "Best near-duplicate similarity found before summarizing",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+prompt_tokens = Counter(
+    "summary_prompt_lyrics_tokens_total", "Estimated lyrics tokens sent for summarizing, before and after preparation",
+    ["stage"],
+)
+summary_first_token_seconds = Histogram(
+    "summary_first_token_seconds", "Time from sending a summary request to OpenAI to its first streamed token",
+    buckets=LATENCY_BUCKETS,
+)
+jobs_in_flight = Gauge("jobs_in_flight", "Background analysis jobs by state", ["state"])
+progress_trackers = Gauge("progress_trackers", "Progress trackers held in this worker")
+
+# Durations recorded while serving the current request, for the Server-Timing header
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stage_seconds.labels(stage).observe(seconds)
+    add_timing(f"stage.{stage}", seconds)
+
+
+def record_cache_lookup(key: str, tier: str, hit: bool) -> None:
+    cache_lookups.labels(key.split(":", 1)[0], tier, "hit" if hit else "miss").inc()
+
+
+class track_upstream:
+    """Time a call to an upstream provider and count it if it fails.
+
+    Usable as a plain context manager around awaited calls:
+        with track_upstream("genius"):
+            response = await client.get(...)
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        upstream_seconds.labels(self.provider).observe(elapsed)
+        add_timing(self.provider, elapsed)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            upstream_errors.labels(self.provider, exc_type.__name__).inc()
+        return False
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """Sample event-loop lag: how much later than requested a short sleep wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - started - interval))
+
+
+class ServerTimingMiddleware:
+    """Observe request latency per route and add a Server-Timing header.
+
+    The header lists the total time plus the time spent in each pipeline
+    stage and upstream provider up to the moment the response starts, so a
+    proxy in front of this service can surface the breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                entries = [f"app;dur={(time.perf_counter() - started) * 1000:.1f}"]
+                entries += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.labels(endpoint, scope["method"], str(status)).observe(time.perf_counter() - started)
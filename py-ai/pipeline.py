@@ -0,0 +1,69 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+class Pipeline:
+    """Run a graph of named stages, each at most once, as concurrently as their inputs allow.
+
+    A stage declares the stages it depends on and its function is called with
+    their results, in that order. Requesting a stage starts its dependencies
+    first; stages with no path between them run at the same time. Results are
+    kept for the life of the pipeline so every consumer of an artifact shares
+    one computation. Use it as an async context manager so stages nobody ended
+    up waiting for are cancelled when the request is done.
+    """
+
+    def __init__(self, observer: Optional[Callable[[str, float], None]] = None):
+        # Called with (stage, seconds) as each stage finishes
+        self.observer = observer
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable], Tuple[str, ...]]] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        # Wall-clock seconds each stage spent in its own function
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable], deps: Iterable[str] = ()) -> "Pipeline":
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def start(self, *names: str) -> None:
+        """Kick off stages in the background without waiting for them."""
+        for name in names:
+            self._task(name)
+
+    async def get(self, name: str) -> Any:
+        # Shielded so a cancelled consumer doesn't cancel a stage others share
+        return await asyncio.shield(self._task(name))
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark retrieved so asyncio doesn't log it
+
+    async def __aenter__(self) -> "Pipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.cancel()
+
+    def _task(self, name: str) -> asyncio.Future:
+        task = self._tasks.get(name)
+        if task is None:
+            if name not in self._stages:
+                raise KeyError(f"Unknown pipeline stage: {name}")
+            task = asyncio.ensure_future(self._run(name))
+            self._tasks[name] = task
+        return task
+
+    async def _run(self, name: str) -> Any:
+        fn, deps = self._stages[name]
+        inputs = await asyncio.gather(*(self.get(dep) for dep in deps))
+        started = time.perf_counter()
+        try:
+            return await fn(*inputs)
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            if self.observer:
+                self.observer(name, self.timings[name])
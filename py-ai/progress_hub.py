@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressHub:
+    """Fan out progress updates to the SSE streams connected to this worker.
+
+    With Redis, each worker holds a single pattern subscription on the
+    progress channels and hands every message to its local subscribers, so an
+    update published by any worker or node reaches every open stream. Without
+    Redis, updates are delivered in-process only.
+
+    Job cancellation requests travel on a second channel family so they reach
+    whichever worker is running the job; they are handed to on_cancel.
+    """
+
+    def __init__(self, channel_prefix: str, cancel_prefix: str):
+        self.channel_prefix = channel_prefix
+        self.cancel_prefix = cancel_prefix
+        self.on_cancel: Optional[Callable[[str], None]] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, redis_client) -> None:
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{self.channel_prefix}*", f"{self.cancel_prefix}*")
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            # Don't let a wedged connection hold up shutdown
+            await asyncio.wait([self._task], timeout=2.0)
+            self._task = None
+        if self._pubsub:
+            try:
+                await self._pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing progress subscription: {e}")
+            self._pubsub = None
+
+    def subscribe(self, request_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(request_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, request_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(request_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[request_id]
+
+    def publish_local(self, request_id: str, payload: str) -> None:
+        for queue in self._subscribers.get(request_id, ()):
+            queue.put_nowait(payload)
+
+    def cancel_local(self, request_id: str) -> None:
+        if self.on_cancel:
+            self.on_cancel(request_id)
+
+    def subscriber_count(self, request_id: Optional[str] = None) -> int:
+        if request_id is not None:
+            return len(self._subscribers.get(request_id, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Progress subscription error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "pmessage":
+                continue
+            channel = message["channel"]
+            if channel.startswith(self.cancel_prefix):
+                self.cancel_local(channel[len(self.cancel_prefix):])
+            else:
+                self.publish_local(channel[len(self.channel_prefix):], message["data"])
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts the work as its own task; everyone who
+    arrives while it is running awaits that same task. The task is shielded,
+    so a caller that disconnects does not cancel the work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "remote_waits": 0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved; callers re-raise it themselves
+            task.exception()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "in_flight": len(self._inflight)}
@@ -0,0 +1,93 @@
+import json
+import re
+import unicodedata
+from typing import Optional
+
+# Ukrainian and Russian letters, romanized so "Без бою" and "Bez boiu" meet
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ie",
+    "ё": "e", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "i", "й": "i", "к": "k",
+    "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "iu", "я": "ia", "'": "", "’": "",
+}
+
+# Release variants that share their lyrics with the original recording
+VERSION_WORDS = (
+    r"remaster(?:ed)?|live|radio edit|single version|album version|mono|stereo"
+    r"|explicit|clean|bonus track|deluxe(?: edition| version)?|remix(?:ed)?|edit"
+)
+FEATURING = r"feat\.?|ft\.?|featuring|with"
+
+# "(Remastered 2021)", "[Live at Wembley]", "(feat. Someone)", "(with Someone)"
+BRACKETED_SUFFIX = re.compile(
+    rf"\s*[\(\[](?:[^\)\]]*\b(?:{VERSION_WORDS})\b[^\)\]]*|\s*(?:{FEATURING})\s[^\)\]]*)[\)\]]",
+    re.IGNORECASE,
+)
+# "Nothing Else Matters - Live", "Song - 2011 Remaster"
+DASH_SUFFIX = re.compile(rf"\s+[-–—]\s+[^-–—]*\b(?:{VERSION_WORDS})\b.*$", re.IGNORECASE)
+# "Song feat. Someone", "Artist ft. Someone"
+TRAILING_FEATURING = re.compile(r"\s+(?:feat\.?|ft\.?|featuring)\s.*$", re.IGNORECASE)
+NON_WORD = re.compile(r"[\W_]+")
+
+
+def clean_title(title: str) -> str:
+    """Strip remaster/live/featuring decorations, keeping the original script and case."""
+    cleaned = BRACKETED_SUFFIX.sub("", title)
+    cleaned = DASH_SUFFIX.sub("", cleaned)
+    cleaned = TRAILING_FEATURING.sub("", cleaned).strip()
+    return cleaned or title.strip()
+
+
+def clean_artist(artist: str) -> str:
+    cleaned = TRAILING_FEATURING.sub("", BRACKETED_SUFFIX.sub("", artist)).strip()
+    return cleaned or artist.strip()
+
+
+def fold(text: str) -> str:
+    """Lowercase, transliterate Cyrillic, drop diacritics and punctuation."""
+    # Transliterate before decomposing: NFKD would turn "й" into "и" + breve
+    text = unicodedata.normalize("NFC", text.lower())
+    text = "".join(CYRILLIC.get(ch, ch) for ch in text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("&", " and ")
+    return NON_WORD.sub(" ", text).strip()
+
+
+def song_alias(artist: str, title: str) -> str:
+    """Normalized "artist|title" that every spelling of a song collapses to."""
+    return f"{fold(clean_artist(artist))}|{fold(clean_title(title))}"
+
+
+class SongIdentity:
+    """A song as the caches see it: its Genius id once resolved, else its alias.
+
+    artist and title are the names Genius gives the song; the alias is folded
+    and only fit for matching, never for showing or prompting.
+    """
+
+    def __init__(
+        self, alias: str, genius_id: Optional[int] = None, path: Optional[str] = None,
+        artist: Optional[str] = None, title: Optional[str] = None,
+    ):
+        self.alias = alias
+        self.genius_id = genius_id
+        self.path = path  # Genius page path, e.g. "/Metallica-nothing-else-matters-lyrics"
+        self.artist = artist
+        self.title = title
+
+    @property
+    def key(self) -> str:
+        if self.genius_id is not None:
+            return f"genius:{self.genius_id}"
+        return f"alias:{self.alias}"
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.genius_id, "path": self.path, "artist": self.artist, "title": self.title})
+
+    @classmethod
+    def from_json(cls, alias: str, value: str) -> "SongIdentity":
+        data = json.loads(value)
+        # Entries cached before the names were stored have none
+        return cls(alias, data["id"], data["path"], data.get("artist"), data.get("title"))
@@ -0,0 +1,143 @@
+import asyncio
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, Tuple
+
+
+class TextStream:
+    """Text generated a piece at a time, which any number of readers follow as it grows.
+
+    restart() throws away what was generated so far (the completion is being
+    retried); readers are told to reset and then get the new text from the start.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.generation = 0
+        self.closed = False
+        self.producing = False
+        self.listeners = 0
+        self._changed = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    def append(self, delta: str) -> None:
+        self.text += delta
+        self._notify()
+
+    def restart(self) -> None:
+        if self.text:
+            self.text = ""
+            self.generation += 1
+            self._notify()
+
+    def close(self) -> None:
+        self.closed = True
+        self._closed.set()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, interval: float = 0.0) -> AsyncIterator[Tuple[str, str]]:
+        """Yield ("delta", text) as text is added and ("reset", "") on restart, until closed.
+
+        After the first delta, waits interval seconds between yields so a
+        slow reader gets a few tokens per event instead of one event per token;
+        the rest of the text is yielded as soon as the stream closes.
+        """
+        offset, generation = 0, self.generation
+        while True:
+            # Take the event before reading, so a change made in between still wakes us
+            changed = self._changed
+            if self.generation != generation:
+                offset, generation = 0, self.generation
+                yield "reset", ""
+            if len(self.text) > offset:
+                chunk, offset = self.text[offset:], len(self.text)
+                yield "delta", chunk
+            if self.closed:
+                return
+            await changed.wait()
+            if interval and offset and not self.closed:
+                try:
+                    await asyncio.wait_for(self._closed.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+class TextStreams:
+    """Streams of generated text by key, for whoever wants to watch a generation in progress.
+
+    Readers can start following a key before its producer starts (they wait
+    for text). The stream is dropped once its producer is done and nobody
+    follows it; it only exists in this worker.
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, TextStream] = {}
+        self.stats = {"produced": 0, "followed": 0}
+
+    @contextmanager
+    def produce(self, key: str) -> Iterator[TextStream]:
+        stream = self._streams.get(key)
+        if stream is None or stream.producing or stream.closed:
+            stream = self._streams[key] = TextStream()
+        stream.producing = True
+        self.stats["produced"] += 1
+        try:
+            yield stream
+        finally:
+            stream.producing = False
+            stream.close()
+            self._release(key, stream)
+
+    async def follow(self, key: str, interval: float = 0.0) -> AsyncIterator[Tuple[str, str]]:
+        stream = self._streams.get(key)
+        if stream is None or stream.closed:
+            stream = self._streams[key] = TextStream()
+        stream.listeners += 1
+        self.stats["followed"] += 1
+        try:
+            async for event in stream.follow(interval):
+                yield event
+        finally:
+            stream.listeners -= 1
+            self._release(key, stream)
+
+    def _release(self, key: str, stream: TextStream) -> None:
+        if not stream.producing and not stream.listeners and self._streams.get(key) is stream:
+            del self._streams[key]
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": sum(1 for s in self._streams.values() if s.producing),
+            "listeners": sum(s.listeners for s in self._streams.values()),
+        }
+
+
+async def follow_until(
+    streams: TextStreams, key: str, done: asyncio.Future, interval: float = 0.0
+) -> AsyncIterator[Tuple[str, str]]:
+    """Follow key's stream until it closes or done completes, whichever comes first.
+
+    Whoever awaits done gets the final text; this only covers the wait.
+    """
+    events = streams.follow(key, interval)
+    step = None
+    try:
+        while not done.done():
+            step = asyncio.ensure_future(events.__anext__())
+            await asyncio.wait({step, done}, return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                return
+            try:
+                event = step.result()
+            except StopAsyncIteration:
+                return
+            yield event
+    finally:
+        if step is not None and not step.done():
+            step.cancel()
+            await asyncio.gather(step, return_exceptions=True)
+        await events.aclose()
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the top of py-ai, as the service imports them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class Clock:
+    """Stand-in for time.monotonic/time.time that only moves when told to."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze time.monotonic and time.time; only for tests that don't run an event loop."""
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    monkeypatch.setattr("time.time", clock)
+    return clock
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """main, with its own in-memory Redis and empty in-process caches."""
+    import fakeredis.aioredis
+    import main
+
+    monkeypatch.setattr(main, "redis_client", fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True))
+    for name in main.cache_stats:
+        monkeypatch.setitem(main.cache_stats, name, 0)
+    main.l1_cache.clear()
+    main.refresh_tasks.clear()
+    yield main
+    main.l1_cache.clear()
+    main.progress_store.clear()
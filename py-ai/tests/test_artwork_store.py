@@ -0,0 +1,224 @@
+import asyncio
+import os
+
+import pytest
+
+from artwork_store import ArtworkStore, BlobResponse, parse_range
+from song_identity import SongIdentity
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"p" * 92
+JPG = b"\xff\xd8\xff" + b"j" * 97
+
+
+def store_with(tmp_path, *images, max_bytes=10_000):
+    store = ArtworkStore(str(tmp_path), max_bytes)
+
+    async def put_all():
+        return [await store.put(data) for data in images]
+
+    return store, asyncio.run(put_all())
+
+
+def age(store, blob_id, seconds_ago):
+    """Backdate a stored file, which is its position in the LRU order on disk."""
+    path = store.get(blob_id).path
+    mtime = os.stat(path).st_mtime - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def serve(blob, headers=None, method="GET"):
+    """(status, headers, body) of a BlobResponse."""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    response = BlobResponse(blob, headers or {}, method)
+    asyncio.run(response({"type": "http", "method": method}, None, send))
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def test_images_are_stored_once_by_content(tmp_path):
+    store, (first, second, again) = store_with(tmp_path, PNG, JPG, PNG)
+    assert first == again != second
+    assert store.stats["writes"] == 2 and store.stats["dedup_writes"] == 1
+    blob = store.get(first)
+    assert blob.media_type == "image/png" and blob.size == len(PNG)
+    assert blob.path.endswith(os.path.join(first[:2], f"{first}.png"))
+    assert store.get(second).media_type == "image/jpeg"
+
+
+def test_unknown_and_malformed_ids_are_misses(tmp_path):
+    store, _ = store_with(tmp_path)
+    assert store.get("0" * 64) is None
+    assert store.get("../../etc/passwd") is None
+    assert store.stats["misses"] == 2
+
+
+def test_images_written_by_another_worker_are_found(tmp_path):
+    _, (blob_id,) = store_with(tmp_path, PNG)
+    other = ArtworkStore(str(tmp_path), 10_000)
+    assert other.contains(blob_id)
+
+
+def test_least_recently_used_images_are_evicted_past_the_budget(tmp_path):
+    images = [bytes([n]) * 100 for n in range(3)]
+    store, ids = store_with(tmp_path, *images, max_bytes=300)
+    age(store, ids[0], 100)
+    age(store, ids[1], 300)
+    age(store, ids[2], 200)
+
+    newest = asyncio.run(store.put(b"\x04" * 100))
+    assert store.contains(ids[0]) and store.contains(newest)
+    assert not store.contains(ids[1]) and not store.contains(ids[2])
+    assert store.stats["evictions"] == 2 and store.stats["evicted_bytes"] == 200
+    assert store.snapshot()["bytes"] == 200
+
+
+def test_an_evicted_image_is_gone_for_every_worker(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    other = ArtworkStore(str(tmp_path), 10_000)
+    assert other.contains(blob_id)
+    os.unlink(store.get(blob_id).path)
+    assert not other.contains(blob_id)
+    assert other.snapshot()["bytes"] == 0
+
+
+def test_restart_picks_up_the_images_on_disk(tmp_path):
+    store_with(tmp_path, PNG, JPG)
+    restarted = ArtworkStore(str(tmp_path), 10_000)
+    asyncio.run(restarted.start())
+    assert restarted.snapshot()["images"] == 2
+    assert restarted.snapshot()["bytes"] == len(PNG) + len(JPG)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=100-", (100, 100)),
+    ("bytes=-0", (100, 100)),
+    ("bytes=9-2", (100, 100)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+def test_whole_images_are_served_with_a_strong_etag(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    status, headers, body = serve(store.get(blob_id))
+    assert (status, body) == (200, PNG)
+    assert headers["etag"] == f'"{blob_id}"'
+    assert headers["content-length"] == str(len(PNG))
+    assert "immutable" in headers["cache-control"]
+
+
+def test_a_matching_etag_is_not_modified(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    blob = store.get(blob_id)
+    assert serve(blob, {"if-none-match": f'"other", "{blob_id}"'})[::2] == (304, b"")
+    assert serve(blob, {"if-none-match": "*"})[0] == 304
+    assert serve(blob, {"if-none-match": '"other"'})[0] == 200
+
+
+def test_ranges_are_served_partially(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    status, headers, body = serve(store.get(blob_id), {"range": "bytes=10-19"})
+    assert (status, body) == (206, PNG[10:20])
+    assert headers["content-range"] == f"bytes 10-19/{len(PNG)}"
+    assert headers["content-length"] == "10"
+
+
+def test_unsatisfiable_ranges_are_416(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    status, headers, body = serve(store.get(blob_id), {"range": f"bytes={len(PNG)}-"})
+    assert (status, body) == (416, b"")
+    assert headers["content-range"] == f"bytes */{len(PNG)}"
+
+
+def test_a_stale_if_range_gets_the_whole_image(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    blob = store.get(blob_id)
+    assert serve(blob, {"range": "bytes=0-9", "if-range": '"other"'})[::2] == (200, PNG)
+    assert serve(blob, {"range": "bytes=0-9", "if-range": blob.etag})[::2] == (206, PNG[:10])
+
+
+def test_head_has_the_headers_but_no_body(tmp_path):
+    store, (blob_id,) = store_with(tmp_path, PNG)
+    status, headers, body = serve(store.get(blob_id), method="HEAD")
+    assert (status, body) == (200, b"")
+    assert headers["content-length"] == str(len(PNG))
+
+
+@pytest.fixture
+def artwork(service, tmp_path, monkeypatch):
+    """An empty store and a stand-in generator that records its calls."""
+    store = ArtworkStore(str(tmp_path), 10_000)
+    calls = []
+
+    async def generate(artist, title, summary, style, cache_key):
+        calls.append(cache_key)
+        await asyncio.sleep(0.02)
+        blob_id = await store.put(PNG)
+        value = service.ARTWORK_BLOB_PREFIX + blob_id
+        await service.set_cache(cache_key, value, 3600, service.CACHE_STALE_TTL)
+        return value
+
+    monkeypatch.setattr(service, "artwork_store", store)
+    monkeypatch.setattr(service, "_generate_song_artwork", generate)
+    monkeypatch.setattr(service, "SINGLEFLIGHT_REDIS_LOCK", True)
+    monkeypatch.setattr(service, "SINGLEFLIGHT_POLL_INTERVAL", 0.01)
+    return store, calls
+
+
+SONG = SongIdentity("metallica|one")
+EVICTED = "blob:" + "0" * 64
+
+
+def test_an_evicted_image_is_generated_again_once(service, artwork):
+    store, calls = artwork
+    key = service.image_cache_key(SONG, "summary", "vintage")
+
+    async def scenario():
+        await service.set_cache(key, EVICTED, 3600, service.CACHE_STALE_TTL)
+        return await asyncio.gather(*(
+            service.generate_song_artwork(SONG, "Metallica", "One", "summary", "vintage") for _ in range(5)
+        ))
+
+    urls = asyncio.run(scenario())
+    blob_id = urls[0].rsplit("/", 1)[1]
+    assert urls == [f"{service.ARTWORK_URL_PREFIX}/{blob_id}"] * 5
+    assert store.contains(blob_id)
+    assert calls == [key]
+
+
+def test_waiting_on_another_worker_gets_its_new_image_not_the_evicted_one(service, artwork):
+    store, calls = artwork
+    key = service.image_cache_key(SONG, "summary", "vintage")
+
+    async def other_worker():
+        await asyncio.sleep(0.05)
+        blob_id = await store.put(PNG)
+        await service.set_cache(key, service.ARTWORK_BLOB_PREFIX + blob_id, 3600, service.CACHE_STALE_TTL)
+        await service.redis_client.delete(f"lock:{key}")
+        return blob_id
+
+    async def scenario():
+        await service.set_cache(key, EVICTED, 3600, service.CACHE_STALE_TTL)
+        # Another worker noticed the eviction first and is generating the image
+        await service.redis_client.set(f"lock:{key}", "other-worker")
+        url, blob_id = await asyncio.gather(
+            service.generate_song_artwork(SONG, "Metallica", "One", "summary", "vintage"),
+            other_worker(),
+        )
+        assert url == f"{service.ARTWORK_URL_PREFIX}/{blob_id}"
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert calls == []
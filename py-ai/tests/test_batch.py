@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from song_identity import SongIdentity, song_alias
+
+
+@pytest.fixture
+def upstream(service, monkeypatch):
+    """Stand-ins for the lyrics and summary stages, recording what they were asked for."""
+    # Summaries of songs by "Slow" wait until calls["release"] is set
+    calls = {"lyrics": [], "summary": [], "release": None}
+
+    async def fetch_lyrics(song, cache_key):
+        calls["lyrics"].append(song.alias)
+        return f"lyrics of {song.alias}"
+
+    async def summarize(lyrics, artist, title, language, cache_key):
+        calls["summary"].append(lyrics)
+        if "slow" in lyrics:
+            await calls["release"].wait()
+        summary = f"summary of {title}"
+        await service.set_cache(cache_key, summary, 3600, service.CACHE_STALE_TTL)
+        return summary
+
+    monkeypatch.setattr(service, "_fetch_lyrics", fetch_lyrics)
+    monkeypatch.setattr(service, "_summarize_lyrics", summarize)
+    return calls
+
+
+async def read_batch(service, songs, include_images=False):
+    response = await service.analyze_batch(service.BatchAnalyzeRequest(songs=songs, include_images=include_images))
+    return [json.loads(line) async for line in response.body_iterator]
+
+
+def test_styles_do_not_split_a_song_when_images_are_off(service, upstream, monkeypatch):
+    analyzed = []
+    analyze_item = service.analyze_batch_item
+
+    async def record(song, *args):
+        analyzed.append(song["style"])
+        return await analyze_item(song, *args)
+
+    monkeypatch.setattr(service, "analyze_batch_item", record)
+    songs = [
+        {"artist": "Metallica", "title": "One", "style": "vintage"},
+        {"artist": "Metallica", "title": "One", "style": "watercolor"},
+    ]
+    results = asyncio.run(read_batch(service, songs))
+    assert sorted(result["index"] for result in results) == [0, 1]
+    assert all(result["summary"] == "summary of One" for result in results)
+    assert analyzed == ["vintage"]
+
+
+def test_stale_batch_entries_are_refreshed(service, upstream):
+    song = SongIdentity(song_alias("Metallica", "One"))
+    lyrics_key = service.lyrics_cache_key(song)
+
+    async def scenario():
+        await service.set_cache(lyrics_key, "cached lyrics", 3600, service.CACHE_STALE_TTL)
+        summary_key = service.summary_cache_key("cached lyrics", "en")
+        await service.redis_client.setex(summary_key, service.CACHE_STALE_TTL - 60, "stale summary")
+        results = await read_batch(service, [{"artist": "Metallica", "title": "One"}])
+        assert results[0]["summary"] == "stale summary"
+        await asyncio.gather(*list(service.refresh_tasks.values()))
+        assert (await service.get_from_cache(summary_key)) == "summary of One"
+
+    asyncio.run(scenario())
+    assert upstream["summary"] == ["cached lyrics"]
+    assert upstream["lyrics"] == []
+    assert service.cache_stats["stale_hits"] == 1
+
+
+def test_a_large_batch_does_not_hold_up_another(service, upstream, monkeypatch):
+    monkeypatch.setattr(service, "BATCH_CONCURRENCY", 1)
+
+    async def scenario():
+        upstream["release"] = asyncio.Event()
+        large = asyncio.ensure_future(read_batch(service, [{"artist": "Slow", "title": f"Song {n}"} for n in range(3)]))
+        await asyncio.sleep(0.01)
+        # The large batch is stuck on its first song; a second batch still goes through
+        small = await asyncio.wait_for(read_batch(service, [{"artist": "Metallica", "title": "One"}]), 2)
+        assert small[0]["summary"] == "summary of One"
+        assert not large.done()
+        upstream["release"].set()
+        assert len(await asyncio.wait_for(large, 2)) == 3
+
+    asyncio.run(scenario())
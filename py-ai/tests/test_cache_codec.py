@@ -0,0 +1,71 @@
+import pytest
+
+import cache_codec
+from cache_codec import ENVELOPE_MARK, CacheCodec
+
+LONG_TEXT = "Мама, я знаю, ми всі тепер різні. So close, no matter how far. " * 40
+
+
+@pytest.mark.parametrize("value", ["", "short", "blob:" + "a" * 64, LONG_TEXT, "\x1fnot an envelope", "\x1f"])
+def test_round_trip(value):
+    codec = CacheCodec(threshold=64)
+    assert codec.decode(codec.encode(value)) == value
+
+
+def test_large_values_are_compressed():
+    codec = CacheCodec(threshold=64)
+    encoded = codec.encode(LONG_TEXT)
+    assert encoded.startswith(ENVELOPE_MARK + "z1:")
+    assert len(encoded) < len(LONG_TEXT.encode("utf-8"))
+    assert codec.stats["compressed"] == 1
+    assert codec.snapshot()["saved_bytes"] > 0
+
+
+def test_small_and_incompressible_values_stay_plain():
+    codec = CacheCodec(threshold=16)
+    assert codec.encode("short") == "short"
+    # Compressed base85 of random-looking text is bigger than the text itself
+    noise = "q8Zk3#Lp0v!Tx9Wm2&Rf7Yb5@Nc1^Hd4Gs6Ja"
+    assert codec.encode(noise) == noise
+    assert codec.stats["compressed"] == 0
+
+
+def test_values_that_look_like_an_envelope_are_wrapped():
+    codec = CacheCodec(threshold=0)
+    encoded = codec.encode("\x1fz1:abc")
+    assert encoded == ENVELOPE_MARK + "r1:\x1fz1:abc"
+    assert codec.decode(encoded) == "\x1fz1:abc"
+
+
+def test_disabled_compression_stores_plain_text():
+    codec = CacheCodec(threshold=0)
+    assert not codec.enabled
+    assert codec.encode(LONG_TEXT) == LONG_TEXT
+
+
+def test_plain_values_written_before_the_envelope_still_decode():
+    assert CacheCodec().decode("legacy summary") == "legacy summary"
+    assert CacheCodec().decode(None) is None
+
+
+@pytest.mark.parametrize("value", [ENVELOPE_MARK + "z1:not-base85-~~", ENVELOPE_MARK + "z9:abc", ENVELOPE_MARK + "q1:abc"])
+def test_corrupt_or_unknown_envelopes_read_as_misses(value):
+    codec = CacheCodec()
+    assert codec.decode(value) is None
+    assert codec.stats["decode_errors"] == 1
+
+
+def test_zstd_round_trip():
+    if cache_codec.zstandard is None:
+        pytest.skip("zstandard not installed")
+    codec = CacheCodec(threshold=64, algorithm="zstd")
+    encoded = codec.encode(LONG_TEXT)
+    assert encoded.startswith(ENVELOPE_MARK + "s1:")
+    assert CacheCodec().decode(encoded) == LONG_TEXT
+
+
+def test_zstd_falls_back_to_zlib_when_not_installed(monkeypatch):
+    monkeypatch.setattr(cache_codec, "zstandard", None)
+    codec = CacheCodec(threshold=64, algorithm="zstd")
+    assert codec.algorithm == "zlib"
+    assert codec.decode(codec.encode(LONG_TEXT)) == LONG_TEXT
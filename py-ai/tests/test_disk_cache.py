@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+
+from disk_cache import DiskCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache" / "cache.sqlite3")
+
+
+def run(cache: DiskCache, scenario):
+    async def wrapped():
+        await cache.start()
+        try:
+            return await scenario()
+        finally:
+            await cache.close()
+
+    return asyncio.run(wrapped())
+
+
+def test_set_and_get_with_remaining_ttl(path):
+    cache = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        assert await cache.set("summary:1", "text", 60)
+        value, ttl = await cache.get_with_ttl("summary:1")
+        assert value == "text"
+        assert 59 < ttl <= 60
+        assert await cache.get_with_ttl("missing") == (None, None)
+
+    run(cache, scenario)
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_get_many_keeps_the_order_of_the_keys(path):
+    cache = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        await cache.set_many([("a", "1", 60), ("c", "3", 60)])
+        rows = await cache.get_many(["c", "b", "a"])
+        assert [value for value, _ in rows] == ["3", None, "1"]
+
+    run(cache, scenario)
+
+
+def test_expired_entries_are_misses_and_purged(path, monkeypatch):
+    cache = DiskCache(path, 10 ** 6)
+    now = [time.time()]
+    monkeypatch.setattr("disk_cache.time.time", lambda: now[0])
+
+    async def scenario():
+        await cache.set_many([("short", "x", 10), ("long", "y", 1000)])
+        now[0] += 11
+        assert await cache.get_with_ttl("short") == (None, None)
+        assert await cache.purge_expired() == 1
+        assert cache.snapshot()["entries"] == 1
+
+    run(cache, scenario)
+
+
+def test_entries_survive_a_restart(path):
+    first = DiskCache(path, 10 ** 6)
+    run(first, lambda: first.set("k", "v", 60, dirty=True))
+    second = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        assert (await second.get_with_ttl("k"))[0] == "v"
+        assert second.snapshot()["dirty"] == 1
+
+    run(second, scenario)
+
+
+def test_dirty_entries_are_handed_back_until_marked_clean(path):
+    cache = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        await cache.set_many([("a", "1", 60), ("b", "2", 60)], dirty=True)
+        await cache.set("c", "3", 60)
+        dirty = await cache.dirty()
+        assert sorted(key for key, _, _ in dirty) == ["a", "b"]
+        assert all(55 < ttl <= 60 for _, _, ttl in dirty)
+        await cache.mark_clean([("a", "1"), ("b", "2")])
+        assert await cache.dirty() == []
+        assert cache.snapshot()["dirty"] == 0
+
+    run(cache, scenario)
+    assert cache.stats["written_back"] == 2
+
+
+def test_mark_clean_skips_entries_rewritten_since(path):
+    cache = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        await cache.set("a", "old", 60, dirty=True)
+        written_back = await cache.dirty()
+        await cache.set("a", "new", 60, dirty=True)
+        await cache.mark_clean([(key, value) for key, value, _ in written_back])
+        assert [(key, value) for key, value, _ in await cache.dirty()] == [("a", "new")]
+
+    run(cache, scenario)
+
+
+def test_eviction_keeps_within_budget_and_spares_dirty_entries(path):
+    cache = DiskCache(path, max_bytes=2000)
+
+    async def scenario():
+        await cache.set("owed", "d" * 300, 600, dirty=True)
+        for n in range(20):
+            await cache.set(f"clean:{n:02d}", "c" * 300, 600)
+        snapshot = cache.snapshot()
+        assert snapshot["bytes"] <= 2000
+        assert (await cache.get_with_ttl("owed"))[0] is not None
+        # The oldest clean entries went first
+        assert (await cache.get_with_ttl("clean:00"))[0] is None
+        assert (await cache.get_with_ttl("clean:19"))[0] is not None
+
+    run(cache, scenario)
+    assert cache.stats["evictions"] > 0
+
+
+def test_not_started_cache_is_a_no_op(path):
+    cache = DiskCache(path, 10 ** 6)
+
+    async def scenario():
+        assert not await cache.set("k", "v", 60)
+        assert await cache.get_with_ttl("k") == (None, None)
+        assert await cache.dirty() == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+from hot_keys import HotKeyTracker
+
+
+def test_counts_reads_per_key():
+    tracker = HotKeyTracker(width=512, depth=4, top_k=10)
+    for _ in range(5):
+        tracker.add("summary:a")
+    assert tracker.add("summary:b") == 1
+    assert tracker.estimate("summary:a") == 5
+    assert tracker.estimate("never-read") == 0
+    assert tracker.total == 6
+
+
+def test_estimates_never_undercount():
+    tracker = HotKeyTracker(width=16, depth=2, top_k=5)
+    counts = {f"key:{n}": n % 7 + 1 for n in range(100)}
+    for key, count in counts.items():
+        for _ in range(count):
+            tracker.add(key)
+    assert all(tracker.estimate(key) >= count for key, count in counts.items())
+
+
+def test_top_keeps_the_most_read_keys():
+    tracker = HotKeyTracker(width=2048, depth=4, top_k=3)
+    for n in range(20):
+        for _ in range(n + 1):
+            tracker.add(f"key:{n}")
+    assert [key for key, _ in tracker.top()] == ["key:19", "key:18", "key:17"]
+    assert tracker.top(limit=1) == [("key:19", 20)]
+    assert tracker.snapshot()["tracked"] == 3
+
+
+def test_counts_decay_so_new_traffic_takes_over(clock):
+    tracker = HotKeyTracker(width=512, depth=4, top_k=1, decay_interval=60)
+    for _ in range(8):
+        tracker.add("old")
+    clock.advance(60)
+    tracker.add("new")
+    assert tracker.estimate("old") == 4
+    clock.advance(60)
+    for _ in range(4):
+        tracker.add("new")
+    assert tracker.estimate("old") == 2
+    assert tracker.top() == [("new", 4)]
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import http_caching
+from http_caching import CompressionMiddleware, cacheable_json, etag_matches
+from pipeline import Pipeline
+
+CONTENT = {"summary": "A song about the sea"}
+
+
+def request(method="GET", if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers})
+
+
+def etag_of(content) -> str:
+    return cacheable_json(request(), content, "no-cache").headers["etag"]
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ('"other"', False),
+    ("*", True),
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"abc"') is matches
+    assert etag_matches(if_none_match, 'W/"abc"') is matches
+
+
+def test_results_are_tagged_with_a_hash_of_their_bytes():
+    response = cacheable_json(request(), CONTENT, "public, max-age=60")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert response.headers["etag"] == etag_of(dict(CONTENT))
+    assert response.headers["etag"] != etag_of({"summary": "Another song"})
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+def test_reads_with_a_matching_etag_are_not_modified(method):
+    etag = etag_of(CONTENT)
+    for if_none_match in (etag, f"W/{etag}", "*"):
+        response = cacheable_json(request(method, if_none_match), CONTENT, "public, max-age=60")
+        assert (response.status_code, response.body) == (304, b"")
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == "public, max-age=60"
+    assert cacheable_json(request(method, '"other"'), CONTENT, "no-cache").status_code == 200
+
+
+def test_posts_with_a_matching_etag_fail_the_precondition():
+    etag = etag_of(CONTENT)
+    for if_none_match in (etag, "*"):
+        assert cacheable_json(request("POST", if_none_match), CONTENT, "no-cache").status_code == 412
+    assert cacheable_json(request("POST", '"other"'), CONTENT, "no-cache").status_code == 200
+
+
+BIG = "lyrics " * 400
+
+
+async def big(request):
+    return PlainTextResponse(BIG, headers={"etag": '"big"'})
+
+
+async def small(request):
+    return PlainTextResponse("short")
+
+
+async def stream(request):
+    async def chunks():
+        yield BIG
+        yield BIG
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def partial(request):
+    return PlainTextResponse(BIG, status_code=206)
+
+
+async def fetch(path, accept_encoding):
+    app = CompressionMiddleware(
+        Starlette(routes=[Route(f"/{r.__name__}", r) for r in (big, small, stream, partial)]), minimum_size=1024
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, headers={"accept-encoding": accept_encoding})
+
+
+def test_large_responses_are_gzipped_and_their_etag_weakened(monkeypatch):
+    monkeypatch.setattr(http_caching, "brotli", None)
+    response = asyncio.run(fetch("/big", "gzip, br"))
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"big"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.text == BIG
+
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip("brotli")
+    response = asyncio.run(fetch("/big", "gzip, br"))
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_gzip_honours_a_zero_quality():
+    response = asyncio.run(fetch("/big", "gzip;q=0"))
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"big"'
+
+
+@pytest.mark.parametrize("path", ["/small", "/stream", "/partial"])
+def test_small_streamed_and_partial_responses_are_sent_as_is(path):
+    response = asyncio.run(fetch(path, "gzip"))
+    assert "content-encoding" not in response.headers
+
+
+def test_gzip_output_is_deterministic():
+    middleware = CompressionMiddleware(None)
+    assert middleware._compress("gzip", BIG.encode()) == middleware._compress("gzip", BIG.encode())
+    assert gzip.decompress(middleware._compress("gzip", BIG.encode())) == BIG.encode()
+
+
+def test_song_results_can_be_revalidated_with_get(service, monkeypatch):
+    monkeypatch.setattr(
+        service, "build_song_pipeline",
+        lambda artist, title, language, style: Pipeline().add("summary", lambda: asyncio.sleep(0, f"{title} summary")),
+    )
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            params = {"artist": "Metallica", "title": "One", "language": "en"}
+            first = await client.get("/summarize", params=params)
+            assert first.json() == {"summary": "One summary"}
+            etag = first.headers["etag"]
+            again = await client.get("/summarize", params=params, headers={"if-none-match": etag})
+            assert (again.status_code, again.content) == (304, b"")
+            posted = await client.post("/summarize", json=params, headers={"if-none-match": etag})
+            assert posted.status_code == 412
+            assert (await client.get("/summarize", params={"artist": "Metallica"})).status_code == 422
+
+    asyncio.run(scenario())
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from job_scheduler import JobScheduler, QueueFullError
+
+
+def run(scheduler: JobScheduler, scenario):
+    async def wrapped():
+        scheduler.start()
+        try:
+            return await scenario()
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(wrapped())
+
+
+async def drain(scheduler: JobScheduler):
+    await asyncio.wait_for(scheduler._queue.join(), 5)
+
+
+def test_jobs_run_and_are_counted():
+    scheduler = JobScheduler(workers=2, max_queue=10)
+    done = []
+
+    async def job(n):
+        done.append(n)
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def scenario():
+        for n in range(3):
+            scheduler.submit(f"job:{n}", lambda n=n: job(n))
+        scheduler.submit("job:bad", failing)
+        await drain(scheduler)
+
+    run(scheduler, scenario)
+    assert sorted(done) == [0, 1, 2]
+    assert scheduler.stats["completed"] == 3
+    assert scheduler.stats["failed"] == 1
+    assert not scheduler.has_job("job:0")
+
+
+def test_interactive_jobs_jump_the_bulk_queue():
+    scheduler = JobScheduler(workers=1, max_queue=10)
+    order = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        async def job(name):
+            order.append(name)
+
+        scheduler.submit("blocker", blocker)
+        await asyncio.sleep(0)
+        scheduler.submit("bulk:1", lambda: job("bulk:1"), priority="bulk")
+        scheduler.submit("bulk:2", lambda: job("bulk:2"), priority="bulk")
+        scheduler.submit("interactive", lambda: job("interactive"))
+        release.set()
+        await drain(scheduler)
+
+    run(scheduler, scenario)
+    assert order == ["interactive", "bulk:1", "bulk:2"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    scheduler = JobScheduler(workers=1, max_queue=2)
+
+    async def scenario():
+        release = asyncio.Event()
+        scheduler.submit("running", release.wait)
+        await asyncio.sleep(0)
+        scheduler.submit("queued:1", release.wait)
+        scheduler.submit("queued:2", release.wait)
+        with pytest.raises(QueueFullError) as raised:
+            scheduler.submit("queued:3", release.wait)
+        assert raised.value.retry_after == 20  # two queued jobs at the default 10s each
+        assert scheduler.queued == 2
+        assert scheduler.running == 1
+        release.set()
+        await drain(scheduler)
+
+    run(scheduler, scenario)
+    assert scheduler.stats["rejected"] == 1
+
+
+def test_cancel_running_and_queued_jobs():
+    scheduler = JobScheduler(workers=1, max_queue=10)
+
+    async def scenario():
+        never = asyncio.Event()
+        scheduler.submit("running", never.wait)
+        scheduler.submit("queued", never.wait)
+        await asyncio.sleep(0)
+        assert scheduler.cancel("queued")
+        assert scheduler.cancel("running")
+        assert not scheduler.cancel("unknown")
+        await drain(scheduler)
+
+    run(scheduler, scenario)
+    assert scheduler.stats["cancelled"] == 2
+    assert scheduler.stats["completed"] == 0
+
+
+def test_submit_before_start_is_an_error():
+    with pytest.raises(RuntimeError):
+        JobScheduler(workers=1, max_queue=1).submit("job", asyncio.sleep)
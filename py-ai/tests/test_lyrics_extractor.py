@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from lyrics_extractor import LyricsExtractor, clean_lyrics, extract_json_lyrics, extract_lyrics, extract_lyrics_from_stream
+
+PAGE = (
+    "<html><head><title>Nothing Else Matters</title>"
+    + "<script>var filler = '" + "x" * 5000 + "';</script>"
+    + "</head><body><div class=\"header\">Header &amp; nav</div>"
+    + "<div id=\"lyrics-root\" class=\"Lyrics\">"
+    + "<div data-lyrics-container=\"true\">[Verse 1]<br/>So close, no matter how far<br>"
+    + "Couldn't be much more from the <a href=\"/x\"><span>heart</span></a><br/>"
+    + "<div data-exclude-from-selection=\"true\"><span>You might also like</span><img src=\"a.png\"></div>"
+    + "Forever trusting who we are</div>"
+    + "<div class=\"ad\">Advertisement</div>"
+    + "<div data-lyrics-container=\"true\">[Chorus]<br/>And nothing else matters</div>"
+    + "</div>"
+    + "<footer>" + "<p>footer</p>" * 500 + "</footer></body></html>"
+)
+
+EXPECTED = (
+    "So close, no matter how far\n"
+    "Couldn't be much more from the heart\n"
+    "Forever trusting who we are\n"
+    "And nothing else matters"
+)
+
+
+def feed_in_chunks(html: str, size: int) -> LyricsExtractor:
+    extractor = LyricsExtractor()
+    for start in range(0, len(html), size):
+        extractor.feed(html[start:start + size])
+    return extractor
+
+
+def test_whole_page():
+    assert extract_lyrics(PAGE) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 7, 16, 100, 1024, 4096])
+def test_chunked_input_matches_the_whole_page(size):
+    extractor = feed_in_chunks(PAGE, size)
+    assert extractor.lyrics() == EXPECTED
+    assert extractor.containers == 2
+
+
+def test_marker_split_across_chunks():
+    split = PAGE.index("lyrics-root") + 4
+    extractor = LyricsExtractor()
+    extractor.feed(PAGE[:split])
+    extractor.feed(PAGE[split:])
+    assert extractor.lyrics() == EXPECTED
+
+
+def test_done_once_the_lyrics_section_closes():
+    end = PAGE.index("<footer>")
+    extractor = LyricsExtractor()
+    extractor.feed(PAGE[:end])
+    assert extractor.done
+    # Anything after is ignored, even more lyrics
+    extractor.feed("<div data-lyrics-container=\"true\">late</div>")
+    assert extractor.lyrics() == EXPECTED
+
+
+def test_page_without_lyrics():
+    extractor = feed_in_chunks("<html><body>" + "<p>nothing</p>" * 1000 + "</body></html>", 512)
+    assert extractor.lyrics() is None
+    assert not extractor.done
+
+
+def test_json_fallback():
+    html = '<script>window.__DATA__ = {"lyrics":"Line one\\nLine two\\n"}</script>'
+    assert extract_json_lyrics(html) == "Line one\nLine two"
+    assert extract_lyrics(html) == "Line one\nLine two"
+    assert extract_json_lyrics('{"lyrics":""}') is None
+
+
+def test_clean_lyrics_drops_headers_and_blank_lines():
+    assert clean_lyrics("[Intro]\n\n  One  \n[Verse 2: Someone]\nTwo\n\n") == "One\nTwo"
+
+
+def chunks_of(html: str, size: int, read: list):
+    async def generate():
+        for start in range(0, len(html), size):
+            read.append(start)
+            yield html[start:start + size]
+
+    return generate()
+
+
+def test_stream_stops_reading_after_the_lyrics():
+    read = []
+    lyrics = asyncio.run(extract_lyrics_from_stream(chunks_of(PAGE, 256, read), batch_chars=1024))
+    assert lyrics == EXPECTED
+    assert read[-1] < PAGE.index("</footer>")
+
+
+def test_stream_falls_back_to_json_lyrics():
+    html = "<html>" + "<p>filler</p>" * 200 + '<script>{"lyrics":"Only in JSON"}</script></html>'
+    lyrics = asyncio.run(extract_lyrics_from_stream(chunks_of(html, 100, []), batch_chars=300))
+    assert lyrics == "Only in JSON"
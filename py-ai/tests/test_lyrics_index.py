@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from lyrics_index import NearDuplicateIndex, normalize_lines, shingles
+
+LYRICS = """[Verse 1]
+So close, no matter how far
+Couldn't be much more from the heart
+Forever trusting who we are
+And nothing else matters
+
+[Chorus]
+Never opened myself this way
+Life is ours, we live it our way
+All these words I don't just say
+And nothing else matters
+"""
+
+# The same song scraped from a live recording
+LIVE = LYRICS.replace("[Verse 1]", "[Intro: crowd]").replace("And nothing else matters\n\n", "And nothing else matters (x2)\n\n")
+
+OTHER = """Hello darkness, my old friend
+I've come to talk with you again
+Because a vision softly creeping
+Left its seeds while I was sleeping
+And the vision that was planted in my brain
+Still remains within the sound of silence
+"""
+
+
+def test_labels_repeat_marks_and_case_are_ignored():
+    assert normalize_lines("[Chorus]\nNothing Else Matters (x2)\n\n(Bridge)\nÉcoute x3") == [
+        "nothing else matters",
+        "ecoute",
+    ]
+    assert shingles(LYRICS) == shingles(LIVE)
+    assert shingles("two words") == {"two words"}
+
+
+def test_short_lyrics_are_not_indexed():
+    index = NearDuplicateIndex()
+    assert index.signature("La la la, la la") is None
+    assert index.stats["skipped_short"] == 1
+
+
+def test_signatures_estimate_similarity():
+    index = NearDuplicateIndex()
+    original = index.signature(LYRICS)
+    assert index.signature(LYRICS) == original
+    assert index.similarity(original, index.signature(LIVE)) == 1.0
+    edited = LYRICS.replace("Never opened myself this way", "I never opened up myself this way")
+    assert 0.7 <= index.similarity(original, index.signature(edited)) < 1.0
+    assert index.similarity(original, index.signature(OTHER)) < 0.2
+
+
+def test_rows_must_divide_into_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
+
+
+async def find(index, lyrics, namespace="metallica"):
+    signature = index.signature(lyrics)
+    return await index.query(signature, exclude="self", namespace=namespace)
+
+
+@pytest.fixture(params=["local", "redis"])
+def index(request, service):
+    """An index kept in process, and one kept in (fake) Redis."""
+    redis = (lambda: service.redis_client) if request.param == "redis" else None
+    return NearDuplicateIndex(redis=redis)
+
+
+def test_near_duplicates_are_found_best_first(index):
+    async def scenario():
+        await index.add("original", index.signature(LYRICS), "metallica")
+        await index.add("other", index.signature(OTHER), "metallica")
+        return await find(index, LIVE)
+
+    matches = asyncio.run(scenario())
+    assert matches[0] == (1.0, "original")
+    assert all(doc != "other" for _, doc in matches)
+    assert index.stats["indexed"] == 2 and index.stats["lookups"] == 1
+
+
+def test_lookups_stay_within_their_namespace(index):
+    async def scenario():
+        await index.add("original", index.signature(LYRICS), "metallica")
+        # A cover of the same lyrics by another artist
+        return await find(index, LIVE, namespace="apocalyptica"), await find(index, LIVE)
+
+    cover, same_artist = asyncio.run(scenario())
+    assert cover == []
+    assert same_artist[0][1] == "original"
+
+
+def test_the_lyrics_themselves_are_excluded(index):
+    async def scenario():
+        await index.add("self", index.signature(LYRICS), "metallica")
+        return await find(index, LYRICS)
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_the_local_index_forgets_the_oldest_lyrics():
+    index = NearDuplicateIndex(max_local=1)
+
+    async def scenario():
+        await index.add("original", index.signature(LYRICS), "metallica")
+        await index.add("other", index.signature(OTHER), "simon and garfunkel")
+        return await find(index, LIVE)
+
+    assert asyncio.run(scenario()) == []
+    assert index.snapshot()["local_entries"] == 1
+    assert all(bucket == {"other"} for bucket in index._buckets.values())
+
+
+def test_outcomes_are_counted_by_best_similarity():
+    index = NearDuplicateIndex()
+    index.stats["lookups"] = 3
+    index.record(0.97, reused=True)
+    index.record(0.82, reused=False)
+    index.record(0.1, reused=False)
+    snapshot = index.snapshot()
+    assert snapshot["reused"] == 1 and snapshot["reuse_rate"] == 33.33
+    assert snapshot["best_similarity"][">=0.95"] == 1
+    assert snapshot["best_similarity"][">=0.8"] == 1
+    assert snapshot["best_similarity"]["<0.5"] == 1
+
+
+@pytest.fixture
+def summarizer(service, monkeypatch):
+    """_summarize_lyrics without OpenAI: the generic fallback is what a new summary looks like."""
+    monkeypatch.setattr(service, "get_openai_client", lambda: None)
+    monkeypatch.setattr(service, "lyrics_index", NearDuplicateIndex(redis=lambda: service.redis_client))
+
+    async def summarize(lyrics, artist, title):
+        return await service._summarize_lyrics(lyrics, artist, title, "en", service.summary_cache_key(lyrics, "en"))
+
+    return summarize
+
+
+def test_summaries_are_reused_for_versions_by_the_same_artist(service, summarizer):
+    async def scenario():
+        original = service.summary_cache_key(LYRICS, "en")
+        await service.set_cache(original, "Metallica's summary", 3600)
+        await service.lyrics_index.add(service.get_content_hash(LYRICS), service.lyrics_index.signature(LYRICS), "metallica")
+        return await summarizer(LIVE, "METALLICA (feat. The Orchestra)", "Nothing Else Matters (Live)")
+
+    assert asyncio.run(scenario()) == "Metallica's summary"
+    assert service.lyrics_index.stats["reused"] == 1
+
+
+def test_summaries_are_not_reused_for_another_artists_cover(service, summarizer):
+    async def scenario():
+        original = service.summary_cache_key(LYRICS, "en")
+        await service.set_cache(original, "Metallica's summary", 3600)
+        await service.lyrics_index.add(service.get_content_hash(LYRICS), service.lyrics_index.signature(LYRICS), "metallica")
+        return await summarizer(LIVE, "Apocalyptica", "Nothing Else Matters")
+
+    summary = asyncio.run(scenario())
+    assert isinstance(summary, service.FallbackSummary)
+    assert "Apocalyptica" in summary and "Metallica" not in summary
+    assert service.lyrics_index.stats["reused"] == 0
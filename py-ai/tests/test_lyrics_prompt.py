@@ -0,0 +1,110 @@
+import pytest
+
+import lyrics_prompt
+from lyrics_prompt import LyricsPreparer, collapse_repeats, estimate_tokens, fit_budget, stanzas, strip_noise
+
+
+@pytest.fixture
+def estimated(monkeypatch):
+    """Count tokens with the per-script estimate, whether or not tiktoken is installed."""
+    monkeypatch.setattr(lyrics_prompt, "tiktoken", None)
+
+
+def test_token_estimate_by_script(estimated):
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("без бою") == 3
+    assert estimate_tokens("") == 0
+
+
+def test_markup_boilerplate_and_whitespace_are_stripped():
+    scraped = (
+        "12 Contributors\nTranslations\n"
+        "[Verse 1]<br/>So close,&nbsp;no matter <i>how</i> far​\n\n\n"
+        "You might also like\nCouldn't be much  more from the heart\n42Embed"
+    )
+    assert strip_noise(scraped) == [
+        "[Verse 1]",
+        "So close, no matter how far",
+        "",
+        "Couldn't be much more from the heart",
+    ]
+
+
+def test_back_to_back_lines_are_counted():
+    assert collapse_repeats(["Oh oh", "oh, OH!", "Oh oh (x2)", "Yeah"]) == ["Oh oh (x4)", "Yeah"]
+
+
+def test_a_repeated_chorus_becomes_one_marker():
+    chorus = ["[Chorus]", "Never opened myself this way", "Life is ours, we live it our way"]
+    lines = ["[Verse 1]", "So close", "No matter how far", "", *chorus, "", "[Verse 2]", "Trust I seek", "", *chorus]
+    assert collapse_repeats(lines) == [
+        "[Verse 1]", "So close", "No matter how far", "",
+        *chorus, "",
+        "[Verse 2]", "Trust I seek", "",
+        "[Chorus]", "[repeat: Never opened myself this way …]",
+    ]
+
+
+def test_a_chorus_sung_twice_in_a_row_is_one_counted_marker():
+    chorus = ["Never opened myself this way", "Life is ours, we live it our way"]
+    assert collapse_repeats(["Intro line", *chorus, "Bridge", *chorus, *chorus]) == [
+        "Intro line", *chorus, "Bridge", "[repeat: Never opened myself this way …] (x2)",
+    ]
+
+
+def test_single_repeated_lines_are_kept():
+    assert collapse_repeats(["Hey", "You", "Hey"]) == ["Hey", "You", "Hey"]
+
+
+def test_long_unlabelled_blocks_are_split_into_stanzas():
+    lines = ["[Verse]"] + [f"line {n}" for n in range(20)] + ["", "[Outro]", "end"]
+    blocks = stanzas(lines)
+    assert [len(block) for block in blocks] == [9, 8, 4, 2]
+    assert blocks[0][0] == "[Verse]" and blocks[1][0] == "line 8"
+
+
+def song(stanza_count=6, lines_per_stanza=6):
+    lines = []
+    for s in range(stanza_count):
+        lines.append(f"[Verse {s + 1}]")
+        lines.extend(f"verse {s + 1} line {n + 1} with a few more words" for n in range(lines_per_stanza))
+        lines.append("")
+    return lines[:-1]
+
+
+def test_lyrics_within_the_budget_are_untouched(estimated):
+    lines = song(2, 2)
+    assert fit_budget(lines, 1000) == ("\n".join(lines), False)
+    assert fit_budget(lines, 0) == ("\n".join(lines), False)
+
+
+def test_every_stanza_is_shortened_before_any_is_dropped(estimated):
+    text, trimmed = fit_budget(song(), 180)
+    assert trimmed
+    assert estimate_tokens(text) <= 180
+    for verse in range(1, 7):
+        assert f"[Verse {verse}]" in text
+        assert f"verse {verse} line 1 " in text
+    assert "verse 1 line 6" not in text
+    assert "…" in text
+
+
+def test_the_tail_is_cut_when_one_line_per_stanza_is_too_long(estimated):
+    text, trimmed = fit_budget(song(), 40)
+    assert trimmed
+    assert text.endswith("[…]")
+    assert "[Verse 1]" in text and "[Verse 6]" not in text
+    assert estimate_tokens(text) <= 40 + estimate_tokens("[…]")
+
+
+def test_the_preparer_counts_what_it_saved(estimated):
+    chorus = "\n".join(f"chorus line {n} goes round and round" for n in range(4))
+    lyrics = "\n\n".join(["[Verse 1]\n" + "\n".join(f"verse line {n}" for n in range(4)), "[Chorus]\n" + chorus] * 3)
+    preparer = LyricsPreparer(token_budget=60)
+    text, tokens_in, tokens_out = preparer.prepare(lyrics)
+    assert tokens_out < tokens_in
+    assert "[repeat:" in text
+    snapshot = preparer.snapshot()
+    assert snapshot["prepared"] == 1 and snapshot["trimmed"] == 1
+    assert snapshot["reduction"] > 50
+    assert snapshot["token_budget"] == 60
@@ -0,0 +1,85 @@
+import sys
+
+from memory_cache import MemoryCache
+
+
+def entry_size(key: str, value: str) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+def test_set_and_get(clock):
+    cache = MemoryCache(max_bytes=10_000, max_ttl=60)
+    assert cache.set("summary:1", "text", 30)
+    assert cache.get("summary:1") == "text"
+    assert cache.get("missing") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_ttl_is_capped_but_the_original_ttl_is_reported(clock):
+    cache = MemoryCache(max_bytes=10_000, max_ttl=60)
+    cache.set("summary:1", "text", 3600)
+    clock.advance(10)
+    value, ttl = cache.get_with_ttl("summary:1")
+    assert value == "text"
+    assert ttl == 3590
+    clock.advance(50)
+    assert cache.get_with_ttl("summary:1") == (None, None)
+    assert cache.stats["expirations"] == 1
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_short_ttls_expire_on_their_own(clock):
+    cache = MemoryCache(max_bytes=10_000, max_ttl=60)
+    cache.set("k", "v", 5)
+    clock.advance(5)
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entries_are_evicted_to_fit_the_budget(clock):
+    size = entry_size("key:0", "x" * 100)
+    cache = MemoryCache(max_bytes=size * 3, max_ttl=60, max_entry_fraction=1)
+    for n in range(3):
+        cache.set(f"key:{n}", "x" * 100, 60)
+    cache.get("key:0")  # now the most recently used
+    cache.set("key:3", "x" * 100, 60)
+    assert cache.get("key:1") is None
+    assert cache.get("key:0") is not None
+    assert cache.get("key:3") is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.snapshot()["bytes"] <= cache.max_bytes
+
+
+def test_the_budget_counts_bytes_not_entries(clock):
+    small = entry_size("a", "x")
+    cache = MemoryCache(max_bytes=small * 20, max_ttl=60)
+    for n in range(10):
+        cache.set(f"{n}", "x", 60)
+    cache.set("big", "x" * (cache.max_entry_bytes - sys.getsizeof("big") - 60), 60)
+    assert cache.snapshot()["bytes"] <= cache.max_bytes
+    assert cache.get("big") is not None
+
+
+def test_values_over_the_entry_limit_are_not_stored(clock):
+    cache = MemoryCache(max_bytes=8_000, max_ttl=60)
+    cache.set("k", "small", 60)
+    assert not cache.set("k", "x" * 2_000, 60)
+    # The old value is dropped too, so a read never sees it after the write
+    assert cache.get("k") is None
+
+
+def test_replacing_a_value_keeps_the_byte_count_right(clock):
+    cache = MemoryCache(max_bytes=10_000, max_ttl=60)
+    cache.set("k", "x" * 100, 60)
+    cache.set("k", "y", 60)
+    assert cache.snapshot()["bytes"] == entry_size("k", "y")
+    cache.delete("k")
+    assert cache.snapshot()["bytes"] == 0
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = MemoryCache(max_bytes=0, max_ttl=60)
+    assert not cache.enabled
+    assert not cache.set("k", "v", 60)
+    assert cache.get("k") is None
+    assert not MemoryCache(max_bytes=10_000, max_ttl=60).set("k", "v", 0)
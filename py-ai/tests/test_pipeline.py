@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from pipeline import Pipeline
+
+
+def recording_pipeline(delay=0.02):
+    """song -> lyrics -> summary, with spotify independent; records when each stage starts."""
+    started = []
+
+    def stage(name, result):
+        async def run(*inputs):
+            started.append((name, inputs))
+            await asyncio.sleep(delay)
+            return result
+        return run
+
+    pipeline = (
+        Pipeline()
+        .add("song", stage("song", "S"))
+        .add("lyrics", stage("lyrics", "L"), ["song"])
+        .add("summary", stage("summary", "M"), ["lyrics"])
+        .add("artwork", stage("artwork", "A"), ["song", "summary"])
+        .add("spotify", stage("spotify", "T"))
+    )
+    return pipeline, started
+
+
+def test_stages_get_their_dependencies_results_in_order():
+    pipeline, started = recording_pipeline()
+    assert asyncio.run(pipeline.get("artwork")) == "A"
+    assert started == [("song", ()), ("lyrics", ("S",)), ("summary", ("L",)), ("artwork", ("S", "M"))]
+
+
+def test_shared_stages_run_once():
+    pipeline, started = recording_pipeline()
+
+    async def scenario():
+        return await asyncio.gather(pipeline.get("summary"), pipeline.get("artwork"), pipeline.get("lyrics"))
+
+    assert asyncio.run(scenario()) == ["M", "A", "L"]
+    assert [name for name, _ in started].count("song") == 1
+    assert [name for name, _ in started].count("lyrics") == 1
+
+
+def test_independent_stages_run_at_the_same_time():
+    pipeline, _ = recording_pipeline(delay=0.1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        began = loop.time()
+        pipeline.start("spotify")
+        await pipeline.get("lyrics")
+        await pipeline.get("spotify")
+        return loop.time() - began
+
+    # song + lyrics take 0.2s; spotify runs alongside instead of adding 0.1s
+    assert asyncio.run(scenario()) < 0.29
+
+
+def test_errors_reach_every_consumer():
+    async def failing():
+        raise ValueError("no lyrics")
+
+    async def summary(lyrics):
+        return "unreachable"
+
+    pipeline = Pipeline().add("lyrics", failing).add("summary", summary, ["lyrics"])
+
+    async def scenario():
+        results = await asyncio.gather(pipeline.get("lyrics"), pipeline.get("summary"), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        pipeline.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_consumer_does_not_cancel_a_shared_stage():
+    pipeline, _ = recording_pipeline()
+
+    async def scenario():
+        leaving = asyncio.ensure_future(pipeline.get("lyrics"))
+        await asyncio.sleep(0.005)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await pipeline.get("lyrics")
+
+    assert asyncio.run(scenario()) == "L"
+
+
+def test_leaving_the_context_cancels_stages_nobody_waited_for():
+    pipeline, _ = recording_pipeline(delay=10)
+
+    async def scenario():
+        async with pipeline:
+            pipeline.start("spotify")
+            spotify = pipeline._tasks["spotify"]
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return spotify
+
+    assert asyncio.run(scenario()).cancelled()
+
+
+def test_the_observer_gets_each_stage_timing():
+    finished = []
+    pipeline, _ = recording_pipeline(delay=0.01)
+    pipeline.observer = lambda stage, seconds: finished.append(stage)
+    asyncio.run(pipeline.get("summary"))
+    assert finished == ["song", "lyrics", "summary"]
+    assert all(seconds >= 0.01 for seconds in pipeline.timings.values())
+
+
+def test_unknown_stages_are_an_error():
+    with pytest.raises(KeyError):
+        asyncio.run(Pipeline().get("missing"))
+
+
+def test_spotify_result_is_dropped_when_it_is_not_ready(service, monkeypatch):
+    monkeypatch.setattr(service, "SPOTIFY_RESULT_WAIT", 0.05)
+
+    async def slow_spotify():
+        await asyncio.sleep(5)
+
+    async def failing_spotify():
+        raise RuntimeError("spotify down")
+
+    async def scenario():
+        async with Pipeline().add("spotify", slow_spotify) as slow:
+            assert await service.spotify_if_ready(slow) is None
+        async with Pipeline().add("spotify", failing_spotify) as failing:
+            assert await service.spotify_if_ready(failing) is None
+        async with Pipeline().add("spotify", lambda: asyncio.sleep(0, "track")) as ready:
+            assert await service.spotify_if_ready(ready) == "track"
+
+    asyncio.run(asyncio.wait_for(scenario(), 2))
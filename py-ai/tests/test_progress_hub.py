@@ -0,0 +1,99 @@
+import asyncio
+
+import fakeredis
+import fakeredis.aioredis
+
+from progress_hub import ProgressHub
+
+
+def make_hub() -> ProgressHub:
+    return ProgressHub("progress:", "job-cancel:")
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_local_publish_reaches_every_subscriber_of_the_request():
+    hub = make_hub()
+
+    async def scenario():
+        first, second = hub.subscribe("a"), hub.subscribe("a")
+        other = hub.subscribe("b")
+        hub.publish_local("a", "event")
+        assert first.get_nowait() == second.get_nowait() == "event"
+        assert other.empty()
+        assert hub.subscriber_count("a") == 2
+        assert hub.subscriber_count() == 3
+        hub.unsubscribe("a", first)
+        hub.unsubscribe("a", second)
+        hub.unsubscribe("a", second)
+        assert hub.subscriber_count("a") == 0
+        assert hub.subscriber_count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_updates_published_through_redis_reach_every_worker():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        hubs = [make_hub(), make_hub()]
+        for hub in hubs:
+            await hub.start(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        try:
+            assert all(hub.connected for hub in hubs)
+            queues = [hub.subscribe("job-1") for hub in hubs]
+            publisher = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+            await publisher.publish("progress:job-1", '{"seq": 1}')
+            await publisher.publish("progress:job-2", '{"seq": 1}')
+            for queue in queues:
+                assert await asyncio.wait_for(queue.get(), 2) == '{"seq": 1}'
+                assert queue.empty()
+        finally:
+            for hub in hubs:
+                await hub.stop()
+        assert not any(hub.connected for hub in hubs)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_requests_are_handed_to_on_cancel():
+    cancelled = []
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        hub = make_hub()
+        hub.on_cancel = cancelled.append
+        await hub.start(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        try:
+            queue = hub.subscribe("job-1")
+            await fakeredis.aioredis.FakeRedis(server=server).publish("job-cancel:job-1", "1")
+            await wait_until(lambda: cancelled)
+            assert queue.empty()
+        finally:
+            await hub.stop()
+
+    asyncio.run(scenario())
+    assert cancelled == ["job-1"]
+
+
+def test_cancel_without_a_handler_is_ignored():
+    make_hub().cancel_local("job-1")
+
+
+def test_progress_is_stored_in_redis_for_other_workers(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-stored")
+        await tracker.update(30, "Lyrics found!")
+        # Another worker has no tracker for the job and reads it from Redis
+        service.progress_store.pop("job-stored")
+        seq, state = await service.load_progress("job-stored")
+        assert seq == 1
+        assert (state["progress"], state["status"]) == (30, "Lyrics found!")
+        assert 0 < await service.redis_client.ttl("progress:job-stored") <= service.PROGRESS_TTL
+        assert await service.load_progress("job-unknown") is None
+
+    asyncio.run(scenario())
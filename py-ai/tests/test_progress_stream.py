@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+
+def request(last_event_id=None) -> Request:
+    headers = [(b"last-event-id", str(last_event_id).encode())] if last_event_id is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/progress", "headers": headers})
+
+
+def parse(chunk: str):
+    """(id, data) of one SSE event; id is None when the event has none."""
+    event_id, data = None, None
+    for line in chunk.strip().split("\n"):
+        if line.startswith("id: "):
+            event_id = int(line[4:])
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event_id, data
+
+
+async def open_stream(service, request_id, last_event_id=None):
+    response = await service.progress_stream(request_id, request(last_event_id))
+    events = response.body_iterator
+
+    async def next_event():
+        return parse(await asyncio.wait_for(events.__anext__(), 2))
+
+    next_event.close = events.aclose
+    return next_event
+
+
+def test_first_event_is_the_full_state_then_only_changes(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-deltas")
+        await tracker.update(10, "Searching lyrics database...")
+        next_event = await open_stream(service, "job-deltas")
+        assert (await next_event())[1]["status"] == "Connected to progress stream"
+        event_id, state = await next_event()
+        assert event_id == 1
+        assert state["request_id"] == "job-deltas" and state["progress"] == 10
+
+        await tracker.update(30, "Lyrics found!")
+        event_id, delta = await next_event()
+        assert event_id == 2
+        assert (delta["progress"], delta["status"]) == (30, "Lyrics found!")
+        assert "request_id" not in delta
+
+        await tracker.stream_summary("This song ")
+        assert await next_event() == (3, {"summary_delta": "This song "})
+
+        await tracker.update(100, "Done")
+        assert (await next_event())[0] == 4
+        assert (await next_event())[1] == {"status": "completed", "progress": 100}
+
+    asyncio.run(scenario())
+
+
+def test_resume_without_a_gap_sends_only_what_comes_next(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-resume")
+        for progress in (10, 30, 50):
+            await tracker.update(progress, f"{progress}%")
+        next_event = await open_stream(service, "job-resume", last_event_id=3)
+        await tracker.update(70, "Generating artwork...")
+        # No connection event and no repeat of the state the client already has
+        event_id, delta = await next_event()
+        assert event_id == 4
+        assert delta["progress"] == 70
+        await next_event.close()
+
+    asyncio.run(scenario())
+
+
+def test_resume_after_missed_events_sends_the_current_state(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-missed")
+        for progress in (10, 30, 50):
+            await tracker.update(progress, f"{progress}%")
+        await tracker.stream_summary("Partial ")
+        next_event = await open_stream(service, "job-missed", last_event_id=1)
+        event_id, state = await next_event()
+        assert event_id == 4
+        assert (state["progress"], state["partial_summary"]) == (50, "Partial ")
+        await next_event.close()
+
+    asyncio.run(scenario())
+
+
+def test_resume_on_another_worker_reads_the_state_from_redis(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-elsewhere")
+        await tracker.update(40, "Analyzing...")
+        service.progress_store.pop("job-elsewhere")
+        next_event = await open_stream(service, "job-elsewhere", last_event_id=0)
+        assert (await next_event())[1]["status"] == "Connected to progress stream"
+        event_id, state = await next_event()
+        assert (event_id, state["progress"]) == (1, 40)
+        await next_event.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_gap_in_the_sequence_resyncs_from_the_stored_state(service):
+    async def scenario():
+        tracker = service.ProgressTracker("job-gap")
+        await tracker.update(10, "Searching...")
+        next_event = await open_stream(service, "job-gap", last_event_id=1)
+        # Event 2 never reaches this worker; 3 arrives first
+        tracker.seq += 1
+        await tracker.update(60, "Almost there")
+        event_id, state = await next_event()
+        assert event_id == 3
+        assert state["request_id"] == "job-gap" and state["progress"] == 60
+        await next_event.close()
+
+    asyncio.run(scenario())
+
+
+def test_unknown_requests_get_an_error_event(service):
+    async def scenario():
+        next_event = await open_stream(service, "job-unknown")
+        await next_event()
+        assert (await next_event())[1] == {"error": "Request not found"}
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+
+
+@pytest.fixture
+def started(service, monkeypatch):
+    """Background startup finished; Redis unreachable."""
+    tasks = {}
+    for name in ("openai", "artwork_store", "disk_cache"):
+        tasks[name] = Future()  # done(), cancelled() and exception(), like the startup tasks
+        tasks[name].set_result(None)
+    monkeypatch.setattr(service, "startup_tasks", tasks)
+    monkeypatch.setitem(service.redis_status, "state", "reconnecting")
+    monkeypatch.setitem(service.redis_status, "last_error", "Connection refused")
+    return service
+
+
+def readiness(service):
+    response = service.readyz()
+    return response.status_code, json.loads(response.body)
+
+
+def test_a_redis_outage_is_reported_without_taking_the_worker_out(started):
+    status, body = readiness(started)
+    assert status == 200
+    assert body["status"] == "ready"
+    assert body["checks"]["redis"]["state"] == "reconnecting"
+    assert body["checks"]["redis"]["last_error"] == "Connection refused"
+    assert body["checks"]["redis"]["required"] is False
+
+
+def test_readiness_can_wait_for_redis(started, monkeypatch):
+    monkeypatch.setattr(started, "READY_REQUIRES_REDIS", True)
+    assert readiness(started)[0] == 503
+    monkeypatch.setitem(started.redis_status, "state", "connected")
+    assert readiness(started)[0] == 200
+
+
+def test_not_ready_until_background_startup_finishes(started, monkeypatch):
+    monkeypatch.delitem(started.startup_tasks, "artwork_store")
+    status, body = readiness(started)
+    assert status == 503
+    assert body["checks"]["artwork_store"] == {"state": "starting"}
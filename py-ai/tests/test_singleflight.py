@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.snapshot() == {"calls": 5, "executions": 1, "coalesced": 4, "remote_waits": 0, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.stats["executions"] == 2
+
+
+def test_the_key_is_released_once_the_work_finishes():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return [await flight.do("key", work), await flight.do("key", work)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_every_caller_gets_the_error():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.snapshot()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_caller_does_not_cancel_the_work():
+    flight = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        return "value"
+
+    async def scenario():
+        leaving = asyncio.ensure_future(flight.do("key", work))
+        staying = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.005)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == "value"
+    assert finished == [1]
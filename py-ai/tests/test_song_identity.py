@@ -0,0 +1,57 @@
+import pytest
+
+from song_identity import SongIdentity, clean_artist, clean_title, fold, song_alias
+
+
+@pytest.mark.parametrize("title, cleaned", [
+    ("Nothing Else Matters (Remastered 2021)", "Nothing Else Matters"),
+    ("Nothing Else Matters - Live", "Nothing Else Matters"),
+    ("Song - 2011 Remaster", "Song"),
+    ("Song [Live at Wembley]", "Song"),
+    ("Song (feat. Someone)", "Song"),
+    ("Song (with Someone)", "Song"),
+    ("Song feat. Someone", "Song"),
+    ("Song (Part 2)", "Song (Part 2)"),
+    ("Anti-Hero", "Anti-Hero"),
+    ("Live", "Live"),
+])
+def test_clean_title(title, cleaned):
+    assert clean_title(title) == cleaned
+
+
+def test_clean_artist_drops_featured_artists():
+    assert clean_artist("Okean Elzy ft. Someone") == "Okean Elzy"
+    assert clean_artist("Simon & Garfunkel") == "Simon & Garfunkel"
+
+
+@pytest.mark.parametrize("text, folded", [
+    ("Без бою", "bez boiu"),
+    ("Їжак і Йорж", "izhak i iorzh"),
+    ("Beyoncé", "beyonce"),
+    ("Simon & Garfunkel", "simon and garfunkel"),
+    ("  AC/DC!! ", "ac dc"),
+])
+def test_fold(text, folded):
+    assert fold(text) == folded
+
+
+def test_spellings_of_a_song_share_an_alias():
+    alias = song_alias("Metallica", "Nothing Else Matters")
+    assert alias == "metallica|nothing else matters"
+    assert song_alias("METALLICA", "Nothing Else Matters (Remastered 2021)") == alias
+    assert song_alias("Metallica", "Nothing Else Matters - Live") == alias
+
+
+def test_cyrillic_and_romanized_spellings_share_an_alias():
+    assert song_alias("Океан Ельзи", "Без бою") == song_alias("Okean Elzy", "Bez boiu")
+
+
+def test_identity_key_prefers_the_genius_id():
+    assert SongIdentity("a|b").key == "alias:a|b"
+    assert SongIdentity("a|b", 42, "/A-b-lyrics").key == "genius:42"
+
+
+def test_identity_json_round_trip():
+    identity = SongIdentity("a|b", 42, "/A-b-lyrics")
+    restored = SongIdentity.from_json("a|b", identity.to_json())
+    assert (restored.alias, restored.genius_id, restored.path) == ("a|b", 42, "/A-b-lyrics")
@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_priority_defaults_to_interactive():
+    assert main.SongRequest(artist="Metallica", title="One").priority == "interactive"
+    assert main.SongRequest(artist="Metallica", title="One", priority="bulk").priority == "bulk"
+
+
+def test_unknown_priority_is_rejected():
+    response = TestClient(main.app).post(
+        "/analyze/start", json={"artist": "Metallica", "title": "One", "priority": "bluk"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "priority"]
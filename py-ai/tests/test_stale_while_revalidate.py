@@ -0,0 +1,141 @@
+import asyncio
+
+from song_identity import SongIdentity
+
+FRESH_TTL = 3600
+
+
+def refresher(main, key, value="new"):
+    """A stage compute function that records its calls and caches value as a fresh entry."""
+    calls = []
+
+    async def refresh():
+        calls.append(await main.redis_client.exists(f"lock:{key}"))
+        await main.set_cache(key, value, FRESH_TTL, main.CACHE_STALE_TTL)
+        return value
+
+    refresh.calls = calls
+    return refresh
+
+
+async def write_stale(main, key, value="old"):
+    await main.redis_client.setex(key, main.CACHE_STALE_TTL - 60, value)
+
+
+async def settle(main):
+    await asyncio.gather(*list(main.refresh_tasks.values()))
+
+
+def test_fresh_entries_are_served_without_a_refresh(service):
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        await service.set_cache("k", "cached", FRESH_TTL, service.CACHE_STALE_TTL)
+        assert await service.get_or_refresh("summary", "k", refresh) == "cached"
+        assert not service.refresh_tasks
+
+    asyncio.run(scenario())
+    assert refresh.calls == []
+    assert service.cache_stats["stale_hits"] == 0
+
+
+def test_misses_are_left_to_the_caller(service):
+    refresh = refresher(service, "k")
+    assert asyncio.run(service.get_or_refresh("summary", "k", refresh)) is None
+    assert refresh.calls == []
+
+
+def test_stale_entries_are_served_and_refreshed_once(service):
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        await write_stale(service, "k")
+        results = await asyncio.gather(*(service.get_or_refresh("summary", "k", refresh) for _ in range(5)))
+        assert results == ["old"] * 5
+        await settle(service)
+        value, ttl = await service.get_from_cache_with_ttl("k")
+        assert value == "new"
+        assert ttl > service.CACHE_STALE_TTL
+
+    asyncio.run(scenario())
+    assert len(refresh.calls) == 1
+    assert service.cache_stats["refreshes"] == 1
+
+
+def test_refresh_takes_the_redis_lock_even_when_request_locking_is_off(service):
+    assert not service.SINGLEFLIGHT_REDIS_LOCK
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        await write_stale(service, "k")
+        await service.get_or_refresh("summary", "k", refresh)
+        await settle(service)
+        assert not await service.redis_client.exists("lock:k")
+
+    asyncio.run(scenario())
+    assert refresh.calls == [1]
+
+
+def test_refresh_is_left_to_the_worker_holding_the_lock(service):
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        await write_stale(service, "k")
+        await service.redis_client.set("lock:k", "another-worker", ex=60)
+        assert await service.get_or_refresh("summary", "k", refresh) == "old"
+        await settle(service)
+
+    asyncio.run(scenario())
+    assert refresh.calls == []
+    assert service.cache_stats["refresh_skips"] == 1
+
+
+def test_a_stale_l1_copy_is_replaced_by_a_refresh_done_elsewhere(service):
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        # Another worker already refreshed Redis; this one still holds the old copy in L1
+        await service.redis_client.setex("k", FRESH_TTL + service.CACHE_STALE_TTL, "new")
+        service.l1_cache.set("k", "old", service.CACHE_STALE_TTL - 60)
+        assert await service.get_or_refresh("summary", "k", refresh) == "old"
+        await settle(service)
+        assert await service.get_or_refresh("summary", "k", refresh) == "new"
+
+    asyncio.run(scenario())
+    assert refresh.calls == []
+    assert service.cache_stats["refresh_skips"] == 1
+
+
+def test_fallback_images_are_not_refreshed(service):
+    refresh = refresher(service, "k")
+
+    async def scenario():
+        await service.redis_client.setex("k", 60, service.FALLBACK_IMAGE_VALUE)
+        assert await service.get_or_refresh("image", "k", refresh) == service.FALLBACK_IMAGE_VALUE
+        assert not service.refresh_tasks
+
+    asyncio.run(scenario())
+
+
+def test_not_found_results_are_cached_briefly(service, monkeypatch):
+    song = SongIdentity("nobody|no song")
+    key = service.lyrics_cache_key(song)
+    calls = []
+
+    async def fetch(song, cache_key):
+        calls.append(song)
+        await service.cache_not_found(cache_key)
+        return None
+
+    monkeypatch.setattr(service, "_fetch_lyrics", fetch)
+
+    async def scenario():
+        assert await service.fetch_lyrics(song) is None
+        assert 0 < await service.redis_client.ttl(key) <= service.NEGATIVE_CACHE_TTL
+        # The second lookup is answered from the cache, and never refreshes
+        assert await service.fetch_lyrics(song) is None
+        assert not service.refresh_tasks
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert service.cache_stats["negative_hits"] == 1
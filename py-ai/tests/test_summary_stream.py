@@ -0,0 +1,153 @@
+import asyncio
+
+from summary_stream import TextStreams, follow_until
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_followers_get_the_text_as_it_is_written():
+    streams = TextStreams()
+
+    async def scenario():
+        reader = asyncio.ensure_future(collect(streams.follow("k")))
+        await asyncio.sleep(0)
+        with streams.produce("k") as stream:
+            for word in ("This ", "song ", "is about the sea."):
+                stream.append(word)
+                await asyncio.sleep(0)
+        return await reader
+
+    events = asyncio.run(scenario())
+    assert "".join(text for kind, text in events if kind == "delta") == "This song is about the sea."
+    assert all(kind == "delta" for kind, _ in events)
+    assert len(events) == 3
+
+
+def test_a_late_follower_gets_everything_so_far_first():
+    streams = TextStreams()
+
+    async def scenario():
+        with streams.produce("k") as stream:
+            stream.append("This ")
+            stream.append("song ")
+            reader = asyncio.ensure_future(collect(streams.follow("k")))
+            await asyncio.sleep(0)
+            stream.append("ends.")
+        return await reader
+
+    assert asyncio.run(scenario()) == [("delta", "This song "), ("delta", "ends.")]
+
+
+def test_a_restart_tells_followers_to_reset():
+    streams = TextStreams()
+
+    async def scenario():
+        reader = asyncio.ensure_future(collect(streams.follow("k")))
+        await asyncio.sleep(0)
+        with streams.produce("k") as stream:
+            stream.append("Half a summ")
+            await asyncio.sleep(0)
+            # The completion failed and is retried from scratch
+            stream.restart()
+            stream.append("A whole summary.")
+        return await reader
+
+    assert asyncio.run(scenario()) == [("delta", "Half a summ"), ("reset", ""), ("delta", "A whole summary.")]
+
+
+def test_restarting_before_any_text_is_not_a_reset():
+    streams = TextStreams()
+
+    async def scenario():
+        with streams.produce("k") as stream:
+            stream.restart()
+            reader = asyncio.ensure_future(collect(streams.follow("k")))
+            await asyncio.sleep(0)
+            stream.append("Text.")
+        return await reader
+
+    assert asyncio.run(scenario()) == [("delta", "Text.")]
+
+
+def test_an_interval_batches_small_deltas():
+    streams = TextStreams()
+
+    async def scenario():
+        reader = asyncio.ensure_future(collect(streams.follow("k", interval=0.05)))
+        await asyncio.sleep(0)
+        with streams.produce("k") as stream:
+            stream.append("First")
+            await asyncio.sleep(0.01)
+            for n in range(10):
+                stream.append(f" {n}")
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.06)
+            stream.append(" last")
+        return await reader
+
+    events = asyncio.run(scenario())
+    assert events[0] == ("delta", "First")
+    assert "".join(text for _, text in events) == "First 0 1 2 3 4 5 6 7 8 9 last"
+    assert len(events) <= 4
+
+
+def test_streams_are_dropped_once_nobody_uses_them():
+    streams = TextStreams()
+
+    async def scenario():
+        with streams.produce("k") as stream:
+            stream.append("x")
+            assert streams.snapshot()["active"] == 1
+        assert streams.snapshot() == {"produced": 1, "followed": 0, "active": 0, "listeners": 0}
+        assert not streams._streams
+
+    asyncio.run(scenario())
+
+
+def test_follow_until_stops_when_the_result_is_ready():
+    streams = TextStreams()
+
+    async def scenario():
+        done = asyncio.get_running_loop().create_future()
+        # Nothing is ever produced for this key, e.g. the summary was already cached
+        follower = asyncio.ensure_future(collect(follow_until(streams, "k", done)))
+        await asyncio.sleep(0.01)
+        done.set_result("cached summary")
+        events = await asyncio.wait_for(follower, 1)
+        return events
+
+    assert asyncio.run(scenario()) == []
+    assert streams.snapshot()["listeners"] == 0
+    assert not streams._streams
+
+
+def test_follow_until_relays_the_stream_until_it_closes():
+    streams = TextStreams()
+
+    async def scenario():
+        done = asyncio.get_running_loop().create_future()
+
+        async def produce():
+            with streams.produce("k") as stream:
+                stream.append("The ")
+                await asyncio.sleep(0.01)
+                stream.append("summary.")
+            done.set_result("The summary.")
+
+        producer = asyncio.ensure_future(produce())
+        events = await collect(follow_until(streams, "k", done))
+        await producer
+        return events
+
+    assert "".join(text for _, text in asyncio.run(scenario())) == "The summary."
+
+
+def test_follow_until_when_the_result_is_already_there():
+    async def scenario():
+        done = asyncio.get_running_loop().create_future()
+        done.set_result("summary")
+        return await collect(follow_until(TextStreams(), "k", done))
+
+    assert asyncio.run(scenario()) == []
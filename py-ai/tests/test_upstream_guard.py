@@ -0,0 +1,267 @@
+import asyncio
+
+import fakeredis.aioredis
+import httpx
+import pytest
+
+from upstream_guard import (
+    FATAL, RATE_LIMITED, UNAVAILABLE, CircuitBreaker, TokenBucket, UpstreamGuard, UpstreamUnavailableError,
+    classify, retry_after_of,
+)
+
+
+def http_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://upstream.example/")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+# ---- CircuitBreaker ----
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() == pytest.approx(30)
+    clock.advance(10)
+    assert breaker.retry_in() == pytest.approx(20)
+
+
+def test_breaker_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_lets_one_probe_through_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.retry_in() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # A second caller must wait while the probe is out
+    assert breaker.retry_in() > 0
+
+
+def test_breaker_closes_when_the_probe_succeeds(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(31)
+    breaker.retry_in()
+    assert breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.retry_in() == 0
+
+
+def test_breaker_reopens_when_the_probe_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.advance(31)
+    breaker.retry_in()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    assert breaker.retry_in() == pytest.approx(30)
+
+
+def test_breaker_released_probe_can_be_claimed_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(31)
+    assert breaker.retry_in() == 0
+    breaker.release_probe()
+    assert breaker.retry_in() == 0
+
+
+# ---- TokenBucket ----
+
+def test_bucket_grants_the_burst_then_asks_to_wait(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.take(max_wait=0)[0] for _ in range(3)] == [True, True, True]
+    granted, wait = bucket.take(max_wait=0)
+    assert not granted
+    assert wait == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2, burst=1)
+    bucket.take(max_wait=0)
+    clock.advance(0.5)
+    assert bucket.take(max_wait=0) == (True, 0.0)
+
+
+def test_bucket_grants_with_a_wait_within_max_wait(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.take(max_wait=0)
+    granted, wait = bucket.take(max_wait=5)
+    assert granted
+    assert wait == pytest.approx(1.0)
+    # The granted call went into debt, so the next one waits longer
+    assert bucket.take(max_wait=5)[1] == pytest.approx(2.0)
+
+
+def test_bucket_pause_holds_every_call(clock):
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.pause(3)
+    granted, wait = bucket.take(max_wait=1)
+    assert not granted
+    assert wait == pytest.approx(3.1)
+
+
+# ---- classification ----
+
+@pytest.mark.parametrize("error, kind", [
+    (http_error(429), RATE_LIMITED),
+    (http_error(503), UNAVAILABLE),
+    (http_error(408), UNAVAILABLE),
+    (http_error(404), FATAL),
+    (httpx.ConnectError("refused"), UNAVAILABLE),
+    (asyncio.TimeoutError(), UNAVAILABLE),
+    (ValueError("bad"), FATAL),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_retry_after_headers():
+    assert retry_after_of(http_error(429, {"retry-after": "7"})) == 7.0
+    assert retry_after_of(http_error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_of(http_error(429, {"retry-after": "soon"})) is None
+    assert retry_after_of(http_error(503)) is None
+    assert retry_after_of(ValueError()) is None
+
+
+# ---- UpstreamGuard ----
+
+def make_guard(**overrides) -> UpstreamGuard:
+    options = dict(rate=0, burst=1, max_retries=2, base_delay=0.001, max_delay=0.01,
+                   failure_threshold=3, reset_timeout=30)
+    options.update(overrides)
+    return UpstreamGuard("test", **options)
+
+
+def failing(errors, result="ok"):
+    """An upstream call that raises the given errors in turn, then returns result."""
+    errors = list(errors)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    call.calls = calls
+    return call
+
+
+def test_guard_retries_transient_failures():
+    guard = make_guard()
+    call = failing([http_error(503), httpx.ConnectError("refused")])
+    assert asyncio.run(guard.call(call)) == "ok"
+    assert len(call.calls) == 3
+    assert guard.stats["retries"] == 2
+
+
+def test_guard_does_not_retry_client_errors():
+    guard = make_guard()
+    call = failing([http_error(404)])
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(guard.call(call))
+    assert len(call.calls) == 1
+    assert guard.breaker.failures == 0
+
+
+def test_guard_gives_up_with_upstream_unavailable():
+    guard = make_guard(max_retries=1, failure_threshold=10)
+    call = failing([http_error(502)] * 5)
+    with pytest.raises(UpstreamUnavailableError) as raised:
+        asyncio.run(guard.call(call))
+    assert len(call.calls) == 2
+    assert raised.value.reason == "HTTP 502"
+    assert raised.value.retry_after >= 1
+
+
+def test_guard_fails_fast_once_the_circuit_opens():
+    guard = make_guard(max_retries=5, failure_threshold=2)
+    call = failing([http_error(503)] * 10)
+    with pytest.raises(UpstreamUnavailableError) as raised:
+        asyncio.run(guard.call(call))
+    assert raised.value.reason == "circuit open"
+    assert len(call.calls) == 2
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(guard.call(failing([])))
+    assert guard.stats["rejected"] == 2
+
+
+def test_guard_rejects_when_the_local_bucket_is_empty():
+    guard = make_guard(rate=0.1, burst=1, max_wait=0.5)
+    assert asyncio.run(guard.call(failing([]))) == "ok"
+    with pytest.raises(UpstreamUnavailableError) as raised:
+        asyncio.run(guard.call(failing([])))
+    assert raised.value.reason == "rate limited"
+
+
+# ---- shared bucket and circuit in Redis (TAKE_TOKEN_SCRIPT) ----
+
+def test_shared_bucket_is_drawn_from_by_every_guard():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        first = make_guard(rate=0.5, burst=2, max_wait=0.1, redis=lambda: redis)
+        second = make_guard(rate=0.5, burst=2, max_wait=0.1, redis=lambda: redis)
+        assert await first.call(failing([])) == "ok"
+        assert await second.call(failing([])) == "ok"
+        with pytest.raises(UpstreamUnavailableError) as raised:
+            await first.call(failing([]))
+        assert raised.value.reason == "rate limited"
+        assert first.backend == second.backend == "redis"
+
+    asyncio.run(scenario())
+
+
+def test_shared_pause_after_a_429_holds_other_guards():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        limited = make_guard(rate=10, burst=10, max_wait=0.1, max_retries=0, redis=lambda: redis)
+        other = make_guard(rate=10, burst=10, max_wait=0.1, redis=lambda: redis)
+        with pytest.raises(UpstreamUnavailableError):
+            await limited.call(failing([http_error(429, {"retry-after": "5"})]))
+        with pytest.raises(UpstreamUnavailableError) as raised:
+            await other.call(failing([]))
+        assert raised.value.reason == "rate limited"
+        assert raised.value.retry_after >= 4
+
+    asyncio.run(scenario())
+
+
+def test_shared_circuit_opened_by_one_guard_rejects_the_others():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        failing_guard = make_guard(failure_threshold=1, max_retries=0, redis=lambda: redis)
+        other = make_guard(redis=lambda: redis)
+        with pytest.raises(UpstreamUnavailableError):
+            await failing_guard.call(failing([http_error(500)]))
+        assert await redis.pttl("circuit:test") > 0
+        with pytest.raises(UpstreamUnavailableError) as raised:
+            await other.call(failing([]))
+        assert raised.value.reason == "circuit open"
+
+    asyncio.run(scenario())
+
+
+def test_guard_falls_back_to_the_local_bucket_without_redis():
+    class Broken:
+        def register_script(self, script):
+            async def run(**kwargs):
+                raise ConnectionError("redis down")
+            return run
+
+    guard = make_guard(redis=lambda: Broken())
+    assert asyncio.run(guard.call(failing([]))) == "ok"
+    assert guard.backend == "local"
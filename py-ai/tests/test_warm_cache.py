@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+import warm_cache
+from song_identity import SongIdentity, song_alias
+
+
+@pytest.fixture
+def genius(service, monkeypatch):
+    """A Genius API stand-in with one song, answering search and song lookups."""
+    requests = []
+    record = {"id": 42, "path": "/Okean-elzy-bez-boiu-lyrics", "title": "Без бою", "primary_artist": {"name": "Океан Ельзи"}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == "/search":
+            return httpx.Response(200, json={"response": {"hits": [{"result": record}]}})
+        if request.url.path == "/songs/42":
+            return httpx.Response(200, json={"response": {"song": record}})
+        return httpx.Response(404)
+
+    monkeypatch.setenv("GENIUS_API_TOKEN", "test")
+    monkeypatch.setattr(service, "GENIUS_API_BASE", "https://genius.test")
+    monkeypatch.setattr(service, "get_http_client", lambda name: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requests
+
+
+def test_resolved_identities_keep_the_names_genius_gives_the_song(service, genius):
+    song = asyncio.run(service.resolve_song("okean elzy", "bez boiu"))
+    assert (song.genius_id, song.artist, song.title) == (42, "Океан Ельзи", "Без бою")
+
+
+def test_hot_songs_are_named_from_their_cached_identity(service, genius):
+    async def scenario():
+        await service.resolve_song("okean elzy", "bez boiu")
+        return await warm_cache.name_hot_songs([service.song_alias_cache_key(song_alias("Okean Elzy", "Bez boiu"))])
+
+    assert asyncio.run(scenario()) == [("Океан Ельзи", "Без бою")]
+    assert genius == ["/search"]
+
+
+def test_identities_cached_without_names_are_named_from_genius(service, genius):
+    alias = song_alias("Океан Ельзи", "Без бою")
+    key = service.song_alias_cache_key(alias)
+
+    async def scenario():
+        await service.redis_client.set(key, '{"id": 42, "path": "/Okean-elzy-bez-boiu-lyrics"}')
+        return await warm_cache.name_hot_songs([key])
+
+    assert asyncio.run(scenario()) == [("Океан Ельзи", "Без бою")]
+    assert genius == ["/songs/42"]
+
+
+def test_hot_songs_that_cannot_be_named_are_skipped(service, genius):
+    known = service.song_alias_cache_key("known|song")
+    unknown_id = service.song_alias_cache_key("lost|song")
+    missing = service.song_alias_cache_key("never|cached")
+
+    async def scenario():
+        await service.redis_client.set(known, SongIdentity("known|song", 1, "/k", "Known", "Song").to_json())
+        await service.redis_client.set(unknown_id, '{"id": 7, "path": "/l"}')
+        await service.cache_not_found(service.song_alias_cache_key("not|found"))
+        keys = [known, unknown_id, missing, service.song_alias_cache_key("not|found")]
+        return await warm_cache.name_hot_songs(keys)
+
+    assert asyncio.run(scenario()) == [("Known", "Song")]
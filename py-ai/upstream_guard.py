@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import math
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED, UNAVAILABLE, FATAL = "rate_limited", "unavailable", "fatal"
+
+# One round trip per call: fail fast if another worker opened the circuit,
+# otherwise take a token from the shared bucket (or report how long to wait).
+# KEYS: bucket hash, circuit flag. ARGV: rate/s, burst, max wait ms, pause ms.
+# Returns {status, ms}: 1 = granted after waiting ms, 0 = would wait ms (not
+# taken), -1 = circuit open for another ms.
+TAKE_TOKEN_SCRIPT = """
+local open_ms = redis.call('PTTL', KEYS[2])
+if open_ms > 0 then return {-1, open_ms} end
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local max_wait, pause = tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'paused_until')
+if rate <= 0 and pause <= 0 and not state[3] then return {1, 0} end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local paused_until = tonumber(state[3]) or 0
+local ttl = math.ceil(burst / math.max(rate, 0.001) * 1000) + 1000
+if pause > 0 then
+  paused_until = math.max(paused_until, now + pause)
+  redis.call('HSET', KEYS[1], 'tokens', 0, 'ts', paused_until, 'paused_until', paused_until)
+  redis.call('PEXPIRE', KEYS[1], paused_until - now + ttl)
+  return {0, paused_until - now}
+end
+-- Tokens accrue from the end of any pause; a granted call may run into
+-- debt, and whoever comes next waits for it to be paid back
+local start = math.max(now, paused_until)
+local wait = start - now
+if rate > 0 then
+  tokens = math.min(burst, tokens + math.max(0, start - ts) * rate / 1000)
+  if tokens < 1 then wait = wait + math.ceil((1 - tokens) * 1000 / rate) end
+end
+if wait > max_wait then return {0, wait} end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', math.max(start, ts), 'paused_until', paused_until)
+redis.call('PEXPIRE', KEYS[1], start - now + ttl)
+return {1, wait}
+"""
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when a provider is rate limited, failing, or its circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float, reason: str):
+        self.provider = provider
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+        super().__init__(f"{provider} is unavailable ({reason}), retry after {self.retry_after}s")
+
+
+def status_code_of(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)  # openai.APIStatusError
+    if status is None and isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    return status
+
+
+def classify(exc: Exception) -> str:
+    """Whether a failed call is worth retrying, and if so why."""
+    status = status_code_of(exc)
+    if status == 429:
+        return RATE_LIMITED
+    if status is not None:
+        return UNAVAILABLE if status >= 500 or status == 408 else FATAL
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return UNAVAILABLE
+    # The SDK is imported lazily; if it isn't loaded yet, this can't be one of its errors
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return UNAVAILABLE  # includes APITimeoutError
+    return FATAL
+
+
+def failure_reason(exc: Exception) -> str:
+    status = status_code_of(exc)
+    return f"HTTP {status}" if status is not None else type(exc).__name__
+
+
+def retry_after_of(exc: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After(-Ms) headers."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """In-process token bucket; the stand-in when the shared one in Redis is unreachable."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def take(self, max_wait: float) -> tuple:
+        """Same contract as TAKE_TOKEN_SCRIPT, in seconds: (granted, wait)."""
+        now = time.monotonic()
+        start = max(now, self.paused_until)
+        wait = start - now
+        if self.rate > 0:
+            tokens = min(self.burst, self.tokens + max(0.0, start - self.updated) * self.rate)
+            if tokens < 1:
+                wait += (1 - tokens) / self.rate
+        else:
+            tokens = self.tokens
+        if wait > max_wait:
+            return False, wait
+        self.tokens = tokens - 1
+        self.updated = max(start, self.updated)
+        return True, wait
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    After failure_threshold failures in a row the circuit opens and calls
+    fail immediately; reset_timeout seconds later one probe call is let
+    through, and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.times_opened = 0
+
+    def retry_in(self) -> float:
+        """Seconds until a call may go through; 0 if one may go now (claiming the probe if half-open)."""
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = self.HALF_OPEN
+            self.probing = False
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                return self.reset_timeout
+            self.probing = True
+        return 0.0
+
+    def record_success(self) -> bool:
+        """Returns True if this closed the circuit."""
+        self.failures = 0
+        self.probing = False
+        if self.state == self.CLOSED:
+            return False
+        self.state = self.CLOSED
+        return True
+
+    def record_failure(self) -> bool:
+        """Returns True if this opened the circuit."""
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Give up a claimed half-open probe without an outcome (the call was cancelled)."""
+        self.probing = False
+
+    def snapshot(self) -> dict:
+        retry_in = self.opened_at + self.reset_timeout - time.monotonic() if self.state == self.OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "retry_in": round(max(0.0, retry_in), 1),
+        }
+
+
+class UpstreamGuard:
+    """Rate limiting, circuit breaking and retries for calls to one upstream provider.
+
+    The token bucket and the "circuit open" flag live in Redis, so every
+    worker draws from one budget and stops calling a provider as soon as any
+    of them sees it go down; without Redis each worker falls back to its own
+    bucket and breaker. Failed calls are retried with full-jitter exponential
+    backoff, or after the provider's Retry-After. A 429 also pauses the shared
+    bucket for that long, so other workers back off too. When a call cannot
+    be made or keeps failing, UpstreamUnavailableError carries how long the
+    caller should wait; other errors (4xx) propagate unchanged.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        rate: float,
+        burst: float,
+        max_wait: float = 5.0,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        redis: Optional[Callable] = None,
+        op_timeout: float = 0.5,
+    ):
+        self.provider = provider
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.local_bucket = TokenBucket(rate, self.burst)
+        self._redis = redis or (lambda: None)
+        self._op_timeout = op_timeout
+        self._script = None
+        self._script_client = None
+        self.backend = "local"
+        self.bucket_key = f"ratelimit:{provider}"
+        self.circuit_key = f"circuit:{provider}"
+        self.stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limited": 0,  # 429s from the provider
+            "throttled": 0,  # calls that waited for a token
+            "throttle_seconds": 0.0,
+            "rejected": 0,  # calls failed fast by the limiter or an open circuit
+        }
+
+    async def call(self, fn: Callable[[], Awaitable]):
+        """Run fn (one attempt per invocation) under the limiter, breaker and retry policy."""
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self._admit()
+            self.stats["attempts"] += 1
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL:
+                    # The provider answered; the request itself was bad
+                    await self._record_success()
+                    raise
+                retry_after = retry_after_of(e)
+                if kind == RATE_LIMITED:
+                    self.stats["rate_limited"] += 1
+                    await self._record_success()
+                    await self._pause(retry_after or self.base_delay * 2 ** attempt)
+                else:
+                    self.stats["failures"] += 1
+                    await self._record_failure()
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, self.base_delay)
+                else:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt >= self.max_retries or delay > self.max_delay:
+                    raise UpstreamUnavailableError(
+                        self.provider, delay if retry_after is not None else self.base_delay * 2 ** attempt,
+                        "rate limited" if kind == RATE_LIMITED else failure_reason(e),
+                    ) from e
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(f"{self.provider} call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            await self._record_success()
+            return result
+
+    async def _admit(self) -> None:
+        retry_in = self.breaker.retry_in()
+        if retry_in > 0:
+            self.stats["rejected"] += 1
+            raise UpstreamUnavailableError(self.provider, retry_in, "circuit open")
+        status, wait = await self._take()
+        if status < 0:
+            self.breaker.release_probe()
+            self.stats["rejected"] += 1
+            raise UpstreamUnavailableError(self.provider, wait, "circuit open")
+        if status == 0:
+            self.breaker.release_probe()
+            self.stats["rejected"] += 1
+            raise UpstreamUnavailableError(self.provider, wait, "rate limited")
+        if wait > 0:
+            self.stats["throttled"] += 1
+            self.stats["throttle_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    async def _take(self, pause: float = 0.0) -> tuple:
+        """(status, seconds) from the shared bucket, or the local one if Redis is unavailable."""
+        client = self._redis()
+        if client is not None:
+            try:
+                if self._script is None or self._script_client is not client:
+                    self._script = client.register_script(TAKE_TOKEN_SCRIPT)
+                    self._script_client = client
+                status, ms = await asyncio.wait_for(
+                    self._script(
+                        keys=[self.bucket_key, self.circuit_key],
+                        args=[self.rate, self.burst, int(self.max_wait * 1000), int(pause * 1000)],
+                    ),
+                    self._op_timeout,
+                )
+                self.backend = "redis"
+                return int(status), int(ms) / 1000
+            except Exception as e:
+                if self.backend == "redis":
+                    logger.warning(f"Shared rate limiter for {self.provider} unavailable, using local bucket: {e}")
+                self.backend = "local"
+        if pause > 0:
+            self.local_bucket.pause(pause)
+            return 0, pause
+        granted, wait = self.local_bucket.take(self.max_wait)
+        return (1 if granted else 0), wait
+
+    async def _pause(self, seconds: float) -> None:
+        await self._take(pause=seconds)
+
+    async def _record_success(self) -> None:
+        if self.breaker.record_success():
+            logger.info(f"Circuit for {self.provider} closed")
+            await self._share_circuit(open_for=0)
+
+    async def _record_failure(self) -> None:
+        if self.breaker.record_failure():
+            logger.warning(f"Circuit for {self.provider} opened for {self.breaker.reset_timeout}s")
+            await self._share_circuit(open_for=self.breaker.reset_timeout)
+
+    async def _share_circuit(self, open_for: float) -> None:
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            if open_for > 0:
+                await asyncio.wait_for(client.set(self.circuit_key, "1", px=int(open_for * 1000)), self._op_timeout)
+            else:
+                await asyncio.wait_for(client.delete(self.circuit_key), self._op_timeout)
+        except Exception as e:
+            logger.warning(f"Could not share circuit state for {self.provider}: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "throttle_seconds": round(self.stats["throttle_seconds"], 3),
+            "rate_limit": {"rate": self.rate, "burst": self.burst, "backend": self.backend},
+            "circuit": self.breaker.snapshot(),
+        }
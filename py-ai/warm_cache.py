@@ -0,0 +1,207 @@
+"""Warm the lyrics, summary and artwork caches for a list of songs.
+
+Usage:
+    python warm_cache.py songs.txt [--languages en,uk] [--styles "album cover,vintage"]
+                                   [--concurrency 4] [--no-artwork]
+    python warm_cache.py --hot http://localhost:8000/cache/hot [--limit 100]
+
+Each line of the song file is "Artist - Title" or "Artist<TAB>Title"; blank
+lines and lines starting with # are skipped. --hot reads the most requested
+songs from a running service instead, named as Genius names them. Entries already cached are left alone
+(stale ones are refreshed), and new entries are written to Redis in pipelined
+batches. Uses the same environment (REDIS_URL, API tokens) as the service.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+import main
+from song_identity import SongIdentity
+
+logger = logging.getLogger("warm_cache")
+
+
+def parse_song_line(line: str):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if "\t" in line:
+        artist, _, title = line.partition("\t")
+    elif " - " in line:
+        artist, _, title = line.partition(" - ")
+    else:
+        return None
+    artist, title = main.sanitize_input(artist), main.sanitize_input(title)
+    return (artist, title) if artist and title else None
+
+
+def load_song_file(path: str) -> list:
+    songs = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            song = parse_song_line(line)
+            if song:
+                songs.append(song)
+            elif line.strip() and not line.lstrip().startswith("#"):
+                logger.warning(f"{path}:{number}: expected 'Artist - Title', skipping")
+    return songs
+
+
+async def load_hot_songs(url: str, limit: int) -> list:
+    """Songs behind the hottest identity lookups ("songid:artist|title" keys)."""
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        response = await client.get(url, params={"limit": limit})
+        response.raise_for_status()
+    prefix = main.song_alias_cache_key("")
+    keys = [entry["key"] for entry in response.json()["keys"] if entry["key"].startswith(prefix)]
+    if not keys:
+        return []
+    await main.init_redis()
+    await main.init_http_clients()
+    try:
+        return await name_hot_songs(keys)
+    finally:
+        await main.close_http_clients()
+        await main.close_redis()
+
+
+async def name_hot_songs(keys: list) -> list:
+    """(artist, title) for each "songid:" key whose song can be named.
+
+    The keys hold folded aliases ("okean elzy|bez boiu"), which must not end
+    up in prompts or cached summaries, so each song is named from its cached
+    identity: the names stored with it, or else its Genius song record.
+    """
+    prefix = main.song_alias_cache_key("")
+    songs = []
+    for key, (value, _) in zip(keys, await main.get_many_from_cache_with_ttl(keys)):
+        if not value or value == main.NEGATIVE_CACHE_VALUE:
+            logger.warning(f"No cached identity for hot key {key}, skipping")
+            continue
+        song = SongIdentity.from_json(key[len(prefix):], value)
+        names = (song.artist, song.title) if song.artist and song.title else await genius_song_names(song.genius_id)
+        if names:
+            songs.append(names)
+        else:
+            logger.warning(f"Could not look up the names of Genius song {song.genius_id}, skipping")
+    return songs
+
+
+async def genius_song_names(genius_id: int):
+    """(artist, title) from the Genius song record, or None."""
+    token = os.getenv("GENIUS_API_TOKEN")
+    if not token:
+        return None
+    client = main.get_http_client("genius")
+
+    async def fetch():
+        with main.track_upstream("genius"):
+            response = await client.get(
+                f"{main.GENIUS_API_BASE}/songs/{genius_id}", headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+        return response
+
+    try:
+        record = (await main.upstream_guards["genius"].call(fetch)).json()["response"]["song"]
+        artist, title = record["primary_artist"]["name"], record["title"]
+    except Exception as e:
+        logger.error(f"Error fetching Genius song {genius_id}: {e}")
+        return None
+    return (artist, title) if artist and title else None
+
+
+async def warm_song(artist: str, title: str, languages: list, styles: list, artwork: bool) -> str:
+    song = await main.resolve_song(artist, title)
+    lyrics = await main.fetch_lyrics(song) if song else None
+    if not lyrics:
+        return "not found"
+    for language in languages:
+        summary = await main.summarize_lyrics(lyrics, artist, title, language)
+        if artwork:
+            for style in styles:
+                await main.generate_song_artwork(song, artist, title, summary, style)
+    return "ok"
+
+
+async def warm(songs: list, languages: list, styles: list, artwork: bool, concurrency: int, write_batch: int) -> dict:
+    await main.init_redis()
+    await main.init_http_clients()
+    await main.artwork_store.start()
+    buffer: list = []
+    main.cache_write_buffer.set(buffer)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {"ok": 0, "not found": 0, "failed": 0}
+
+    async def flush():
+        if buffer:
+            items = buffer[:]
+            buffer.clear()
+            await main.set_many_cache(items)
+
+    async def run(artist: str, title: str):
+        async with semaphore:
+            try:
+                status = await warm_song(artist, title, languages, styles, artwork)
+            except Exception as e:
+                logger.error(f"Failed to warm '{artist} - {title}': {e}")
+                status = "failed"
+        results[status] += 1
+        logger.info(f"[{sum(results.values())}/{len(songs)}] {artist} - {title}: {status}")
+        if len(buffer) >= write_batch:
+            await flush()
+
+    try:
+        await asyncio.gather(*(run(artist, title) for artist, title in songs))
+        # Stale entries found along the way are refreshed in the background
+        while main.refresh_tasks:
+            await asyncio.gather(*list(main.refresh_tasks.values()), return_exceptions=True)
+        await flush()
+    finally:
+        main.cache_write_buffer.set(None)
+        await main.close_openai_client()
+        await main.close_http_clients()
+        await main.close_redis()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("song_file", nargs="?", help="file with one 'Artist - Title' per line")
+    parser.add_argument("--hot", metavar="URL", help="warm the hottest songs from a running service's /cache/hot")
+    parser.add_argument("--limit", type=int, default=100, help="how many hot keys to read with --hot")
+    parser.add_argument("--languages", default="en", help="comma-separated summary languages")
+    parser.add_argument("--styles", default="album cover", help="comma-separated artwork styles")
+    parser.add_argument("--no-artwork", action="store_true", help="only warm lyrics and summaries")
+    parser.add_argument("--concurrency", type=int, default=4, help="songs warmed at once")
+    parser.add_argument("--write-batch", type=int, default=50, help="cache writes per Redis pipeline")
+    args = parser.parse_args()
+
+    if args.song_file:
+        songs = load_song_file(args.song_file)
+    elif args.hot:
+        songs = asyncio.run(load_hot_songs(args.hot, args.limit))
+    else:
+        parser.error("a song file or --hot URL is required")
+    if not songs:
+        print("No songs to warm")
+        return 1
+
+    languages = [language.strip() for language in args.languages.split(",") if language.strip()]
+    styles = [style.strip() for style in args.styles.split(",") if style.strip()]
+    started = time.monotonic()
+    results = asyncio.run(warm(songs, languages, styles, not args.no_artwork, args.concurrency, args.write_batch))
+    print(
+        f"Warmed {len(songs)} songs in {time.monotonic() - started:.1f}s: "
+        + ", ".join(f"{count} {status}" for status, count in results.items())
+    )
+    return 0 if not results["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())